@@ -0,0 +1,247 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script benchmarks the INSTALL upgrade against a fleet of simulated switches
+# (look at fake_switch.py) so changes to the pipeline, transfer scheduler, reboot
+# detector, etc. can be measured without touching a real switch. For every fleet size
+# passed in with --hosts, a fresh fleet is started on localhost ports, a throwaway
+# working directory is made with a hosts.yaml, groups.yaml, and config.yaml pointing
+# at it, and the same steps as ios_upgrade_INSTALL.py's main() are ran without any of
+# the prompts: gather facts, pre-upgrade config, the download -> MD5 -> upgrade ->
+# reboot pipeline, and the commit. Every run's timing report (look at ios_timing.py)
+# is written to that working directory, and a table of every fleet size's total time,
+# throughput, and slowest phases is printed at the end.
+#
+# Ran from the root of the repository:
+#   python3 bench/bench_upgrade.py --hosts 10 100 1000 --scale 0.01
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))    # ios_*.py scripts live one directory up
+
+import fake_switch                                      # Simulated switches, look at fake_switch.py
+import ios_facts                                        # gatherFacts() lives here
+import ios_pipeline                                     # Per-switch pipeline, look at ios_pipeline.py
+import ios_remediation                                  # Pre-upgrade config, one config session and one save per switch
+import ios_runner                                       # Registers the "swan" runner plugin
+import ios_stages                                       # Per-switch steps of the pipeline
+import ios_timing                                       # Per-host, per-phase timing, look at ios_timing.py
+import ios_transfers                                    # Transfer scheduler, look at ios_transfers.py
+import ios_upgrade_INSTALL                              # Commit and timeout functions are reused as-is
+import ios_waves                                        # Rolling reboot waves, look at ios_waves.py
+import logging
+from nornir import InitNornir
+import swan_logger                                      # Custom written logger script, flushed before every fleet is torn down
+
+
+IMAGE_VERSION = "17.09.04"
+IMAGE_FILE = "cat9k_iosxe.17.09.04.SPA.bin"
+
+# Same config.yaml as the repository's, with the reboot detector and progress
+# intervals shrunk to match the fake switches' scaled down reboot times
+CONFIG = """---
+inventory:
+    plugin: SimpleInventory
+    options:
+        host_file: "hosts.yaml"
+        group_file: "groups.yaml"
+
+runner:
+    plugin: swan
+    options:
+        num_workers: {workers}
+        classes:
+            facts: {workers}
+            transfer: {workers}
+            md5: {workers}
+            activate: {workers}
+
+user_defined:
+    stage_limits:
+        transfer: {workers}
+        md5: {workers}
+        upgrade: {workers}
+    waves:
+        max_reboots: {maxReboots}
+    reboot:
+        max_wait: {maxWait}
+        down_timeout: {downTimeout}
+        min_interval: {minInterval}
+        max_interval: {maxInterval}
+        probe_timeout: 2
+    transfers:
+        per_server: {perServer}
+        per_site: {perServer}
+    timing:
+        directory: "reports"
+        slowest: 3
+    facts_cache:
+        ttl: 0
+"""
+
+
+
+# PARSE ARGUMENTS
+# Function reads the command line flags, look at the top of the script for an example
+################################################################################
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Benchmarks the INSTALL upgrade against simulated switches.")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[10, 100, 1000], help="Fleet sizes to benchmark, one run per size")
+    parser.add_argument("--scale", type=float, default=fake_switch.DEFAULTS["scale"], help="Multiplier on every simulated delay (1 is real time)")
+    parser.add_argument("--port", type=int, default=22000, help="First localhost port, every switch gets the next port up")
+    parser.add_argument("--workers", type=int, default=100, help="Nornir worker threads, same as num_workers in config.yaml")
+    parser.add_argument("--per-server", type=int, default=10, help="Max concurrent transfers from the (simulated) file server")
+    parser.add_argument("--max-reboots", type=int, default=50, help="Max number of switches in a single reboot wave")
+    return parser.parse_args()
+
+
+
+# WRITE INVENTORY
+# Function writes the hosts.yaml, groups.yaml, and config.yaml of a single run into
+# the working directory
+################################################################################
+def writeInventory(directory, switches, args):
+    with open(os.path.join(directory, "hosts.yaml"), "w") as file:
+        file.write("---\n")
+        for switch in switches:
+            file.write(f"{switch.hostname}:\n    hostname: 127.0.0.1\n    port: {switch.port}\n")
+            file.write(f"    username: bench\n    password: bench\n    groups:\n        - install\n")
+
+    with open(os.path.join(directory, "groups.yaml"), "w") as file:
+        file.write("---\ninstall:\n    platform: 'ios'\n")
+
+    reboot = fake_switch.DEFAULTS["reboot_seconds"] * args.scale
+    with open(os.path.join(directory, "config.yaml"), "w") as file:
+        file.write(CONFIG.format(workers=args.workers, maxReboots=args.max_reboots, perServer=args.per_server,
+                                 maxWait=int(max(60, 20 * reboot)), downTimeout=int(max(30, 10 * reboot)),
+                                 minInterval=max(0.2, reboot / 20), maxInterval=max(1, reboot / 2)))
+
+
+
+# RUN UPGRADE
+# Function runs the same steps as ios_upgrade_INSTALL.py's main() against the fleet
+# with every prompt answered "yes"/"start"/"commit". Returns the number of switches
+# that made it through the whole upgrade.
+################################################################################
+def runUpgrade(nr):
+    facts, offline = ios_facts.gatherFacts(nr, useCache=False)
+    if len(offline) != 0:
+        print(f"List of all hosts offline: {offline}")
+        return 0
+
+    with ios_timing.fleetSpan(nr.inventory.hosts, "config"):
+        ios_remediation.remediate(nr, facts, autoUpgrade=True)
+
+    missingFile = ios_facts.missingFile(facts, IMAGE_FILE)
+    mirrors = [{"ip": "127.0.0.1", "path": "bench", "sites": [], "protocol": "scp", "port": None}]
+    readTimeout = ios_upgrade_INSTALL.readTimeoutEstimate(fake_switch.IMAGE_SIZE)
+    waves = ios_waves.planWaves(nr)
+    gate = ios_waves.WaveGate(waves)
+    stages = [
+        ios_pipeline.stage("transfer", ios_stages.scpTask, hosts=missingFile, ipAddress="127.0.0.1", folderPath="bench",
+                           filename=IMAGE_FILE, filesize=fake_switch.IMAGE_SIZE, fileUsername="bench", filePassword="bench",
+                           readTimeout=readTimeout, scheduler=ios_transfers.TransferScheduler(nr), mirrors=mirrors),
+        ios_pipeline.stage("md5", ios_stages.md5Task, filename=IMAGE_FILE, MD5=fake_switch.IMAGE_MD5, readTimeout=readTimeout),
+        ios_pipeline.stage("waveWait", ios_waves.waveWaitTask, gate=gate),
+        ios_pipeline.stage("upgrade", ios_stages.upgradeInstallTask, filename=IMAGE_FILE),
+        ios_pipeline.stage("reboot", ios_stages.rebootWaitTask),
+        ios_pipeline.stage("versionCheck", ios_stages.versionCheckTask, newIOSVersion=IMAGE_VERSION),
+        ios_pipeline.stage("waveDone", ios_waves.waveDoneTask, gate=gate),
+    ]
+    output = ios_pipeline.runPipeline(nr, stages, name="upgrade", onFailed=gate.drop)
+    upgradedHosts = list(ios_pipeline.pipelineContexts(output))
+    if len(upgradedHosts) != 0:
+        with ios_timing.fleetSpan(upgradedHosts, "commit"):
+            ios_upgrade_INSTALL.upgradeFinisher(nr.filter(filter_func=lambda host: host.name in upgradedHosts), "commit")
+    return len(upgradedHosts)
+
+
+
+# PHASE TOTALS
+# Function returns the median and max seconds of every top-level phase in the run
+################################################################################
+def phaseTotals(run):
+    phases = {}
+    for element in run.spans:
+        if element["parent"] is None and element["host"] != ios_timing.FLEET:
+            phases.setdefault(element["phase"], []).append(element["seconds"])
+
+    totals = {}
+    for phase, seconds in phases.items():
+        seconds.sort()
+        totals[phase] = (seconds[len(seconds) // 2], seconds[-1])
+    return totals
+
+
+
+# BENCHMARK
+# Function starts a fleet of the passed size, upgrades it, tears it down, and returns
+# a dictionary with the results of the run
+################################################################################
+def benchmark(count, args):
+    directory = tempfile.mkdtemp(prefix=f"swan-bench-{count}-")
+    options = {"scale": args.scale}
+    switches = fake_switch.startFleet(count, args.port, options)
+    cwd = os.getcwd()
+    try:
+        writeInventory(directory, switches, args)
+        os.chdir(directory)                             # Every script writes its logs, cache, and reports relative to where it is ran from
+        nr = InitNornir(config_file="config.yaml")
+        run = ios_timing.startRun(nr, f"bench-{count}")
+        start = time.time()
+        upgraded = runUpgrade(nr)
+        elapsed = time.time() - start
+        nr.close_connections()
+        swan_logger.flush()
+        ios_timing.writeReport()
+    finally:
+        os.chdir(cwd)
+        fake_switch.stopFleet(switches)
+
+    reloads = sum(switch.reloads for switch in switches)
+    return {"hosts": count, "upgraded": upgraded, "seconds": elapsed, "reloads": reloads,
+            "phases": phaseTotals(run), "directory": directory}
+
+
+
+# PRINT RESULTS
+# Function prints a table of every fleet size's total time and throughput, followed
+# by the median and slowest time of every phase
+################################################################################
+def printResults(results, scale):
+    print("\nBenchmark results")
+    print("################################################################################")
+    print(f"Delays scaled by {scale}, multiply seconds by {round(1 / scale)} for real-world time\n")
+    print(f"{'Hosts':>6} {'Upgraded':>9} {'Reloads':>8} {'Seconds':>9} {'Hosts/min':>10}")
+    for result in results:
+        throughput = 60 * result["upgraded"] / max(result["seconds"], 0.001)
+        print(f"{result['hosts']:>6} {result['upgraded']:>9} {result['reloads']:>8} {round(result['seconds'], 1):>9} {round(throughput, 1):>10}")
+
+    for result in results:
+        print(f"\n{result['hosts']} hosts (report in {result['directory']}):")
+        for phase, (median, longest) in sorted(result["phases"].items(), key=lambda item: item[1][1], reverse=True):
+            print(f"    {phase:<16} median {round(median, 2):>8} secs, slowest {round(longest, 2):>8} secs")
+    print()
+
+
+
+def main():
+    args = parseArguments()
+    logging.getLogger("nornir.core").disabled = True    # Reboot polling spams the log full of tracebacks
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+    results = []
+    for count in args.hosts:
+        print(f"\nBenchmarking {count} simulated switches...")
+        print("################################################################################\n")
+        results.append(benchmark(count, args))
+    printResults(results, args.scale)
+
+
+
+if __name__ == "__main__":
+    main()
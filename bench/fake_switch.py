@@ -0,0 +1,473 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the simulated IOS-XE switches used by bench_upgrade.py. Every
+# FakeSwitch listens for SSH on its own localhost port (using paramiko, which netmiko
+# already pulls in) and answers every command the INSTALL, BUNDLE, and download
+# scripts send with output shaped like a real c9300's, including the interactive
+# prompts of copy, delete, and install. Anything that takes a while on a real switch
+# (transfers, "verify /md5", install add, the reload) sleeps for a realistic amount
+# of time multiplied by "scale", so a whole fleet can be upgraded in a few minutes.
+# A reload closes every session and the listening socket, sleeps for the reboot
+# time, and then starts listening again running the newly installed version.
+# THIS IS ONLY FOR BENCHMARKING, nothing in here ever touches a real switch.
+
+import hashlib
+import paramiko
+import random
+import re
+import socket
+import threading
+import time
+
+
+DEFAULTS = {
+    "scale": 0.01,                                      # Every delay below is multiplied by this
+    "transfer_rate": 5000000,                           # Bytes/sec of a copy from a file server
+    "peer_rate": 40000000,                              # Bytes/sec of a copy from another switch or between stack members
+    "md5_rate": 30000000,                               # Bytes/sec of "verify /md5"
+    "install_seconds": 240,                             # install add
+    "activate_seconds": 60,                             # install activate before the reload starts
+    "reboot_seconds": 480,                              # How long the switch is gone for during a reload
+    "command_seconds": 0.05,                            # Every other command
+    "jitter": 0.2,                                      # Every delay is randomly stretched or shrunk by up to this fraction
+}
+
+HOST_KEY = None                                         # Shared RSA key, generated the first time a switch starts
+HOST_KEY_LOCK = threading.Lock()
+
+
+
+# GET HOST KEY
+# Function returns the SSH host key every fake switch uses
+################################################################################
+def getHostKey():
+    global HOST_KEY
+    with HOST_KEY_LOCK:
+        if HOST_KEY is None:
+            HOST_KEY = paramiko.RSAKey.generate(2048)
+    return HOST_KEY
+
+
+
+# SWITCH SERVER
+# Accepts any username and password and a single interactive shell per session
+################################################################################
+class SwitchServer(paramiko.ServerInterface):
+    def __init__(self):
+        self.shell = threading.Event()
+
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+
+
+# FAKE SWITCH
+# A single simulated switch, with its own flash, running config, and version
+################################################################################
+class FakeSwitch:
+    def __init__(self, hostname, port, version="17.03.04", mode="INSTALL", stack=1, files=None, options=None):
+        self.hostname = hostname
+        self.port = port
+        self.version = version
+        self.mode = mode
+        self.stack = stack
+        self.options = dict(DEFAULTS)
+        self.options.update(options or {})
+        self.flash = {}                                 # Filesystem ("flash", "flash-2", ...) -> {filename: (size, md5)}
+        for member in range(1, stack + 1):
+            self.flash[self.filesystem(member)] = dict(files or {})
+        self.config = ["boot system flash:packages.conf"]
+        self.staged = None                              # Version installed by "install add", running after the next reload
+        self.committed = True
+        self.transports = []
+        self.lock = threading.Lock()
+        self.listener = None
+        self.stopped = threading.Event()
+        self.reloads = 0
+
+
+    def filesystem(self, member):
+        return "flash" if member == 1 else f"flash-{member}"
+
+
+    # Sleeps for the passed number of real-switch seconds, shrunk by "scale"
+    def delay(self, seconds):
+        jitter = 1 + random.uniform(-self.options["jitter"], self.options["jitter"])
+        time.sleep(max(0, seconds * self.options["scale"] * jitter))
+
+
+    def start(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", self.port))
+        self.listener.listen(100)
+        threading.Thread(target=self.accept, args=(self.listener,), name=f"{self.hostname}-listener", daemon=True).start()
+
+
+    def stop(self):
+        self.stopped.set()
+        self.goDown()
+
+
+    # Closes the listening socket and every open session, like a switch that just lost power
+    def goDown(self):
+        with self.lock:
+            if self.listener is not None:
+                self.listener.close()
+                self.listener = None
+            for transport in self.transports:
+                transport.close()
+            self.transports = []
+
+
+    # Simulates a reload, running the staged version once the switch comes back
+    def reload(self):
+        self.delay(5)                                   # The switch takes a few seconds to actually go down after printing the reload message
+        self.goDown()
+        self.delay(self.options["reboot_seconds"])
+        if self.staged is not None:
+            self.version = self.staged
+            self.staged = None
+        self.reloads = self.reloads + 1
+        if not self.stopped.is_set():
+            self.start()
+
+
+    def accept(self, listener):
+        while True:
+            try:
+                client, _ = listener.accept()
+            except OSError:                             # Listener was closed by goDown()
+                return
+            threading.Thread(target=self.session, args=(client,), name=f"{self.hostname}-session", daemon=True).start()
+
+
+    def session(self, client):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(getHostKey())
+        server = SwitchServer()
+        try:
+            transport.start_server(server=server)
+        except (paramiko.SSHException, EOFError, OSError):
+            return
+        with self.lock:
+            self.transports.append(transport)
+
+        channel = transport.accept(30)
+        if channel is None or not server.shell.wait(10):
+            transport.close()
+            return
+        try:
+            self.shell(channel)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
+            with self.lock:
+                if transport in self.transports:
+                    self.transports.remove(transport)
+
+
+    # Reads the session a line at a time, echoing everything back like a real terminal
+    def shell(self, channel):
+        state = {"config": False, "pending": None}
+        channel.sendall(f"\r\n{self.prompt(state)}")
+        buffer = ""
+        carriage = False                                # Last character read was \r, so a \n right after it isn't a second enter
+        while True:
+            data = channel.recv(4096)
+            if not data:
+                return
+            text = data.decode("utf-8", "ignore")
+            if carriage and text.startswith("\n"):
+                text = text[1:]
+            carriage = text.endswith("\r")
+            buffer = buffer + text.replace("\r\n", "\n").replace("\r", "\n")
+            while "\n" in buffer:
+                line, buffer = buffer.split("\n", 1)
+                channel.sendall(line + "\r\n")
+                output, reload = self.handle(line.strip(), state)
+                channel.sendall(output)
+                if reload:
+                    threading.Thread(target=self.reload, name=f"{self.hostname}-reload", daemon=True).start()
+                    return
+
+
+    def prompt(self, state):
+        if state["config"]:
+            return f"{self.hostname}(config)#"
+        return f"{self.hostname}#"
+
+
+    # Returns the output of a single line along with True if the switch should reload
+    def handle(self, line, state):
+        if state["pending"] is not None:                # Answering an interactive prompt from the command before this one
+            pending = state["pending"]
+            state["pending"] = None
+            output, reload = pending(line, state)
+            if state["pending"] is None and not reload:
+                output = output + self.prompt(state)
+            return output, reload
+
+        self.delay(self.options["command_seconds"])
+        if line == "":
+            return self.prompt(state), False
+        if state["config"]:
+            return self.configCommand(line, state) + self.prompt(state), False
+
+        output, reload = self.command(line, state)
+        if state["pending"] is None and not reload:
+            output = output + self.prompt(state)
+        return output, reload
+
+
+    def configCommand(self, line, state):
+        if line in ("end", "exit"):
+            state["config"] = False
+        elif line.startswith("no "):
+            self.config = [entry for entry in self.config if not entry.startswith(line[3:])]
+        elif line not in self.config:
+            self.config.append(line)
+        return ""
+
+
+    def command(self, line, state):
+        if line.startswith("terminal ") or line == "show clock":
+            return "", False
+        if line in ("configure terminal", "conf t"):
+            state["config"] = True
+            return "Enter configuration commands, one per line.  End with CNTL/Z.\r\n", False
+        if line in ("write mem", "write memory", "copy running-config startup-config"):
+            self.delay(2)
+            return "Building configuration...\r\n[OK]\r\n", False
+        if line.startswith("show version"):
+            return self.showVersion(), False
+        if line.startswith("show switch"):
+            return self.showSwitch(), False
+        if line.startswith("show romvar"):
+            return "ROMMON variables:\r\nMANUAL_BOOT=no\r\nSWITCH_IGNORE_STARTUP_CFG=0\r\n", False
+        if line.startswith("show run") or line.startswith("sh run"):
+            return self.showRun(line), False
+        if line.startswith("dir"):
+            return self.dir(line), False
+        if line.startswith("verify /md5"):
+            return self.verify(line), False
+        if line.startswith("ping "):
+            return "Type escape sequence to abort.\r\nSuccess rate is 100 percent (5/5), round-trip min/avg/max = 1/2/4 ms\r\n", False
+        if line.startswith("copy "):
+            return self.copy(line, state), False
+        if line.startswith("delete /force ") or line.startswith("del "):
+            return self.delete(line, state), False
+        if line.startswith("install "):
+            return self.install(line, state)
+        if line.startswith("no system ignore startupconfig"):
+            return "", False
+        return "                 ^\r\n% Invalid input detected at '^' marker.\r\n\r\n", False
+
+
+    def showVersion(self):
+        members = ""
+        for member in range(1, self.stack + 1):
+            star = "*" if member == 1 else " "
+            members = members + f"{star}    {member} 41    C9300-48P          {self.version:<17} CAT9K_IOSXE        {self.mode}\r\n"
+        return (f"Cisco IOS XE Software, Version {self.version}\r\n"
+                f"Cisco IOS Software [Amsterdam], Catalyst L3 Switch Software (CAT9K_IOSXE), Version {self.version}, RELEASE SOFTWARE (fc3)\r\n"
+                f"{self.hostname} uptime is 1 week, 2 days, 3 hours, 4 minutes\r\n"
+                f"System image file is \"flash:packages.conf\"\r\n\r\n"
+                f"Switch Ports Model              SW Version        SW Image              Mode\r\n"
+                f"------ ----- -----              ----------        ----------            ----\r\n"
+                f"{members}\r\n")
+
+
+    def showSwitch(self):
+        rows = ""
+        for member in range(1, self.stack + 1):
+            star = "*" if member == 1 else " "
+            role = "Active" if member == 1 else ("Standby" if member == 2 else "Member")
+            rows = rows + f"{star}{member}       {role:<8} 0c75.bd11.{member:04x}     {16 - member}      V01     Ready\r\n"
+        return ("Switch/Stack Mac Address : 0c75.bd11.0001 - Local Mac Address\r\n"
+                "Mac persistency wait time: Indefinite\r\n"
+                "                                             H/W   Current\r\n"
+                "Switch#   Role    Mac Address     Priority Version  State\r\n"
+                "-------------------------------------------------------------\r\n"
+                f"{rows}")
+
+
+    def showRun(self, line):
+        if "|" not in line:
+            return "\r\n".join(self.config) + "\r\n"
+        pattern = line.split("|", 1)[1].strip()
+        pattern = pattern.split(None, 1)[1] if " " in pattern else ""      # Drops the "include" or "i"
+        regex = re.compile(pattern)
+        return "".join(entry + "\r\n" for entry in self.config if regex.search(entry))
+
+
+    def dir(self, line):
+        match = re.match(r"dir(?:\s+([\w-]+):(\S*))?(?:\s*\|\s*i(?:nclude)?\s+(\S+))?", line)
+        filesystem = match.group(1) or "flash"
+        filename = match.group(2) or ""
+        grep = match.group(3)
+        files = self.flash.get(filesystem, {})
+        if filename != "" and filename not in files:
+            return f"%Error opening {filesystem}:/{filename} (No such file or directory)\r\n"
+
+        lines = []
+        for i, (name, (size, _)) in enumerate(sorted(files.items())):
+            if filename != "" and name != filename:
+                continue
+            lines.append(f"{i + 10:>8}  -rw-  {size:>12}  Oct 17 2026 10:00:00 +00:00  {name}")
+        if grep is not None:
+            return "".join(entry + "\r\n" for entry in lines if grep in entry)
+        used = sum(size for size, _ in files.values())
+        return (f"Directory of {filesystem}:/\r\n\r\n" + "".join(entry + "\r\n" for entry in lines) +
+                f"\r\n11353194496 bytes total ({11353194496 - used} bytes free)\r\n")
+
+
+    def verify(self, line):
+        filesystem, filename = re.search(r"([\w-]+):/?(\S+)", line).groups()
+        if filename not in self.flash.get(filesystem, {}):
+            return f"%Error opening {filesystem}:/{filename} (No such file or directory)\r\n"
+        size, md5 = self.flash[filesystem][filename]
+        self.delay(size / self.options["md5_rate"])
+        return "." * 40 + f"Done!\r\nverify /md5 ({filesystem}:{filename}) = {md5}\r\n\r\n"
+
+
+    # copy <source> <filesystem>:<filename>, prompts for the destination filename and
+    # (for SCP) the password before the file shows up in flash
+    def copy(self, line, state):
+        source, destination = line.split()[1:3]
+        filesystem, filename = re.match(r"([\w-]+):/?(\S+)", destination).groups()
+        rate = self.options["transfer_rate"]
+        if source.startswith("flash") or "/flash:" in source:
+            rate = self.options["peer_rate"]
+
+        def finish(answer, state):
+            size, md5 = self.sourceFile(filename)
+            seconds = size / rate
+            self.delay(seconds)
+            self.flash.setdefault(filesystem, {})[filename] = (size, md5)
+            seconds = max(seconds * self.options["scale"], 0.001)
+            return f"Accessing {source}...!!!!!!!!!!\r\n{size} bytes copied in {round(seconds, 3)} secs ({int(size / seconds)} bytes/sec)\r\n", False
+
+        def password(answer, state):
+            state["pending"] = finish
+            return "Password: ", False
+
+        state["pending"] = password if source.startswith("scp://") else finish
+        return f"Destination filename [{filename}]? "
+
+
+    # Size and MD5 of the file being copied, the image every benchmark run uses
+    def sourceFile(self, filename):
+        for files in self.flash.values():
+            if filename in files:
+                return files[filename]
+        return IMAGE_SIZE, IMAGE_MD5
+
+
+    def delete(self, line, state):
+        filesystem, filename = re.search(r"([\w-]+):/?(\S+)", line).groups()
+
+        def remove(answer, state):
+            self.flash.get(filesystem, {}).pop(filename, None)
+            return "", False
+
+        if line.startswith("delete /force "):
+            return remove("", state)[0]
+
+        def confirm(answer, state):
+            state["pending"] = remove
+            return f"Delete {filesystem}:/{filename}? [confirm]", False
+
+        state["pending"] = confirm
+        return f"Delete filename [{filename}]? "
+
+
+    def install(self, line, state):
+        if line.startswith("install add file"):
+            filename = re.search(r"flash:/?(\S+)", line).group(1)
+            if filename not in self.flash["flash"]:
+                return f"FAILED: install_add : flash:{filename} does not exist\r\n", False
+            self.delay(self.options["install_seconds"])
+            self.staged = re.search(r"(\d+\.\d+\.\d+)", filename).group(1) if re.search(r"(\d+\.\d+\.\d+)", filename) else self.version
+            output = f"install_add: START\r\ninstall_add: Adding PACKAGE\r\n--- Starting initial file syncing ---\r\nFinished initial file syncing\r\nSUCCESS: install_add {filename}\r\n"
+            if "activate commit" not in line:
+                return output, False
+
+            def proceed(answer, state):         # BUNDLE one-shot install, the boot variable line is the first thing it prints
+                state["pending"] = reloadAnswer
+                return "This operation may require a reload of the system. Do you want to proceed? [y/n]", False
+            state["pending"] = proceed
+            return output + "Setting boot system flash:packages.conf\r\n", False
+
+        def reloadAnswer(answer, state):
+            if answer.lower() != "y":
+                return "", False
+            self.delay(self.options["activate_seconds"])
+            self.committed = False
+            return "install_activate: Activating PACKAGE\r\nSwitch 1 will reload the system\r\n", True
+
+        if line.startswith("install activate") or line.startswith("install abort"):
+            if line.startswith("install abort"):
+                self.staged = None
+            state["pending"] = reloadAnswer
+            return "install_activate: START\r\nThis operation may require a reload of the system. Do you want to proceed? [y/n]", False
+        if line.startswith("install commit"):
+            self.delay(10)
+            self.committed = True
+            return "install_commit: START\r\nSUCCESS: install_commit\r\n", False
+        if line.startswith("install remove inactive"):
+            def remove(answer, state):
+                self.delay(30)
+                return "SUCCESS: install_remove\r\n", False
+            state["pending"] = remove
+            return "install_remove: START\r\nDo you want to remove the above files? [y/n]", False
+        return "% Invalid input detected at '^' marker.\r\n", False
+
+
+
+IMAGE_SIZE = 699968920                                  # Size of a c9300 17.x .bin file
+IMAGE_MD5 = hashlib.md5(b"cat9k_iosxe.17.09.04.SPA.bin").hexdigest()
+
+
+
+# START FLEET
+# Function starts count fake switches on ports starting at basePort and returns them
+################################################################################
+def startFleet(count, basePort=22000, options=None, stack=1, mode="INSTALL"):
+    switches = []
+    for i in range(count):
+        switch = FakeSwitch(f"bench-sw{i:04}", basePort + i, mode=mode, stack=stack, options=options)
+        switch.start()
+        switches.append(switch)
+    return switches
+
+
+
+# STOP FLEET
+# Function stops every fake switch passed in
+################################################################################
+def stopFleet(switches):
+    for switch in switches:
+        switch.stop()
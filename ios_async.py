@@ -0,0 +1,368 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the asyncio transport, an alternative to netmiko for the long
+# running commands: the copies and "verify /md5" in the transfer, md5, and stackCopy
+# stages, the install add/activate (or one-shot install) in the upgrade stage, the
+# commit or abort in upgradeFinisher(), and removeInactive(). Over netmiko every one
+# of those ties up a netmiko session (along with paramiko's own transport thread)
+# per switch for as long as the copy or install takes, so a fleet of 5,000 switches
+# meant thousands of paramiko threads that were almost all just sitting in a
+# read_timeout. With "enabled" turned on in the "async_transport" section of
+# config.yaml, those commands are sent over asyncssh sessions instead, every one of
+# them living on a single event loop running on its own background thread (same idea
+# as the reboot detector in ios_reboot.py):
+#   - Every command is a list of steps, each step being what gets typed and the pattern
+#     the output is read until. These are the exact command_string/expect_string pairs
+#     the netmiko versions use, look at the dialogs at the bottom of the script
+#   - Pipeline stages hand a dialog to the loop through dialogTask() and wait on it, so
+#     a failed or timed out dialog raises NornirSubTaskError in the stage just like
+#     netmiko would, and the stage's retries and clean up work the same either way
+#   - No more than max_sessions switches are talked to at once, the rest wait their turn
+#   - Only the tail of a step's output is kept while it is being read (the "!!!!" of a
+#     copy can go on for megabytes), so memory stays flat no matter how big the fleet is
+# The short commands around them (dir, delete, write memory) stay on netmiko.
+# asyncssh only has to be installed if this is turned on: pip install asyncssh
+
+import asyncio
+import ios_flash                                        # Flash index, thrown out after removing inactive files
+from nornir.core.task import AggregatedResult, MultiResult, Result, Task
+import re
+import swan_logger                                      # Custom written logger script, every step is logged by AsyncSession.run()
+import threading
+
+try:
+    import asyncssh
+except ImportError:                                     # Only needed when the async transport is turned on
+    asyncssh = None
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+DEFAULTS = {
+    "enabled": False,                                   # netmiko is used unless this is turned on
+    "max_sessions": 1000,                               # Max number of switches talked to at once across the whole fleet
+    "connect_timeout": 30,                              # Seconds to wait on logging into a switch
+    "keepalive": 30,                                    # Seconds between SSH keepalives, keeps a session that is waiting on a long copy from being dropped
+    "read_timeout": 60,                                 # Seconds to wait on a step that doesn't set its own timeout
+    "buffer": 65536,                                    # Characters of a step's output kept around while it is being read
+}
+
+PROMPT = r"[>#]\s*$"                                    # Read until after logging in, the exact prompt is used from then on
+
+ENGINE = None                                           # Shared AsyncEngine, made the first time getEngine() is called
+ENGINE_LOCK = threading.Lock()
+
+
+
+# ASYNC OPTIONS
+# Function merges the "async_transport" section of config.yaml over the defaults above
+################################################################################
+def asyncOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("async_transport", {}) or {})
+    return options
+
+
+
+# ENABLED
+# Function returns True if the async transport is turned on in config.yaml. Exits
+# with an explanation if it is turned on but asyncssh isn't installed.
+################################################################################
+def enabled(nr):
+    if not asyncOptions(nr)["enabled"]:
+        return False
+    if asyncssh is None:
+        raise SystemExit("The async transport is turned on in config.yaml but asyncssh isn't installed, run \"pip install asyncssh\" or turn it off")
+    return True
+
+
+
+# STEP
+# Function builds a single step of a command. expect is the regex the output is
+# read until (None meaning the switch's prompt), and log is what gets written to
+# the log instead of the command (EX: for passwords). flag is passed straight to
+# swan_logger for commands that have more than one step.
+################################################################################
+def step(command, expect=None, timeout=None, log=None, flag=None):
+    return {"command": command, "expect": expect, "timeout": timeout, "log": command if log is None else log, "flag": flag}
+
+
+
+# ASYNC SESSION
+# A single CLI session to a switch over asyncssh, only ever used from the engine's
+# event loop
+################################################################################
+class AsyncSession:
+    def __init__(self, host, nr, options):
+        self.host = host
+        self.nornir = nr                                # Dialogs read and write the timing history through this
+        self.options = options
+        self.connection = None
+        self.process = None
+        self.prompt = None
+
+
+    async def open(self):
+        self.connection = await asyncio.wait_for(asyncssh.connect(self.host.hostname, port=self.host.port or 22, username=self.host.username,
+                                                                  password=self.host.password, known_hosts=None,
+                                                                  keepalive_interval=self.options["keepalive"]), self.options["connect_timeout"])
+        self.process = await self.connection.create_process(term_type="vt100", term_size=(511, 24), errors="replace")
+        output = await self.readUntil(PROMPT, self.options["connect_timeout"])
+        self.prompt = output.rstrip().splitlines()[-1].strip()  # EX: "SWITCH1#", same base prompt netmiko finds
+        for command in ["terminal length 0", "terminal width 511"]:
+            await self.send(command)
+
+
+    async def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            try:
+                await self.connection.wait_closed()
+            except Exception:                           # Switch already dropped the session (EX: it is reloading)
+                pass
+        self.connection = None
+        self.process = None
+
+
+    # Closes the session and logs back in, used after a step times out and leaves
+    # the session stuck in the middle of a command
+    async def reopen(self):
+        await self.close()
+        await self.open()
+
+
+    # Reads until the pattern shows up in the output, only ever holding on to the
+    # last "buffer" characters. Raises asyncio.TimeoutError if it never shows up.
+    async def readUntil(self, pattern, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        output = ""
+        while re.search(pattern, output) is None:
+            try:
+                chunk = await asyncio.wait_for(self.process.stdout.read(4096), max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"Pattern not detected: {pattern!r} in output within {timeout} seconds") from None
+            if chunk == "":
+                raise ConnectionError(f"{self.host.name} closed the session while waiting for {pattern!r}")
+            output = (output + chunk)[-self.options["buffer"]:]
+        return output
+
+
+    # Types a single command and returns its output, same as netmiko_send_command
+    # with the expect_string and read_timeout of the step
+    async def send(self, command, expect=None, timeout=None):
+        if expect is None:
+            expect = re.escape(self.prompt) if self.prompt is not None else PROMPT
+        self.process.stdin.write(command + "\n")
+        return await self.readUntil(expect, timeout or self.options["read_timeout"])
+
+
+    # Runs every step in order, logging each one. Returns the output of the last step.
+    async def run(self, steps):
+        output = ""
+        for element in steps:
+            output = await self.send(element["command"], element["expect"], element["timeout"])
+            swan_logger.logger(self.host.name, element["log"], output, element["flag"])
+        return output
+
+
+
+# ASYNC ENGINE
+# Owns the background event loop every session lives on
+################################################################################
+class AsyncEngine:
+    def __init__(self, options):
+        self.options = options
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-transport", daemon=True)
+        self.thread.start()
+        self.semaphore = None                           # Made on the loop the first time it is needed
+
+
+    # Coroutine that logs into the host and runs the dialog on it once there is room
+    # under max_sessions. Always returns a Result, failed if anything went wrong.
+    async def runHost(self, host, nr, dialog, kwargs):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.options["max_sessions"])
+        async with self.semaphore:
+            session = AsyncSession(host, nr, self.options)
+            try:
+                await session.open()
+                return Result(host=host, result=await dialog(session, **kwargs))
+            except Exception as error:
+                return Result(host=host, result=f"{type(error).__name__}: {error}", failed=True, exception=error)
+            finally:
+                await session.close()
+
+
+    # Starts running a dialog on a host, returns a concurrent.futures.Future holding its Result
+    def submit(self, host, nr, dialog, kwargs):
+        return asyncio.run_coroutine_threadsafe(self.runHost(host, nr, dialog, kwargs), self.loop)
+
+
+
+# GET ENGINE
+# Function returns the shared engine, starting it the first time it is needed
+################################################################################
+def getEngine(nr):
+    global ENGINE
+    with ENGINE_LOCK:
+        if ENGINE is None:
+            ENGINE = AsyncEngine(asyncOptions(nr))
+    return ENGINE
+
+
+
+# RUN DIALOG
+# Function runs a dialog (one of the coroutines below) on every host in the Nornir
+# object at once and waits for all of them to finish
+################################################################################
+def runDialog(nr, dialog, name=None, **kwargs):
+    """
+    Runs a dialog on every host in a Nornir object over the async transport.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object.
+    dialog : function
+        Coroutine called as dialog(session, **kwargs) with an open AsyncSession,
+        whatever it returns is the host's result.
+    name : string, optional
+        Name of the returned AggregatedResult, defaults to the dialog's name.
+
+    Returns
+    -------
+    AggregatedResult
+        Same shape nr.run() returns, so the output can be checked the same way.
+        Every step has already been logged.
+    """
+    engine = getEngine(nr)
+    name = name or dialog.__name__
+    futures = {}
+    for hostname, host in nr.inventory.hosts.items():
+        futures[hostname] = engine.submit(host, nr, dialog, kwargs)
+
+    output = AggregatedResult(name)
+    for hostname, future in futures.items():
+        multiResult = MultiResult(name)
+        multiResult.append(future.result())
+        output[hostname] = multiResult
+    return output
+
+
+
+# DIALOG TASK
+# Nornir task that runs a single dialog on the host over the async transport and
+# blocks until it is done. A failed dialog fails the task, so task.run() raises
+# NornirSubTaskError the same way a netmiko_send_command that timed out would.
+################################################################################
+def dialogTask(task: Task, dialog, **kwargs) -> Result:
+    result = getEngine(task.nornir).submit(task.host, task.nornir, dialog, kwargs).result()
+    return Result(host=task.host, result=result.result, failed=result.failed, exception=result.exception)
+
+
+
+# CHECK DIALOG
+# Function prints out every host a dialog failed on and why. Returns 1 if any host
+# failed, otherwise returns 0.
+################################################################################
+def checkDialog(output):
+    flag = 0
+    for hostname in output:
+        if output[hostname].failed:
+            flag = 1
+            print(f"{RED}{hostname}{CLEAR} failed: {output[hostname].result}")
+    return flag
+
+
+
+# COPY DIALOG
+# Async version of the copy in copyFromSource() and memberCopyTask() from
+# ios_stages.py, a password of None meaning a copy that goes straight into the
+# transfer after the destination filename (HTTP(S) or flash to flash)
+################################################################################
+async def copyDialog(session, command, password, timeout):
+    steps = [step(command, r"Destination filename", 60, flag="STARTCOMMAND")]
+    if password is None:
+        steps.append(step("", r"copied", timeout, flag="ENDCOMMAND"))
+    else:
+        steps.append(step("", r"Password", 5, flag="CONTINUECOMMAND"))
+        steps.append(step(password, r"copied", timeout, log="***DO NOT ACTUALY LOG PASSWORD***", flag="ENDCOMMAND"))
+    return await session.run(steps)
+
+
+
+# MD5 DIALOG
+# Async version of the "verify /md5" in md5Task() from ios_stages.py
+################################################################################
+async def md5Dialog(session, filename, timeout):
+    return await session.run([step("verify /md5 flash:" + filename, timeout=timeout)])
+
+
+
+# INSTALL ADD DIALOG
+# Async version of the install add in upgradeInstallTask() from ios_stages.py
+################################################################################
+async def installAddDialog(session, filename):
+    return await session.run([step("install add file flash:" + filename, timeout=600)])
+
+
+
+# ACTIVATE DIALOG
+# Async version of the install activate in upgradeInstallTask() from ios_stages.py
+################################################################################
+async def activateDialog(session):
+    return await session.run([
+        step("install activate", r"want to proceed", 600, flag="STARTCOMMAND"),
+        step("y", r"will reload the system", 600, flag="ENDCOMMAND"),
+    ])
+
+
+
+# BUNDLE DIALOG
+# Async version of the one-shot install command in upgradeBundleTask() from ios_stages.py
+################################################################################
+async def bundleDialog(session, filename):
+    return await session.run([
+        step(f"install add file flash:{filename} activate commit", r"flash:packages.conf", 600, flag="STARTCOMMAND"),
+        step("y", r"want to proceed", 600, log="", flag="CONTINUECOMMAND"),
+        step("y", r"", 600, log="", flag="ENDCOMMAND"),
+    ])
+
+
+
+# COMMIT DIALOG
+# Async version of the commit in upgradeFinisher()
+################################################################################
+async def commitDialog(session):
+    return await session.run([step("install commit", r"SUCCESS", 600)])
+
+
+
+# ABORT DIALOG
+# Async version of the abort in upgradeFinisher()
+################################################################################
+async def abortDialog(session):
+    return await session.run([
+        step("install abort", r"want to proceed", 600, flag="STARTCOMMAND"),
+        step("y", r"will reload the system", 600, log="install abort", flag="ENDCOMMAND"),
+    ])
+
+
+
+# REMOVE INACTIVE DIALOG
+# Async version of removeInactive(), saves the config once the files are gone
+################################################################################
+async def removeInactiveDialog(session):
+    ios_flash.forget([session.host.name])
+    output = await session.run([
+        step("install remove inactive", r"Do you want to remove the above files", 300, flag="STARTCOMMAND"),
+        step("y", r"SUCCESS: install_remove", 300, log="install remove inactive", flag="ENDCOMMAND"),
+    ])
+    await session.run([step("write memory", timeout=120)])
+    return output
@@ -0,0 +1,123 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the on-disk facts cache used by ios_facts.gatherFacts(). Every
+# time facts are gathered off of a switch they get saved into a small SQLite database
+# (swan_cache.db in the directory the script is ran from), keyed by the switch's name
+# in hosts.yaml. Re-running any of the scripts shortly after a dry run pulls the facts
+# out of the cache instead of polling every switch again. Every entry expires after a
+# configurable TTL, and any step that changes a switch (downloading a file, installing,
+# removing inactive files, changing config) throws that switch's entry out right away.
+# Both the path and TTL are set in the "facts_cache" section of config.yaml.
+
+import json
+import os
+import sqlite3
+import time
+
+
+DEFAULT_PATH = "swan_cache.db"                          # Relative to the directory the script is being ran from
+DEFAULT_TTL = 900                                       # 15 minutes
+
+
+
+# OPEN DATABASE
+# Function opens (and creates if needed) the SQLite database the cache lives in.
+# A new connection is made on every call so it is safe to use from any of the
+# Nornir worker threads. Other scripts keep their own tables in the same database.
+################################################################################
+def openDatabase(nr):
+    options = nr.config.user_defined.get("facts_cache", {}) or {}
+    path = os.path.join(os.getcwd(), options.get("path", DEFAULT_PATH))
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS facts (host TEXT PRIMARY KEY, address TEXT, collected REAL, data TEXT)")
+    return conn
+
+
+
+# CACHE TTL
+# Function returns how many seconds a cache entry is good for, 0 turns the cache off
+################################################################################
+def cacheTTL(nr):
+    options = nr.config.user_defined.get("facts_cache", {}) or {}
+    return options.get("ttl", DEFAULT_TTL)
+
+
+
+# CACHED FACTS
+# Function returns the cached facts of every host in the Nornir object that has
+# an entry younger than the TTL, or any entry at all for the trusted hosts
+################################################################################
+def cachedFacts(nr, trusted=()):
+    """
+    Looks up every host of a Nornir object in the facts cache.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object.
+    trusted : list, optional
+        Inventory names of hosts whose entry is used no matter how old it is,
+        used when a run is resumed (look at ios_journal.py).
+
+    Returns
+    -------
+    dict
+        Inventory name -> facts dictionary, only for hosts with a fresh entry.
+    """
+    ttl = cacheTTL(nr)
+    facts = {}
+    if not ttl:
+        return facts
+
+    conn = openDatabase(nr)
+    try:
+        for hostname, host in nr.inventory.hosts.items():
+            row = conn.execute("SELECT address, collected, data FROM facts WHERE host = ?", (hostname,)).fetchone()
+            if row is None:
+                continue
+            address, collected, data = row
+            if address == host.hostname and (hostname in trusted or time.time() - collected < ttl): # Entry is thrown out if the host's address changed in hosts.yaml
+                facts[hostname] = json.loads(data)
+    finally:
+        conn.close()
+    return facts
+
+
+
+# STORE FACTS
+# Function saves freshly gathered facts into the cache
+################################################################################
+def storeFacts(nr, facts):
+    if not cacheTTL(nr):
+        return
+
+    conn = openDatabase(nr)
+    try:
+        with conn:                                      # Commits on the way out
+            for hostname in facts:
+                host = nr.inventory.hosts[hostname]
+                conn.execute("INSERT OR REPLACE INTO facts (host, address, collected, data) VALUES (?, ?, ?, ?)",
+                             (hostname, host.hostname, facts[hostname]["collected"], json.dumps(facts[hostname])))
+    finally:
+        conn.close()
+
+
+
+# INVALIDATE
+# Function throws out the cached facts of the passed hosts (or every host in the
+# Nornir object if no hosts are passed). Called before anything that changes the
+# state of a switch.
+################################################################################
+def invalidate(nr, hostnames=None):
+    if hostnames is None:
+        hostnames = list(nr.inventory.hosts.keys())
+    if len(hostnames) == 0:
+        return
+
+    conn = openDatabase(nr)
+    try:
+        with conn:
+            conn.executemany("DELETE FROM facts WHERE host = ?", [(hostname,) for hostname in hostnames])
+    finally:
+        conn.close()
@@ -0,0 +1,270 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the connection manager every script opens its switch sessions
+# through. The INSTALL and BUNDLE scripts used to build a brand new Nornir object
+# (re-reading the whole inventory and pulling the credentials back out of the old
+# one with credentialGrabber()) after the reboot, since the sessions on the old one
+# were dead and Nornir would happily hand them out again. Now a single Nornir object
+# lasts the whole run, and the manager sits on top of the Nornir connection plugins:
+#   - A session that has been sitting unused for a while is health checked (netmiko's
+#     and NAPALM's is_alive()) before it is handed out, and a dead one is thrown out
+#   - Opening a session that fails (switch still booting, VTY lines full, etc.) is
+#     tried again with exponential backoff before giving up
+#   - No more than max_sessions sessions are ever open to a single switch. Opening
+#     one more closes the least recently used idle session, or waits for one to free
+#     up if every session is in use. A thread that already holds one of the switch's
+#     sessions (EX: a pipeline stage opening NAPALM inside of its netmiko slot) never
+#     waits on itself, it goes over the cap instead of deadlocking
+# Every setting can be changed in the "connections" section of config.yaml.
+
+from contextlib import contextmanager
+from nornir.core.task import Result, Task
+import random
+import threading
+import time
+
+
+DEFAULTS = {
+    "max_sessions": 2,                                  # Max number of sessions (netmiko, progress monitor, NAPALM) open to a single switch at once
+    "check_after": 30,                                  # Seconds a session can sit unused before it is health checked before being handed out again
+    "retries": 3,                                       # How many times opening a session is tried again before giving up
+    "backoff": 2,                                       # Seconds waited before the first retry, doubled on every retry after
+    "max_backoff": 30,                                  # Longest wait between two retries
+}
+
+MANAGER = None                                          # Shared ConnectionManager, made the first time getManager() is called
+MANAGER_LOCK = threading.Lock()
+
+
+
+# CONNECTION OPTIONS
+# Function merges the "connections" section of config.yaml over the defaults above.
+# Takes the Nornir config (nr.config or task.nornir.config) since the manager is
+# mostly called with a host and not a whole Nornir object.
+################################################################################
+def connectionOptions(configuration):
+    options = dict(DEFAULTS)
+    options.update(configuration.user_defined.get("connections", {}) or {})
+    return options
+
+
+
+# IS ALIVE
+# Function returns True if the session can still talk to the switch. netmiko returns
+# a bool while NAPALM returns {"is_alive": bool}.
+################################################################################
+def isAlive(connection):
+    try:
+        alive = connection.is_alive()
+    except Exception:                                   # Socket was already closed out from under the session
+        return False
+    if isinstance(alive, dict):
+        return bool(alive.get("is_alive", False))
+    return bool(alive)
+
+
+
+# CONNECTION MANAGER
+# Keeps track of which sessions are in use and when every session was last handed
+# out. Shared between every host's worker thread, the progress monitor, and the
+# reboot detector.
+################################################################################
+class ConnectionManager:
+    def __init__(self, options):
+        self.options = options
+        self.condition = threading.Condition()
+        self.busy = {}                                  # (hostname, connection name) -> number of callers using the session
+        self.used = {}                                  # (hostname, connection name) -> time the session was last handed out
+        self.holders = {}                               # Hostname -> {thread id: number of sessions that thread is using}
+
+
+    # Every session the host has open or has been promised. Called with the condition held.
+    def slots(self, host):
+        names = set(host.connections)
+        for (hostname, name), count in self.busy.items():
+            if hostname == host.name and count > 0:
+                names.add(name)
+        return names
+
+
+    # Closes the least recently used idle session until there is room for one more.
+    # Returns False if wait is False and every session is in use. Called with the
+    # condition held.
+    def makeRoom(self, host, name, wait):
+        while True:
+            names = self.slots(host)
+            if name in names or len(names) < self.options["max_sessions"]:
+                return True
+            idle = [other for other in host.connections if self.busy.get((host.name, other), 0) == 0]
+            if len(idle) != 0:
+                evict(host, min(idle, key=lambda other: self.used.get((host.name, other), 0)))
+                continue
+            if not wait:
+                return False
+            self.condition.wait()
+
+
+    # Marks the session as in use, making room for it first. Returns False without
+    # marking anything if wait is False and the switch is already at its cap. A
+    # thread already using one of the host's sessions is let through either way,
+    # since every session it would be waiting on is its own.
+    def acquire(self, host, name, wait=True):
+        key = (host.name, name)
+        thread = threading.get_ident()
+        with self.condition:
+            holders = self.holders.setdefault(host.name, {})
+            nested = holders.get(thread, 0) > 0
+            if not self.makeRoom(host, name, wait and not nested) and not nested:
+                return False
+            self.busy[key] = self.busy.get(key, 0) + 1
+            holders[thread] = holders.get(thread, 0) + 1
+        return True
+
+
+    def release(self, host, name):
+        key = (host.name, name)
+        thread = threading.get_ident()
+        with self.condition:
+            holders = self.holders.get(host.name, {})
+            if holders.get(thread, 0) <= 1:
+                holders.pop(thread, None)
+            else:
+                holders[thread] = holders[thread] - 1
+            self.busy[key] = max(0, self.busy.get(key, 0) - 1)
+            self.used[key] = time.time()
+            self.condition.notify_all()
+
+
+    # Returns a working session, health checking an existing one that has been
+    # unused for a while and (re)opening it with backoff if it is missing or dead
+    def ensure(self, host, name, configuration, retries=None):
+        key = (host.name, name)
+        if name in host.connections:
+            connection = host.connections[name].connection
+            if time.time() - self.used.get(key, 0) < self.options["check_after"] or isAlive(connection):
+                self.used[key] = time.time()
+                return connection
+            evict(host, name)                           # Dead session left over from a reboot or an idle timeout
+
+        if retries is None:
+            retries = self.options["retries"]
+        attempt = 0
+        while True:
+            try:
+                connection = host.get_connection(name, configuration)
+                self.used[key] = time.time()
+                return connection
+            except Exception:
+                evict(host, name)                       # Nornir keeps the half opened session around otherwise
+                if attempt >= retries:
+                    raise
+            delay = min(self.options["max_backoff"], self.options["backoff"] * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1))  # Jittered so a whole site coming back doesn't log in at the same instant
+            attempt = attempt + 1
+
+
+
+# GET MANAGER
+# Function returns the shared manager, making it the first time it is needed
+################################################################################
+def getManager(configuration):
+    global MANAGER
+    with MANAGER_LOCK:
+        if MANAGER is None:
+            MANAGER = ConnectionManager(connectionOptions(configuration))
+    return MANAGER
+
+
+
+# SESSION
+# Hands out a healthy session for the length of the with block. Nothing else can
+# close it for room while it is in use.
+################################################################################
+@contextmanager
+def session(host, name, configuration, check=True, wait=True, retries=None):
+    """
+    Borrows one of a host's sessions for the length of a with block.
+
+    Parameters
+    ----------
+    host : Host
+        The Nornir host (task.host or nr.inventory.hosts[name]).
+    name : string
+        Name of the connection plugin (EX: "netmiko", "napalm").
+    configuration : Config
+        The Nornir config (nr.config or task.nornir.config).
+    check : bool, optional
+        Opens or health checks the session right away if True. If False the slot
+        is only held, and whatever runs inside of the block opens it as needed.
+    wait : bool, optional
+        Waits for a free slot if True, otherwise yields None right away when the
+        host already has max_sessions sessions in use.
+    retries : int, optional
+        How many times opening the session is tried again, defaults to the
+        "retries" setting in config.yaml.
+    """
+    manager = getManager(configuration)
+    if not manager.acquire(host, name, wait):
+        yield None
+        return
+    try:
+        connection = None
+        if check:
+            connection = manager.ensure(host, name, configuration, retries)
+        yield connection
+    finally:
+        manager.release(host, name)
+
+
+
+# CONNECT
+# Function opens (or health checks) a host's session and returns it without holding
+# on to it. Same as host.get_connection(), only with the manager's checks.
+################################################################################
+def connect(host, name, configuration, retries=None):
+    manager = getManager(configuration)
+    manager.acquire(host, name)
+    try:
+        return manager.ensure(host, name, configuration, retries)
+    finally:
+        manager.release(host, name)
+
+
+
+# EVICT
+# Function closes one of a host's sessions (or every session if name is None). A
+# session that errors out while closing (it usually already died) is still thrown out.
+################################################################################
+def evict(host, name=None):
+    names = list(host.connections) if name is None else [name]
+    for element in names:
+        if element not in host.connections:
+            continue
+        try:
+            host.close_connection(element)
+        except Exception:
+            host.connections.pop(element, None)
+
+
+
+# REFRESH TASK
+# Nornir task that throws out every dead session the host has and makes sure its
+# netmiko session is working, used after the switches come back from a reboot
+################################################################################
+def refreshTask(task: Task) -> Result:
+    for name in list(task.host.connections):
+        if not isAlive(task.host.connections[name].connection):
+            evict(task.host, name)
+    connect(task.host, "netmiko", task.nornir.config)
+    return Result(host=task.host, result=sorted(task.host.connections))
+
+
+
+# REFRESH
+# Function runs refreshTask() against every host in the Nornir object and returns a
+# list of the hosts that could not be reconnected to
+################################################################################
+def refresh(nr):
+    output = nr.run(task=refreshTask)
+    return [hostname for hostname in output if output[hostname].failed]
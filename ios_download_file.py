@@ -1,32 +1,38 @@
 # Script by: DarkSplash
-# Last edited: 02/27/2023
+# Last edited: 10/17/2026
 
 # This script is designed ONLY to download a file on an IOS or IOS-XE switch,
 # although it may work on other models. Almost all of the functions used in this
 # script are pullled from the INSTALL script. Currently the script looks for a
 # file located somewhere in a specified fileserver directory and downloads it 
-# while providing you with a download percent every 10 seconds. Additionially,
+# while providing you with a download percent, speed, and ETA for every switch
+# (look at ios_progress.py). Additionially,
 # it also ignores the IOSVersion variable in ios_file_data.py.
 
 from datetime import datetime
 import getpass
 import ios_upgrade_INSTALL                              # Copying most functions from INSTALL script, BUNDLE will break on gathering switch data thanks to other variables not in this script
+import ios_fanout                                       # Peer-to-peer fan-out, one switch per site pulls the file and the rest copy from it
+import ios_facts                                        # Gathers every pre-flight fact over one session per switch
 import ios_file_data
+import ios_http_server                                  # Optional built-in HTTP(S) image server, look at startServer()
+import ios_mirrors                                      # Mirror selection, each switch pulls from its fastest file server
+import ios_pipeline                                     # Per-host pipeline engine, look at runPipeline() or script for more details
+import ios_progress                                     # Download progress monitor, one lightweight session per downloading switch
+import ios_runner                                       # Registers the "swan" runner plugin set in config.yaml, has to be imported before InitNornir()
+import ios_stages                                       # Per-host versions of the INSTALL functions that get chained in the pipeline
+import ios_timing                                       # Per-host, per-phase timing, a report is written when the script exits
+import ios_transfers                                    # Bandwidth-aware transfer scheduler, caps concurrent copies per file server and site
 import logging
 from nornir import InitNornir
-from nornir.core.filter import F
-from nornir_netmiko.tasks import netmiko_send_command
 from nornir_netmiko.tasks import netmiko_save_config
 import swan_logger                                      # Custom written logger script, look at commandLogger() or script for more details
-import threading                                        # Searches for # of switches in a stack, which uses slightly differnt variables and printFormatter()
-import os, signal, sys
 
 
 # Packageless Terminal Colors: https://stackoverflow.com/a/21786287
 RED = "\x1b[1;31;40m"
 GREEN = "\x1b[1;32;40m"
 CLEAR = "\x1b[0m"
-FLAG = False                                            # Flag to determine when download has started in downloadPercentage() thread
 
 
 
@@ -51,6 +57,8 @@ def newIOSData():
 
         print(f"\nNew Fileserver IP: {newFileServerIP}")
         print(f"New Fileserver Path: {newFileServerPath}")
+        for mirror in ios_mirrors.mirrorList(newFileServerIP, newFileServerPath)[1:]:
+            print(f"Mirror: {mirror['ip']}//{mirror['path']}")
         print(f"New IOS File: {newIOSFile}")
         print(f"New IOS MD5: {newIOSMD5}")
         print(f"New IOS Size: {newIOSSize}")
@@ -80,71 +88,16 @@ def nornir_set_creds(nr, username=None, password=None):
         host_obj.password = password
 
 
-# Grabbed because it is required in downloadPercentage()
-def credentialGrabber(nr):
-    username = ""                                       # Grabbing username and password so every recreation of the
-    password = ""                                       # Nornir object doesn't prompt you for credentials
-    for host in nr.inventory.hosts.values():
-            username = host.username
-            password = host.password
-            break
-    return username, password
-
-
 # Removed INSTALL/BUNDLE filter so this works on all switches
-def nornirInit(configFile, username=None, password=None):
+def nornirInit(configFile):
     nr = InitNornir(config_file=configFile)             # Initializing Nornir object
-    
-    if username is not None and password is not None:   # Portion of code for re-initializing nornir object, look at checkAliveReboot2() for more info
-        nornir_set_creds(nr, username, password)
-    else:
-        nornir_set_creds(nr)
+    nornir_set_creds(nr)
     
     print()
     return nr
 
 
 
-def killScript(nr, nr2, thread):
-    nr.close_connections()                                  # Closing both nornir objects
-    nr2.close_connections()
-    thread.set()                                            # Stopping download thread
-
-    if sys.platform == 'win32':
-        os.kill(os.getpid(), signal.SIGBREAK)               # Literally the only method I found to have the script exit
-    else:
-        os.kill(os.getpid(), signal.SIGKILL)                # If you're not on windows
-
-
-# Pretty much pilfered entirely from: https://stackoverflow.com/a/2223182
-def downloadPercentage(nr, filename, filesize, thread, configFile, nr2):
-    command = f"dir | i {filename}"
-
-    try:
-        output = nr.run(netmiko_send_command, command_string=command, read_timeout=15)
-        for hostname in output:
-            result = output[hostname].result
-            if result == "" and FLAG:                       # FLAG will only be set to true if download process has started 
-                print(f"\n{RED}File not found/download did not start, you likely mistyped your username or password{CLEAR}")
-                print("Exiting script")
-                killScript(nr, nr2, thread)
-            
-            temp = output[hostname].result.split()          # Third element (index 2) contains bytes downloaded
-            percent = round(100*(int(temp[2])/filesize), 1) # Taking the current bytes downloaded and finding what percent the download is at
-            
-            if percent == 100.0:
-                print(f"{GREEN}{hostname}{CLEAR} - {percent}% downloaded")
-            else:
-                print(f"{hostname} - {percent}% downloaded")
-        print()
-    except IndexError:                                      # Catching inital index error that is thrown once
-        pass
-
-    if not thread.is_set():                                 # If the thread hasnt been started, start every 10 seconds
-        threading.Timer(10, downloadPercentage, [nr, filename, filesize, thread, configFile, nr2]).start()
-
-
-
 # READ TIMEOUT ESTIMATE
 # Function returns an int that represents how many seconds netmiko will wait
 # to see a certain string.  This function assumes an abysmal speed of 
@@ -156,47 +109,6 @@ def readTimeoutEstimate(filesize):
 
 
 
-# SCP IOS BIN
-# Custom SCP IOS BIN function with super long timeout for downloads
-################################################################################
-def scpIOSBin(nr, ipAddress, folderPath, filename, filesize, missingFile):
-    global FLAG
-
-    filter = nr.filter(F(name__in=missingFile))         # name__in filters by a list of hostnames, filter object is only switches that are missing the requested file
-
-    fileUsername = input(f"Enter file server ({ipAddress}) username: ")
-    filePassword = getpass.getpass()
-
-    tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when download started
-    print(f"\nBeginning SCP transfer... - {tempTime}")
-    
-    command = f"copy scp://{fileUsername}@{ipAddress}//{folderPath}/{filename} flash:/{filename}"
-    output = filter.run(netmiko_send_command, command_string=command, expect_string=r'Destination filename', read_timeout=60)
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
-
-    output2 = filter.run(netmiko_send_command, command_string="", expect_string=r"Password", read_timeout=5)    # I have no idea why I need to pass a blank string before the password nor why you need a 5 second timeout delay, but you do
-    swan_logger.commandLogger("", output2, "CONTINUECOMMAND")
-    
-    nornirLogger = logging.getLogger("nornir.core")
-    nornirLogger.disabled = True
-    FLAG = True
-    output3 = filter.run(netmiko_send_command, command_string=filePassword, expect_string=r"copied", read_timeout=readTimeoutEstimate(filesize), cmd_verify=False)
-    swan_logger.commandLogger("***DO NOT ACTUALY LOG PASSWORD***", output3, "ENDCOMMAND")
-    nornirLogger.disabled = False
-
-    print("Transfer completed!\n")
-    
-    for hostname in output3:
-        result = output3[hostname].result               # Grabbing string containing how much time the transfer took
-        x = result.find("copied in") + 10               # Getting starting string index of transfer time & speed 
-        duration = result[x:]
-        y = duration.find("/sec)") + 5                  # Getting ending string index of transfer time & speed
-        duration = duration[:y]
-        print(f"{GREEN}{hostname}{CLEAR} took {duration} to transfer {filename}")
-    print()
-
-
-
 # MAIN - Copied from INSTALL, but all INSTALL only functions have been removed
 ################################################################################
 def main():
@@ -205,41 +117,30 @@ def main():
     ################################################################################
     newFileServerIP, newFileServerPath, newIOSFile, newIOSMD5, newIOSSize = newIOSData() #Function populating new IOS file info
     
-    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit to (re)create the nr object a few times
+    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit
     nr = nornirInit(configFile)                         # Slightly modified nornirInit, does not filter by INSTALL or BUNDLE
+    ios_timing.startRun(nr, "download")                 # Every phase of every switch is timed from here on out
     swan_logger.commandLogger("", nr.inventory.hosts.keys(), "STARTLOG")
     ################################################################################
     #                              9000 CONFIGURATION                              #
     ################################################################################  
-    if ios_upgrade_INSTALL.checkAlive(nr) == 1:         # Function only returns 1 if one or more switches are offline
-        print(f"List of all hosts offline: {nr.data.failed_hosts}")
+    print("\nGathering switch data...")
+    print("################################################################################\n")
+    facts, offline = ios_facts.gatherFacts(nr)          # One session per switch for everything below, doubles as the check that every switch is online
+    if len(offline) != 0:
+        print(f"List of all hosts offline: {offline}")
         print("\nExiting...")
         print("\nIf this failed on the first host in the inventory or you believe that")
         print("the host is alive, you may have mistyped your password")
         return
 
-    switches = []                                       # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes:
+    switches = ios_facts.factsToSwitches(facts)         # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes:
                                                         # [['hostname','XX.XX.XX', 8000000000], ['hostname2','XX.XX.YY', 7000000000]]
-    print("\nGathering switch data...")
-    print("################################################################################\n")
-    switchHostnames, temp = ios_upgrade_INSTALL.getSwitchData(nr)   # Using a whole bunch of getter methods to gather switch data, returns two arrays
-    switchIOSVersion = []
-    for version in temp:                                # Formatting the IOS versions once more, can never be too sure...
-        switchIOSVersion.append(ios_upgrade_INSTALL.versionFormatter(version))
-    switchFreeSpace = ios_upgrade_INSTALL.getFreeSpace(nr)
-
-    print("Formatting data...\n")                       # Formatting all of the data into the switches array that was explained above
-    for x in range(len(switchHostnames)):               # Using switchHostnames array length, but any of them should work as they should
-        tempList = []                                   # all be the same size and in the same order as the hosts.yaml file
-        tempList.append(switchHostnames[x])
-        tempList.append(switchIOSVersion[x])
-        tempList.append(switchFreeSpace[x])
-        switches.append(tempList)
+    missingFile = ios_facts.missingFile(facts, newIOSFile)  # List to hold all hostnames that do not have the new file
 
     ios_upgrade_INSTALL.printFormatter(switches, "xx.xx.xx")             # Prints out switch data formatted in table
     print(f"{len(switches)} Switches in list\n")
 
-    missingFile = ios_upgrade_INSTALL.missingFileChecker(nr, newIOSFile)    # Grabbing a list of switch hostnames that are missing the file
     if len(missingFile) == 0:                           # If all switches happen to have the specified file
         print("All switches have the new file in their flash\n")
         if ios_upgrade_INSTALL.MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
@@ -257,24 +158,39 @@ def main():
             answer = input("\nKnowing this, do you wish to start the transfer (yes or no)?\n")
             
             if "yes" in answer.lower():
+                fileUsername = input(f"Enter file server ({newFileServerIP}) username: ")
+                filePassword = getpass.getpass()
+
                 print("\n\nDownloading file...")
                 print("################################################################################")
                 
-                username, password = credentialGrabber(nr)              # User & Pass to automatically make downloadNR object
-                dlNR = nornirInit(configFile, username, password)       # Nornir object used ONLY for figuring out download percentage
-                downloadNR = dlNR.filter(F(name__in=missingFile))       # Filtering to only switches that need downloads
-                
-                downloadThread = threading.Event()      # Starting download thread
-                downloadPercentage(downloadNR, newIOSFile, newIOSSize, downloadThread, configFile, nr)
-                
-                scpIOSBin(nr, newFileServerIP, newFileServerPath, newIOSFile, newIOSSize, missingFile)  # Downloads file only on switches that are missing the file
-                downloadThread.set()                    # Stopping download thread
+                distributor = None
+                if ios_fanout.fanoutOptions(nr)["enabled"]:   # One switch per site pulls from the file server, the rest copy from a peer
+                    distributor = ios_fanout.PeerDistributor(nr, missingFile, newIOSMD5)
+
+                tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when download started
+                print(f"\nBeginning SCP transfer... - {tempTime}")
+                nornirLogger = logging.getLogger("nornir.core")
+                nornirLogger.disabled = True
+                stages = [                              # Download -> MD5, each switch verifying as soon as its own download is done
+                    ios_pipeline.stage("transfer", ios_stages.scpTask, hosts=missingFile, ipAddress=newFileServerIP, folderPath=newFileServerPath,
+                                       filename=newIOSFile, filesize=newIOSSize, fileUsername=fileUsername, filePassword=filePassword, readTimeout=readTimeoutEstimate(newIOSSize),
+                                       scheduler=ios_transfers.TransferScheduler(nr), mirrors=ios_mirrors.mirrorList(newFileServerIP, newFileServerPath, nr),
+                                       distributor=distributor),
+                    ios_pipeline.stage("md5", ios_stages.md5Task, hosts=missingFile, filename=newIOSFile, MD5=newIOSMD5, readTimeout=readTimeoutEstimate(newIOSSize)),
+                ]
+                ios_http_server.startServer(nr)         # Built-in image server, only started if it is turned on in config.yaml
+                monitor = ios_progress.ProgressMonitor(nr, missingFile, newIOSFile, newIOSSize)    # Samples every downloading switch on a single background thread
+                monitor.start()
+                output = ios_pipeline.runPipeline(nr, stages, name="download")
+                nornirLogger.disabled = False
+                ios_http_server.stopServer()
+                ios_fanout.cleanup(nr, distributor)     # Every copy is done, turning the sources' SCP servers back off
+                monitor.stop()                          # Stopping the progress monitor and closing its sessions
                 tempTime = datetime.now().strftime("%I:%M:%S %p")
-                print(f"Finished Download: {tempTime}")
+                print(f"\nFinished Download: {tempTime}")
 
-                print("Ensuring file was downloaded properly...\n")
-                ios_upgrade_INSTALL.missingFileChecker(nr, newIOSFile)                          # Checking to make sure file now exists
-                if ios_upgrade_INSTALL.MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
+                if ios_pipeline.checkPipeline(output) == 1:     # Function only returns 1 if a download or MD5 check failed, tells you which switch and why
                     print("Exiting...")
                     return
                 break
@@ -292,9 +208,11 @@ def main():
 
     swan_logger.commandLogger("", nr.inventory.hosts.keys(), "ENDLOG")
     nr.close_connections()
-    dlNR.close_connections()                            # Unsure if this will speed up the script exit, not able to test with a large number of switches
 
 
 
 if __name__ == "__main__":                              # Running main()
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        ios_timing.writeReport()                        # Timing report for however far the run got, look at ios_timing.py
\ No newline at end of file
@@ -0,0 +1,238 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the pre-flight fact gathering used by the INSTALL, BUNDLE, and
+# download scripts. It used to take a NAPALM connection for checkAlive(), a napalm_get
+# for getSwitchData(), and separate fleet-wide netmiko calls for getFreeSpace(),
+# bundleOrInstall(), checkAutoUpgrade(), getSwitchStack(), and missingFileChecker().
+# Now every switch runs a minimal set of five commands over a single netmiko session
+# and everything the scripts need is pulled out of those outputs into one dictionary
+# per switch (look at factsTask() for what is in it).
+
+import ios_cache                                        # On-disk facts cache, look at cachedFacts() or script for more details
+import ios_connections                                  # Connection manager, health checks the session before the facts are gathered
+import ios_flash                                        # Flash index, seeded with the "dir flash:" every switch already runs here
+import ios_parsers                                      # Every command's output is parsed in here, the functions below just turn the records into plain dictionaries for the cache
+import ios_pipeline                                     # Facts are gathered as a single pipeline stage
+import ios_timing                                       # Opening the session is timed on its own, look at factsTask()
+from nornir.core.filter import F
+from nornir.core.task import Task, Result
+from nornir_netmiko.tasks import netmiko_send_command
+import swan_logger                                      # Custom written logger script, look at taskLogger() or script for more details
+import time
+
+
+FACT_COMMANDS = {                                       # Every command ran to gather facts, all ran over the same session
+    "version": "show version",
+    "switch": "show switch",
+    "dir": "dir flash:",
+    "config": "show running-config | include ^software auto-upgrade|^boot system",
+    "romvar": "show romvar",
+}
+
+
+
+# PARSE VERSION
+# Function pulls the hostname, IOS version, boot mode, and number of switches in
+# the stack out of "show version" (look at ios_parsers.py)
+################################################################################
+def parseVersion(output):
+    info = ios_parsers.parseVersion(output)
+    return {"hostname": info.hostname, "version": info.version, "mode": info.mode, "stack": info.stack}
+
+
+
+# PARSE MEMBERS
+# Function builds the list of stack members out of "show switch", with each member's
+# model filled in from the table at the bottom of "show version". Falls back to the
+# show version table (or a single member 1) for a switch without "show switch".
+################################################################################
+def parseMembers(switchOutput, versionOutput):
+    info = ios_parsers.parseVersion(versionOutput)
+    models = {member.number: member.model for member in info.members}
+
+    members = []
+    for member in ios_parsers.parseSwitch(switchOutput):
+        members.append({"number": member.number, "role": member.role, "state": member.state,
+                        "model": models.get(member.number, ""), "active": member.active})
+    if len(members) == 0:
+        for member in info.members:
+            members.append({"number": member.number, "role": "Active" if member.active else "Member", "state": "Ready",
+                            "model": member.model, "active": member.active})
+    if len(members) == 0:
+        members.append({"number": 1, "role": "Active", "state": "Ready", "model": "", "active": True})
+    return {"members": members, "stack": len(members)}
+
+
+
+# PARSE DIR
+# Function pulls every file (with its size and date) along with the total and free
+# space in bytes out of "dir" (look at ios_flash.py)
+################################################################################
+def parseDir(output):
+    return ios_flash.parseListing(output)
+
+
+
+# PARSE CONFIG
+# Function checks the filtered running-config for "software auto-upgrade enable"
+# and any "boot system" lines (look at ios_parsers.py)
+################################################################################
+def parseConfig(output):
+    config = ios_parsers.parseConfig(output)
+    return {"autoUpgrade": config.autoUpgrade, "bootVar": config.bootVar}
+
+
+
+# PARSE ROMVAR
+# Function checks "show romvar" for a SWITCH_IGNORE_STARTUP_CFG register set to 1 on
+# any member of the stack. None if the switch doesn't show the register at all, so
+# whoever uses it can't tell if it is set or not.
+################################################################################
+def parseRomvar(output):
+    values = ios_parsers.parseRomvar(output).get("SWITCH_IGNORE_STARTUP_CFG")
+    if values is None:
+        return {"ignoreStartupCfg": None}
+    return {"ignoreStartupCfg": any(value != "0" for value in values)}
+
+
+
+# FACTS TASK
+# Nornir task that runs every command in FACT_COMMANDS over the host's single
+# netmiko session and returns one dictionary with everything the scripts need
+################################################################################
+def factsTask(task: Task, context=None) -> Result:
+    """
+    Gathers every pre-flight fact about a single switch over one session.
+
+    Returns
+    -------
+    Result
+        Result holding a dictionary with the keys:
+        hostname, version, mode, stack, members, files, totalSpace, freeSpace,
+        autoUpgrade, bootVar, ignoreStartupCfg, and collected (epoch time the
+        facts were gathered).
+        members is a list of {number, role, state, model, active} dictionaries,
+        one for every switch in the stack.
+    """
+    with ios_timing.span(task.host.name, "connect"):
+        ios_connections.connect(task.host, "netmiko", task.nornir.config)
+
+    outputs = {}
+    for key, command in FACT_COMMANDS.items():
+        output = task.run(task=netmiko_send_command, name=command, command_string=command)
+        swan_logger.taskLogger(task, command, output.result)
+        outputs[key] = output.result
+
+    facts = parseVersion(outputs["version"])
+    facts.update(parseMembers(outputs["switch"], outputs["version"]))
+    facts.update(parseDir(outputs["dir"]))
+    facts.update(parseConfig(outputs["config"]))
+    facts.update(parseRomvar(outputs["romvar"]))
+    facts["collected"] = time.time()
+
+    if facts["version"] == "":                          # Anything without a version string is not a switch this script can work with
+        return Result(host=task.host, result="Unable to find the IOS version in show version", failed=True)
+    ios_flash.seed(task.host.name, facts)
+    return Result(host=task.host, result=facts)
+
+
+
+# GATHER FACTS
+# Function runs factsTask() against every host as a single pipeline stage and
+# returns the facts of every host that succeeded, along with a list of every
+# host that failed (offline, bad credentials, etc.). Hosts with a fresh entry in
+# the facts cache (look at ios_cache.py) are not polled at all.
+################################################################################
+def gatherFacts(nr, useCache=True, trusted=()):
+    """
+    Gathers the pre-flight facts of every host in a Nornir object.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object.
+    useCache : bool, optional
+        Whether to pull facts out of the facts cache. By default this is True.
+    trusted : list, optional
+        Inventory names of hosts whose cached facts are used no matter how old
+        they are, used when a run is resumed. By default this is empty.
+
+    Returns
+    -------
+    dict
+        Inventory name -> facts dictionary, for every host that succeeded.
+    list
+        Inventory names of every host that failed.
+    """
+    facts = {}
+    if useCache:
+        facts = ios_cache.cachedFacts(nr, trusted)
+        facts = {hostname: data for hostname, data in facts.items() if "members" in data}  # Entries cached before stack members were gathered are polled again
+        for hostname in facts:
+            ios_flash.seed(hostname, facts[hostname])
+        if len(facts) != 0:
+            print(f"Using cached data for {len(facts)} switches (less than {ios_cache.cacheTTL(nr)} seconds old, or already gathered in the run being resumed)")
+
+    stale = [hostname for hostname in nr.inventory.hosts if hostname not in facts]
+    if len(stale) == 0:
+        print()
+        return facts, []
+
+    print(f"Gathering switch data from {len(stale)} switches (one session per switch)...")
+    output = ios_pipeline.runPipeline(nr.filter(F(name__in=stale)), [ios_pipeline.stage("facts", factsTask)], name="facts")
+    ios_pipeline.checkPipeline(output)
+
+    newFacts = {}
+    for hostname, context in ios_pipeline.pipelineContexts(output).items():
+        newFacts[hostname] = context["facts"]
+    ios_cache.storeFacts(nr, newFacts)
+    facts.update(newFacts)
+
+    failed = [hostname for hostname in output if hostname not in newFacts]
+    facts = {hostname: facts[hostname] for hostname in nr.inventory.hosts if hostname in facts}  # Back in hosts.yaml order
+    return facts, failed
+
+
+
+# FACTS TO SWITCHES
+# Function turns the facts into the switches array that printFormatter() and
+# checkFreeSpace() expect: [['hostname','XX.XX.XX', 8000000000], ...]
+# Stack size is added as a fourth element for the BUNDLE script.
+################################################################################
+def factsToSwitches(facts, stack=False):
+    switches = []
+    for hostname in facts:
+        element = [facts[hostname]["hostname"], facts[hostname]["version"], facts[hostname]["freeSpace"]]
+        if stack:
+            element.append(facts[hostname]["stack"])
+        switches.append(element)
+    return switches
+
+
+
+# STACK TARGETS
+# Function returns the flash of every stack member other than the one the session
+# is on (its flash is just "flash:"), skipping provisioned or removed members that
+# aren't actually there to copy to. The standby comes first since it is the member
+# that takes over if the active goes down, then the rest by member number.
+# EX: ["flash-2:", "flash-3:"]
+################################################################################
+def stackTargets(facts):
+    targets = []
+    for member in sorted(facts.get("members", []), key=lambda member: (member["role"] != "Standby", member["number"])):
+        if not member["active"] and member["state"] == "Ready":
+            targets.append(f"flash-{member['number']}:")
+    return targets
+
+
+
+# MISSING FILE
+# Function returns a list of every host whose flash does not have the exact file
+################################################################################
+def missingFile(facts, filename):
+    missing = []
+    for hostname in facts:
+        if filename not in facts[hostname]["files"]:
+            missing.append(hostname)
+    return missing
@@ -0,0 +1,176 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the peer-to-peer fan-out used by scpTask() when "fanout" is
+# turned on in config.yaml. Instead of every switch at a site pulling the ~700 MB
+# file across the WAN, a single switch per site (the seed) pulls it from the file
+# server and checks its MD5. The seed then has "ip scp server enable" turned on and
+# every other switch at the site copies the file from it over the LAN. Every switch
+# that finishes its copy and MD5 check becomes another source for the rest of its
+# site, so the copies fan out like a tree. A site is the "site" key in a host's (or
+# its groups') data (look at siteOf() in ios_timeouts.py), a switch without one pulls
+# the file from the file server on its own. In the INSTALL script every switch that
+# acted as a source waits in the "fanout" pipeline stage until the rest of its site is
+# done copying before it moves on to its upgrade. Waiting there doesn't hold a worker
+# (look at ios_runner.py). Once the pipeline is done, cleanup() removes "ip scp server
+# enable" again in a pass of its own (unless it was already configured before the
+# script ran).
+
+import ios_timeouts                                     # siteOf() lives here
+from nornir.core.filter import F
+from nornir.core.task import Task, Result
+from nornir_netmiko.tasks import netmiko_save_config
+from nornir_netmiko.tasks import netmiko_send_command
+from nornir_netmiko.tasks import netmiko_send_config
+import swan_logger                                      # Custom written logger script, look at taskLogger() or script for more details
+import threading
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+CLEAR = "\x1b[0m"
+
+DEFAULTS = {
+    "enabled": False,                                   # Fan-out is off unless turned on in config.yaml
+    "per_peer": 2,                                      # Max number of switches copying from a single peer at once
+}
+
+
+
+# FANOUT OPTIONS
+# Function merges the "fanout" section of config.yaml over the defaults above
+################################################################################
+def fanoutOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("fanout", {}) or {})
+    return options
+
+
+
+# PEER DISTRIBUTOR
+# Shared between every host's worker thread in the pipeline. Hands out which
+# switch at a site pulls from the file server (the seed) and which peer every
+# other switch at the site copies from.
+################################################################################
+class PeerDistributor:
+    def __init__(self, nr, hostnames, MD5):
+        self.nr = nr
+        self.MD5 = MD5
+        self.perPeer = fanoutOptions(nr)["per_peer"]
+        self.sites = {}                                 # Site -> {"remaining": set of hosts, "sources": [hosts], "seeding": bool}
+        self.load = {}                                  # Hostname -> number of switches currently copying from it
+        self.enabled = set()                            # Hosts that had "ip scp server enable" turned on by the script
+        self.condition = threading.Condition()
+        for hostname in hostnames:
+            site = self.siteOf(nr.inventory.hosts[hostname])
+            self.sites.setdefault(site, {"remaining": set(), "sources": [], "seeding": False})
+            self.sites[site]["remaining"].add(hostname)
+
+
+    # Site the host shares the file with, a host without a site is a site of its own
+    def siteOf(self, host):
+        site = ios_timeouts.siteOf(host)
+        if site == ios_timeouts.DEFAULT_SITE:
+            return (site, host.name)
+        return site
+
+
+    # Blocks until the host can start its copy. Returns None if the host should pull
+    # from the file server as its site's seed, or the Host object of the peer it
+    # should copy from otherwise.
+    def claim(self, host):
+        site = self.sites[self.siteOf(host)]
+        with self.condition:
+            while True:
+                for source in site["sources"]:
+                    if self.load[source] < self.perPeer:
+                        self.load[source] = self.load[source] + 1
+                        return self.nr.inventory.hosts[source]
+                if not site["seeding"] and len(site["sources"]) == 0:
+                    site["seeding"] = True              # Nobody at the site has the file or is getting it, this host is the seed
+                    return None
+                self.condition.wait()
+
+
+    # Called once the host's copy is done. A host that copied and verified the file
+    # becomes a source for the rest of its site.
+    def finish(self, host, peer, verified):
+        site = self.sites[self.siteOf(host)]
+        with self.condition:
+            if peer is None:
+                site["seeding"] = False
+            else:
+                self.load[peer.name] = self.load[peer.name] - 1
+            if verified:
+                site["sources"].append(host.name)
+                self.load[host.name] = 0
+            site["remaining"].discard(host.name)
+            self.condition.notify_all()
+
+
+    # Blocks until every host at the host's site has finished copying
+    def drain(self, host):
+        site = self.sites[self.siteOf(host)]
+        with self.condition:
+            while len(site["remaining"]) != 0:
+                self.condition.wait()
+
+
+
+# ENABLE SCP SERVER
+# Function turns on "ip scp server enable" so the host can act as a source for the
+# rest of its site, remembering if the script was the one that turned it on
+################################################################################
+def enableScpServer(task: Task, distributor):
+    command = "show running-config | include ^ip scp server enable"
+    output = task.run(task=netmiko_send_command, name=command, command_string=command)
+    swan_logger.taskLogger(task, command, output.result)
+    if "ip scp server enable" in output.result:
+        return
+
+    command = "ip scp server enable"
+    output = task.run(task=netmiko_send_config, config_commands=command)
+    swan_logger.taskLogger(task, command, output.result)
+    with distributor.condition:
+        distributor.enabled.add(task.host.name)
+
+
+
+# DRAIN TASK
+# Pipeline stage that goes after the MD5 check in the INSTALL script, holds every
+# source until the rest of its site has finished copying so a source never reboots
+# while a peer is still pulling the file off of it
+################################################################################
+def drainTask(task: Task, context, distributor) -> Result:
+    distributor.drain(task.host)
+    return Result(host=task.host, result=True)
+
+
+
+# DISABLE SCP SERVER TASK
+# Nornir task that removes "ip scp server enable", saving the config afterwards if
+# the switch already saved it with the SCP server on (EX: during its upgrade)
+################################################################################
+def disableScpServerTask(task: Task, save=False) -> Result:
+    command = "no ip scp server enable"
+    output = task.run(task=netmiko_send_config, config_commands=command)
+    swan_logger.taskLogger(task, command, output.result)
+    if save:
+        output = task.run(task=netmiko_save_config)
+        swan_logger.taskLogger(task, "write memory", output.result)
+    return Result(host=task.host, result=True)
+
+
+
+# CLEANUP
+# Function removes "ip scp server enable" from every switch the script turned it
+# on for, ran once the pipeline is done. Prints out every switch it couldn't
+# remove it from.
+################################################################################
+def cleanup(nr, distributor, save=False):
+    if distributor is None or len(distributor.enabled) == 0:
+        return
+    output = nr.filter(F(name__in=sorted(distributor.enabled))).run(task=disableScpServerTask, save=save)
+    for hostname in output:
+        if output[hostname].failed:
+            print(f"{RED}{hostname}{CLEAR} still has \"ip scp server enable\" configured, it will need to be removed by hand")
@@ -1,5 +1,5 @@
 # Script by: DarkSplash
-# Last edited: 02/24/2023
+# Last edited: 10/17/2026
 
 # This script holds data about the new IOS file to be downloaded.
 # The file can be located on any server that can SCP files to your switch.
@@ -8,6 +8,9 @@
 # IOSSize is how many bytes the new IOS bin file is. The Linux commands
 # ls -al or ll should be two easy ways of checking for file size.
 # md5sum {filename} is the Linux command on how to get the MD5 value.
+# Mirrors is an optional list of other file servers holding the exact same file,
+# each switch pulls from whichever server has been fastest for it (or its site) in
+# the past and moves on to the next one if a copy fails. Look at ios_mirrors.py.
 # Look at the README for more detailed instructions.
 
 # Example configuration:
@@ -17,6 +20,10 @@
 # IOSFile = "cat9k_iosxe.16.09.01.SPA.bin"      (file to download in FileServerPath directory)
 # IOSMD5 = "258fb60ca843a2db78d8dba5a9f64180"   (MD5 hash of file to download)
 # IOSSize = 699968920                           (File size in bytes)
+# Mirrors = [                                   (Optional, same file on other servers, same login as FileServerIP)
+#     {"ip": "10.20.0.50", "path": "srv/fileshare"},
+#     {"ip": "10.30.0.50", "path": "images/ios", "sites": ["west-campus"]},   (sites the mirror is local to, tried first before there is any history)
+# ]
 ################################################################################
 
 IOSVersion = ""
@@ -24,4 +31,5 @@ FileServerIP = ""
 FileServerPath = ""
 IOSFile = ""
 IOSMD5 = ""
-IOSSize = 0
\ No newline at end of file
+IOSSize = 0
+Mirrors = []
@@ -0,0 +1,193 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the flash index every file check goes through. The scripts used to
+# ask the switch every single time they needed to know anything about its flash:
+# missingFileChecker() ran "dir | i file" and took any output at all as a match (so a
+# file named "test2" counted as "test"), getFreeSpace() ran its own "dir", copyIOSBin()
+# ran "dir flash-N: | i file" for every stack member, and md5Task() ran "dir flash:file"
+# before every hash. Now every host keeps one listing per filesystem (flash:, flash-2:,
+# etc.) with the exact name, size, and date of every file along with the total and free
+# bytes. A listing is built from a single "dir" the first time it is needed (flash: is
+# seeded straight from the facts, look at ios_facts.py), kept up to date by hand after
+# every copy or delete the scripts do, and thrown out when a switch installs or reboots.
+# Every file check after that is a lookup in here instead of a round trip to the switch.
+#
+# The progress monitor (look at ios_progress.py) still reads the switch, since the only
+# thing it cares about is how big a file that is still being written has gotten.
+
+import ios_parsers                                      # parseDir() lives here
+import ios_stream                                       # Streaming results, look at fleetListings()
+from nornir.core.filter import F
+from nornir.core.task import Task, Result
+from nornir_netmiko.tasks import netmiko_send_command
+import swan_logger                                      # Custom written logger script, look at dirTask()
+import threading
+import time
+
+
+INDEX = {}                                              # Inventory name -> filesystem (EX: "flash-2:") -> listing, look at parseListing()
+INDEX_LOCK = threading.Lock()
+
+
+
+# NORMALIZE
+# Function turns any way of writing a filesystem into the key used in the index,
+# EX: "flash", "flash:", and "flash:/" all become "flash:"
+################################################################################
+def normalize(filesystem):
+    return filesystem.rstrip("/").rstrip(":") + ":"
+
+
+
+# PARSE LISTING
+# Function turns the output of "dir" into the listing dictionary kept in the index
+# and in the facts: {"files": {name: {"size", "date"}}, "totalSpace", "freeSpace"}
+################################################################################
+def parseListing(output):
+    listing = ios_parsers.parseDir(output)
+    files = {}
+    for name, entry in listing.files.items():
+        files[name] = {"size": entry.size, "date": entry.date}
+    return {"files": files, "totalSpace": listing.totalSpace, "freeSpace": listing.freeSpace}
+
+
+
+# STORE
+# Function puts a host's listing of a filesystem into the index, replacing whatever
+# was there before
+################################################################################
+def store(hostname, filesystem, listing):
+    entry = {"files": dict(listing["files"]), "totalSpace": listing["totalSpace"], "freeSpace": listing["freeSpace"],
+             "collected": listing.get("collected", time.time())}
+    with INDEX_LOCK:
+        INDEX.setdefault(hostname, {})[normalize(filesystem)] = entry
+
+
+
+# SEED
+# Function stores the flash: listing that is already sitting in a host's facts, so
+# gathering facts (or pulling them from the cache) never needs a second "dir"
+################################################################################
+def seed(hostname, facts):
+    store(hostname, "flash:", facts)
+
+
+
+# LISTING
+# Function returns a host's listing of a filesystem, or None if it isn't indexed
+################################################################################
+def listing(hostname, filesystem="flash:"):
+    with INDEX_LOCK:
+        return INDEX.get(hostname, {}).get(normalize(filesystem))
+
+
+
+# LOOKUP
+# Function returns the {"size", "date"} of a file, or None if the file isn't there
+# (or the filesystem isn't indexed). Names are matched exactly.
+################################################################################
+def lookup(hostname, filename, filesystem="flash:"):
+    entry = listing(hostname, filesystem)
+    if entry is None:
+        return None
+    return entry["files"].get(filename)
+
+
+
+# FREE SPACE
+# Function returns the free bytes of a host's filesystem, or None if it isn't indexed
+################################################################################
+def freeSpace(hostname, filesystem="flash:"):
+    entry = listing(hostname, filesystem)
+    if entry is None:
+        return None
+    return entry["freeSpace"]
+
+
+
+# RECORD COPY
+# Function adds a file the scripts just copied onto a host to the index, taking its
+# size out of the free space. Nothing happens if the filesystem isn't indexed, the
+# next lookup just reads it off of the switch.
+################################################################################
+def recordCopy(hostname, filename, size, filesystem="flash:", date=""):
+    with INDEX_LOCK:
+        entry = INDEX.get(hostname, {}).get(normalize(filesystem))
+        if entry is None:
+            return
+        old = entry["files"].get(filename)
+        if old is not None:                             # Copied over the top of an older file
+            entry["freeSpace"] = entry["freeSpace"] + old["size"]
+        entry["files"][filename] = {"size": size, "date": date}
+        entry["freeSpace"] = max(0, entry["freeSpace"] - size)
+
+
+
+# RECORD DELETE
+# Function takes a file the scripts just deleted off of a host out of the index,
+# giving its size back to the free space
+################################################################################
+def recordDelete(hostname, filename, filesystem="flash:"):
+    with INDEX_LOCK:
+        entry = INDEX.get(hostname, {}).get(normalize(filesystem))
+        if entry is None:
+            return
+        old = entry["files"].pop(filename, None)
+        if old is not None:
+            entry["freeSpace"] = min(entry["totalSpace"], entry["freeSpace"] + old["size"])
+
+
+
+# FORGET
+# Function throws out the listings of the passed hosts (every filesystem, or just
+# the one passed). Called before anything that changes flash in ways the scripts
+# can't keep track of by hand (install add, install remove inactive, reloads).
+################################################################################
+def forget(hostnames, filesystem=None):
+    with INDEX_LOCK:
+        for hostname in hostnames:
+            if filesystem is None:
+                INDEX.pop(hostname, None)
+            else:
+                INDEX.get(hostname, {}).pop(normalize(filesystem), None)
+
+
+
+# DIR TASK
+# Nornir task that returns the host's listing of a filesystem straight out of the
+# index, only running "dir" on the switch if it isn't indexed yet (or refresh is
+# True). Fails the host if the filesystem doesn't exist (EX: "flash-5:" on a stack
+# of four).
+################################################################################
+def dirTask(task: Task, filesystem="flash:", refresh=False) -> Result:
+    filesystem = normalize(filesystem)
+    if not refresh:
+        entry = listing(task.host.name, filesystem)
+        if entry is not None:
+            return Result(host=task.host, result=entry)
+
+    command = f"dir {filesystem}"
+    output = task.run(task=netmiko_send_command, command_string=command)
+    swan_logger.taskLogger(task, command, output.result)
+
+    if ios_parsers.parseDir(output.result).filesystem == "":   # "%Error opening flash-5:/ (No such device)", etc.
+        return Result(host=task.host, result=f"Unable to list {filesystem}", failed=True)
+    store(task.host.name, filesystem, parseListing(output.result))
+    return Result(host=task.host, result=listing(task.host.name, filesystem))
+
+
+
+# FLEET LISTINGS
+# Function returns every host's listing of a filesystem, running a single "dir" on
+# only the hosts that aren't indexed yet. Hosts that couldn't be listed get None.
+################################################################################
+def fleetListings(nr, filesystem="flash:"):
+    listings = {hostname: listing(hostname, filesystem) for hostname in nr.inventory.hosts}
+    missing = [hostname for hostname in listings if listings[hostname] is None]
+    if len(missing) != 0:
+        output = ios_stream.streamRun(nr.filter(F(name__in=missing)), dirTask, filesystem=filesystem)  # Raw "dir" output is thrown out as each switch finishes
+        for hostname in output:
+            if not output[hostname].failed:
+                listings[hostname] = output[hostname].result
+    return listings
@@ -0,0 +1,298 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the optional built-in image server. Switches used to only be able
+# to pull the file with "copy scp://user@FileServerIP//path", which needs a separate
+# SCP server to be running and has the file server's password sent through netmiko.
+# When "http_server" is turned on in config.yaml, the script serves the directory
+# holding the image itself over HTTP (or HTTPS if a certificate is given) and the
+# server is added to the front of every switch's mirror list (look at ios_mirrors.py),
+# so switches pull the file with "copy http://" instead. The file is sent with
+# os.sendfile() so it goes straight from the page cache to the socket without ever
+# being copied into Python. Range requests are answered with only the bytes asked
+# for (206, or 416 if the range can't be satisfied) and Accept-Ranges is sent, so a
+# client that resumes a download that got interrupted isn't sent the whole file
+# again. Every connection's throughput is logged to the http_server log file in the
+# /logs directory. "python3 ios_http_server.py" checks the range handling against a
+# server on localhost, look at checkRanges().
+
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import re
+import ssl
+import swan_logger                                      # Custom written logger script, look at logger() or script for more details
+import tempfile
+import threading
+import time
+from urllib.parse import unquote
+
+
+DEFAULTS = {
+    "enabled": False,                                   # Built-in server is off unless turned on in config.yaml
+    "address": "",                                      # Address the switches reach this machine at
+    "bind": "0.0.0.0",                                  # Address the server listens on
+    "port": 8080,
+    "directory": ".",                                   # Local directory holding the image, relative to where the script is ran from
+    "certfile": None,                                   # Serves HTTPS instead of HTTP when both of these are set
+    "keyfile": None,
+}
+
+RANGE_REGEX = re.compile(r"bytes=(\d*)-(\d*)$")         # EX: "bytes=1048576-" or "bytes=0-1023"
+CHUNK = 8 * 1024 * 1024                                 # Max bytes handed to a single sendfile() call
+
+SERVER = None                                           # Running ThreadingHTTPServer, started by startServer()
+SERVER_LOCK = threading.Lock()
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+
+
+# HTTP OPTIONS
+# Function merges the "http_server" section of config.yaml over the defaults above
+################################################################################
+def httpOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("http_server", {}) or {})
+    return options
+
+
+
+# IMAGE HANDLER
+# Serves GET and HEAD requests for files directly inside of the served directory
+################################################################################
+class ImageHandler(BaseHTTPRequestHandler):
+    server_version = "SWAN"
+    protocol_version = "HTTP/1.1"
+
+
+    # Turns the request path into a file inside of the served directory, or None if
+    # the path tries to leave the directory or the file doesn't exist
+    def localPath(self):
+        name = os.path.basename(unquote(self.path.split("?")[0]))
+        path = os.path.join(self.server.directory, name)
+        if name == "" or not os.path.isfile(path):
+            return None
+        return path
+
+
+    # Returns the (start, end) byte range the request asked for, the whole file if
+    # it didn't ask for one, or None if the range can't be satisfied
+    def byteRange(self, size):
+        header = self.headers.get("Range")
+        if header is None:
+            return 0, size - 1
+
+        match = RANGE_REGEX.match(header.strip())
+        if match is None:
+            return None
+        start, end = match.groups()
+        if start == "":                                 # "bytes=-500" is the last 500 bytes
+            if end == "" or int(end) == 0:
+                return None
+            return max(0, size - int(end)), size - 1
+        start = int(start)
+        end = size - 1 if end == "" else min(int(end), size - 1)
+        if start > end:
+            return None
+        return start, end
+
+
+    def do_HEAD(self):
+        self.respond(sendBody=False)
+
+
+    def do_GET(self):
+        self.respond(sendBody=True)
+
+
+    def respond(self, sendBody):
+        path = self.localPath()
+        if path is None:
+            self.send_error(404)
+            return
+
+        size = os.path.getsize(path)
+        byteRange = self.byteRange(size)
+        if byteRange is None:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byteRange
+        length = end - start + 1
+        if self.headers.get("Range") is None:
+            self.send_response(200)
+        else:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if not sendBody:
+            return
+
+        began = time.time()
+        sent = 0
+        try:
+            with open(path, "rb") as file:
+                sent = self.sendBody(file, start, length)
+        finally:
+            seconds = max(time.time() - began, 0.001)
+            swan_logger.logger("http_server", f"GET {self.path} from {self.client_address[0]} bytes {start}-{end}",
+                               f"{sent} of {length} bytes sent in {round(seconds, 3)} secs ({int(sent / seconds)} bytes/sec)")
+
+
+    # Sends length bytes of the file starting at offset, returns how many were sent
+    def sendBody(self, file, offset, length):
+        self.wfile.flush()
+        sent = 0
+        if isinstance(self.connection, ssl.SSLSocket):  # Encrypted sockets can't use sendfile(), falling back to plain reads and writes
+            file.seek(offset)
+            while sent < length:
+                data = file.read(min(CHUNK, length - sent))
+                if not data:
+                    break
+                self.connection.sendall(data)
+                sent = sent + len(data)
+            return sent
+
+        while sent < length:                            # Zero-copy, the file never passes through Python
+            count = os.sendfile(self.connection.fileno(), file.fileno(), offset + sent, min(CHUNK, length - sent))
+            if count == 0:
+                break
+            sent = sent + count
+        return sent
+
+
+    def log_message(self, format, *args):               # Everything worth keeping is already logged in respond()
+        pass
+
+
+
+# START SERVER
+# Function starts the built-in image server on a background thread if it is turned
+# on in config.yaml and isn't already running. Returns the server, or None if it is
+# turned off.
+################################################################################
+def startServer(nr):
+    global SERVER
+    options = httpOptions(nr)
+    if not options["enabled"]:
+        return None
+
+    with SERVER_LOCK:
+        if SERVER is None:
+            server = ThreadingHTTPServer((options["bind"], options["port"]), ImageHandler)
+            server.daemon_threads = True
+            server.directory = os.path.abspath(options["directory"])
+            if options["certfile"] and options["keyfile"]:
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+                context.load_cert_chain(options["certfile"], options["keyfile"])
+                server.socket = context.wrap_socket(server.socket, server_side=True)
+            threading.Thread(target=server.serve_forever, name="http-server", daemon=True).start()
+            print(f"Serving {server.directory} at {serverMirror(nr)['protocol']}://{options['address']}:{options['port']}/\n")
+            SERVER = server
+    return SERVER
+
+
+
+# STOP SERVER
+# Function stops the built-in image server if it is running
+################################################################################
+def stopServer():
+    global SERVER
+    with SERVER_LOCK:
+        if SERVER is not None:
+            SERVER.shutdown()
+            SERVER.server_close()
+            SERVER = None
+
+
+
+# SERVER MIRROR
+# Function returns the built-in server as an entry for the mirror list, or None
+# if it is turned off
+################################################################################
+def serverMirror(nr):
+    options = httpOptions(nr)
+    if not options["enabled"]:
+        return None
+
+    protocol = "http"
+    if options["certfile"] and options["keyfile"]:
+        protocol = "https"
+    return {"ip": options["address"], "path": "", "sites": [], "protocol": protocol, "port": options["port"], "preferred": True}
+
+
+
+# CHECK RANGES
+# Function serves a small file from a temporary directory on localhost and checks
+# the status, headers, and body of a plain GET, a HEAD, and every kind of range
+# request against what the file holds. Returns the number of checks that failed.
+################################################################################
+def checkRanges():
+    data = bytes(range(256)) * 4                        # 1024 bytes, every offset holds a known value
+    size = len(data)
+    checks = [                                          # (method, Range header, status, body, Content-Range)
+        ("GET", None, 200, data, None),
+        ("HEAD", None, 200, b"", None),
+        ("GET", "bytes=0-1023", 206, data, f"bytes 0-1023/{size}"),
+        ("GET", "bytes=100-199", 206, data[100:200], f"bytes 100-199/{size}"),
+        ("GET", "bytes=1000-", 206, data[1000:], f"bytes 1000-1023/{size}"),
+        ("GET", "bytes=1000-5000", 206, data[1000:], f"bytes 1000-1023/{size}"),
+        ("GET", "bytes=-24", 206, data[-24:], f"bytes 1000-1023/{size}"),
+        ("GET", "bytes=1024-", 416, b"", f"bytes */{size}"),
+        ("GET", "bytes=200-100", 416, b"", f"bytes */{size}"),
+        ("GET", "bytes=-", 416, b"", f"bytes */{size}"),
+        ("GET", "bytes=-0", 416, b"", f"bytes */{size}"),
+        ("GET", "bytes=0-1,5-6", 416, b"", f"bytes */{size}"),    # Multiple ranges aren't supported
+    ]
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "image.bin"), "wb") as file:
+            file.write(data)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        server.daemon_threads = True
+        server.directory = directory
+        threading.Thread(target=server.serve_forever, name="http-server-check", daemon=True).start()
+        try:
+            for method, byteRange, status, body, contentRange in checks:
+                connection = HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+                connection.request(method, "/image.bin", headers={"Range": byteRange} if byteRange is not None else {})
+                response = connection.getresponse()
+                received = response.read()
+                connection.close()
+
+                problems = []
+                if response.status != status:
+                    problems.append(f"status {response.status} instead of {status}")
+                if received != body:
+                    problems.append(f"{len(received)} bytes of body instead of the expected {len(body)}")
+                if response.getheader("Content-Range") != contentRange:
+                    problems.append(f"Content-Range {response.getheader('Content-Range')!r} instead of {contentRange!r}")
+                if status != 416 and response.getheader("Accept-Ranges") != "bytes":
+                    problems.append("no Accept-Ranges header")
+
+                name = f"{method} {byteRange or 'whole file'}"
+                if len(problems) != 0:
+                    print(f"{RED}{name}{CLEAR} failed: {', '.join(problems)}")
+                    failures = failures + 1
+                else:
+                    print(f"{GREEN}{name}{CLEAR} matches")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return failures
+
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if checkRanges() != 0 else 0)
@@ -0,0 +1,146 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the run journal used by the INSTALL and BUNDLE scripts. If either
+# script died partway through (laptop disconnect during a transfer, Ctrl+C while the
+# switches were rebooting, etc.) the next run used to start over from nothing. Now
+# every phase a switch finishes is appended to a journal file (swan_journal.jsonl in
+# the directory the script is ran from) as a single JSON line, and the file is
+# fsync'd before the script moves on, so a crash can never lose a finished phase.
+# Running either script with --resume picks the last run for the same .bin file back
+# up, and every switch skips straight past the phases it already finished:
+#   facts       Switch data was gathered (cached facts are trusted no matter their age)
+#   file        The .bin file was downloaded
+#   md5         The file passed its MD5 check
+#   config      Pre-upgrade config was fixed (ignore startupconfig, boot variable, etc.)
+#   activated   The new version was installed and the switch was sent into its reload
+#   committed   The upgrade was committed (INSTALL only)
+# The path can be changed in the "journal" section of config.yaml.
+
+import json
+import os
+import threading
+import time
+import uuid
+
+
+DEFAULT_PATH = "swan_journal.jsonl"                     # Relative to the directory the script is being ran from
+
+PHASES = ["facts", "file", "md5", "config", "activated", "committed"]
+
+
+
+# JOURNAL PATH
+# Function returns the full path of the journal file set in config.yaml
+################################################################################
+def journalPath(nr):
+    options = nr.config.user_defined.get("journal", {}) or {}
+    return os.path.join(os.getcwd(), options.get("path", DEFAULT_PATH))
+
+
+
+# READ JOURNAL
+# Function returns every entry in the journal file. A line that was only partly
+# written when the script died is skipped.
+################################################################################
+def readJournal(path):
+    entries = []
+    if not os.path.isfile(path):
+        return entries
+
+    with open(path, "r") as file:
+        for line in file:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+
+# RUN JOURNAL
+# Shared between every host's worker thread. Phases finished during the last run
+# for the same .bin file are loaded once when the journal is opened with
+# resume=True, and every phase finished during this run is appended to the file.
+################################################################################
+class RunJournal:
+    def __init__(self, nr, image, resume=False):
+        self.path = journalPath(nr)
+        self.image = image
+        self.lock = threading.Lock()
+        self.previous = {}                              # Hostname -> set of phases finished before the script was resumed
+        self.run = None
+
+        if resume:
+            entries = readJournal(self.path)
+            for entry in entries:                       # Last run started for the same file
+                if entry.get("event") == "start" and entry.get("image") == image:
+                    self.run = entry["run"]
+            for entry in entries:
+                if entry.get("run") == self.run and entry.get("event") == "phase":
+                    self.previous.setdefault(entry["host"], set()).add(entry["phase"])
+            if self.run is None:
+                print(f"No previous run for {image} found in {self.path}, starting a new one\n")
+
+        event = "resume"
+        if self.run is None:
+            self.run = uuid.uuid4().hex
+            event = "start"
+        torn = False
+        if os.path.isfile(self.path) and os.path.getsize(self.path) != 0:
+            with open(self.path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                torn = file.read(1) != b"\n"            # Script died in the middle of writing the last line
+        self.file = open(self.path, "a")
+        if torn:
+            self.file.write("\n")                      # Keeps the half written line from swallowing the next entry
+        self.write({"event": event, "run": self.run, "image": image})
+
+
+    # Appends a single entry and makes sure it is on disk before returning
+    def write(self, entry):
+        entry["time"] = time.time()
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+
+    # Writes down that the host finished the phase
+    def record(self, hostname, phase):
+        self.write({"event": "phase", "run": self.run, "host": hostname, "phase": phase})
+
+
+    # Writes down that every one of the hosts finished the phase
+    def recordAll(self, hostnames, phase):
+        for hostname in hostnames:
+            self.record(hostname, phase)
+
+
+    # True if the host finished the phase before the script was resumed
+    def resumed(self, hostname, phase):
+        return phase in self.previous.get(hostname, ())
+
+
+    # Throws out phases the hosts finished before the script was resumed, for when
+    # the switch no longer matches (EX: the file is missing from flash again)
+    def forget(self, hostnames, phases):
+        for hostname in hostnames:
+            self.previous.get(hostname, set()).difference_update(phases)
+
+
+    # Returns the hosts that still need the phase
+    def pending(self, hostnames, phase):
+        return [hostname for hostname in hostnames if not self.resumed(hostname, phase)]
+
+
+    # Prints how far along every host was when the script was resumed
+    def printResumed(self):
+        if len(self.previous) == 0:
+            return
+        print(f"Resuming run {self.run} of {self.image}:")
+        for hostname in sorted(self.previous):
+            done = [phase for phase in PHASES if phase in self.previous[hostname]]
+            print(f"{hostname} - already done: {', '.join(done)}")
+        print()
+
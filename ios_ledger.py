@@ -0,0 +1,98 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the verified-image ledger. Running "verify /md5" on a ~700 MB
+# .bin file can take several minutes per switch, and the scripts used to run it on
+# every switch every single time. Now every successful MD5 check is written down in
+# a table inside of the same SQLite database as the facts cache (look at ios_cache.py),
+# keyed by the switch, filename, file size, and the file's timestamp in flash. If
+# none of those have changed since the last successful check, the hash is skipped.
+# The only switches that get the file hashed again are the ones whose file metadata
+# no longer matches what was verified (EX: the file was re-downloaded or replaced).
+
+import ios_cache                                        # openDatabase() lives here
+import ios_flash                                        # Flash index, holds the file's size and timestamp
+import time
+
+
+
+# OPEN LEDGER
+# Function opens the facts cache database and makes sure the ledger table exists
+################################################################################
+def openLedger(nr):
+    conn = ios_cache.openDatabase(nr)
+    conn.execute("CREATE TABLE IF NOT EXISTS verified (host TEXT, filename TEXT, size INTEGER, date TEXT, md5 TEXT, verified REAL, "
+                 "PRIMARY KEY (host, filename))")
+    return conn
+
+
+
+# IS VERIFIED
+# Function returns True if the exact same file (same size and flash timestamp) has
+# already passed an MD5 check against the passed hash on this switch
+################################################################################
+def isVerified(nr, hostname, filename, metadata, MD5):
+    """
+    Checks the ledger for a previous successful MD5 check of a file.
+
+    Parameters
+    ----------
+    nr : Nornir
+        Any Nornir object, only used to find the database.
+    hostname : string
+        Inventory name of the switch.
+    filename : string
+        Name of the file in flash.
+    metadata : dict
+        The file's entry from the flash index, {"size": int, "date": string}.
+    MD5 : string
+        Hash the file is supposed to have.
+
+    Returns
+    -------
+    bool
+        True if the hash does not need to be checked again.
+    """
+    if metadata is None:                                # File isn't even in flash
+        return False
+
+    conn = openLedger(nr)
+    try:
+        row = conn.execute("SELECT size, date, md5 FROM verified WHERE host = ? AND filename = ?", (hostname, filename)).fetchone()
+    finally:
+        conn.close()
+    return row is not None and row[0] == metadata["size"] and row[1] == metadata["date"] and row[2] == MD5.strip().lower()
+
+
+
+# RECORD VERIFIED
+# Function writes down a successful MD5 check
+################################################################################
+def recordVerified(nr, hostname, filename, metadata, MD5):
+    if metadata is None:
+        return
+
+    conn = openLedger(nr)
+    try:
+        with conn:                                      # Commits on the way out
+            conn.execute("INSERT OR REPLACE INTO verified (host, filename, size, date, md5, verified) VALUES (?, ?, ?, ?, ?, ?)",
+                         (hostname, filename, metadata["size"], metadata["date"], MD5.strip().lower(), time.time()))
+    finally:
+        conn.close()
+
+
+
+# FILE METADATA
+# Function returns each host's size and timestamp for the file out of the flash
+# index (look at ios_flash.py), only running "dir flash:" on hosts that aren't
+# indexed yet, or None if the host doesn't have it
+################################################################################
+def fileMetadata(nr, filename):
+    listings = ios_flash.fleetListings(nr, "flash:")
+
+    metadata = {}
+    for hostname in listings:
+        metadata[hostname] = None
+        if listings[hostname] is not None:
+            metadata[hostname] = listings[hostname]["files"].get(filename)
+    return metadata
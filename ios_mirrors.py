@@ -0,0 +1,192 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the mirror selection used by scpTask(). ios_file_data.py used to
+# only allow a single file server, so a regional site ended up pulling a ~700 MB file
+# from across the country. Now any number of mirrors holding the exact same file can
+# be listed in ios_file_data.py. Every finished transfer is written down along with
+# the mirror it came from in a table inside of the same SQLite database as the facts
+# cache (look at ios_cache.py), and each switch tries the mirrors in order of how fast
+# they have been for that switch (or its site) in the past. Mirrors with no history
+# yet are ranked by pinging them from the switch itself. If a copy from one mirror
+# fails, the switch moves on to the next mirror in its list.
+
+import ios_cache                                        # openDatabase() lives here
+import ios_file_data                                    # Mirrors list lives here
+import ios_http_server                                  # Built-in image server, added as a mirror when it is turned on
+import ios_parsers                                      # parseCopied() and parsePing() live here
+import ios_timeouts                                     # siteOf() lives here
+from nornir.core.exceptions import NornirSubTaskError
+from nornir_netmiko.tasks import netmiko_send_command
+import statistics
+import swan_logger                                      # Custom written logger script, look at taskLogger() or script for more details
+import time
+
+
+
+# MIRROR LIST
+# Function returns every server holding the file, starting with the built-in HTTP
+# server (if it is turned on, look at ios_http_server.py), then FileServerIP, and
+# followed by every mirror in ios_file_data.py:
+# [{"ip": "192.168.0.50", "path": "srv/fileshare", "sites": [], "protocol": "scp", "port": None}, ...]
+################################################################################
+def mirrorList(ipAddress, folderPath, nr=None):
+    mirrors = [{"ip": ipAddress, "path": folderPath, "sites": [], "protocol": "scp", "port": None}]
+    if nr is not None and ios_http_server.serverMirror(nr) is not None:
+        mirrors.insert(0, ios_http_server.serverMirror(nr))
+
+    for mirror in ios_file_data.Mirrors:
+        entry = {"ip": mirror["ip"], "path": mirror["path"].strip("/"), "sites": mirror.get("sites", []),
+                 "protocol": mirror.get("protocol", "scp"), "port": mirror.get("port")}
+        if not any(entry["ip"] == other["ip"] and entry["path"] == other["path"] for other in mirrors):
+            mirrors.append(entry)
+    return mirrors
+
+
+
+# MIRROR SOURCE
+# Function returns the URL the switch copies the file from for the mirror. SCP
+# mirrors are logged into with the file server username, while HTTP(S) mirrors
+# don't need one.
+################################################################################
+def mirrorSource(mirror, filename, fileUsername):
+    path = filename
+    if mirror["path"] != "":
+        path = f"{mirror['path']}/{filename}"
+
+    if mirror["protocol"] == "scp":
+        return f"scp://{fileUsername}@{mirror['ip']}//{path}"
+    address = mirror["ip"]
+    if mirror["port"] is not None:
+        address = f"{address}:{mirror['port']}"
+    return f"{mirror['protocol']}://{address}/{path}"
+
+
+
+# MIRROR KEY
+# Function returns the name a mirror's history is kept under. SCP mirrors are just
+# their address (EX: "192.168.0.50") while anything else has the protocol in front
+# (EX: "http://192.168.0.10") so the same machine's SCP and HTTP speeds stay apart.
+################################################################################
+def mirrorKey(mirror):
+    if mirror["protocol"] == "scp":
+        return mirror["ip"]
+    return f"{mirror['protocol']}://{mirror['ip']}"
+
+
+
+# OPEN MIRROR TIMINGS
+# Function opens the facts cache database and makes sure the mirror timings table exists
+################################################################################
+def openMirrorTimings(nr):
+    conn = ios_cache.openDatabase(nr)
+    conn.execute("CREATE TABLE IF NOT EXISTS mirror_timings (mirror TEXT, host TEXT, site TEXT, bytes INTEGER, seconds REAL, recorded REAL)")
+    return conn
+
+
+
+# RECORD MIRROR
+# Function pulls the bytes and seconds out of the "copied in" line of a copy's
+# output and writes them down against the mirror the copy came from
+################################################################################
+def recordMirror(nr, host, mirror, output):
+    transfer = ios_parsers.parseCopied(output)
+    if transfer is None or transfer.seconds <= 0:
+        return
+
+    conn = openMirrorTimings(nr)
+    try:
+        with conn:                                      # Commits on the way out
+            conn.execute("INSERT INTO mirror_timings (mirror, host, site, bytes, seconds, recorded) VALUES (?, ?, ?, ?, ?, ?)",
+                         (mirrorKey(mirror), host.name, ios_timeouts.siteOf(host), transfer.bytes, transfer.seconds, time.time()))
+    finally:
+        conn.close()
+
+
+
+# MIRROR RATE
+# Function returns the typical (median) speed in bytes/sec of the mirror for the
+# host, or for the host's site if the host itself has never pulled from it
+################################################################################
+def mirrorRate(nr, host, mirror):
+    options = ios_timeouts.timeoutOptions(nr)           # Same sample counts as the timeout model
+    conn = openMirrorTimings(nr)
+    try:
+        rows = conn.execute("SELECT bytes / seconds FROM mirror_timings WHERE mirror = ? AND host = ? ORDER BY recorded DESC LIMIT ?",
+                            (mirrorKey(mirror), host.name, options["samples"])).fetchall()
+        if len(rows) == 0:
+            rows = conn.execute("SELECT bytes / seconds FROM mirror_timings WHERE mirror = ? AND site = ? ORDER BY recorded DESC LIMIT ?",
+                                (mirrorKey(mirror), ios_timeouts.siteOf(host), options["samples"])).fetchall()
+    finally:
+        conn.close()
+
+    if len(rows) == 0:
+        return None
+    return statistics.median(row[0] for row in rows)
+
+
+
+# PROBE MIRROR
+# Function pings the mirror from the switch and returns the average round trip in
+# milliseconds, or None if the mirror could not be reached
+################################################################################
+def probeMirror(task, mirror):
+    command = f"ping {mirror['ip']} repeat 5 timeout 1"
+    try:
+        output = task.run(task=netmiko_send_command, name=command, command_string=command, read_timeout=30)
+    except NornirSubTaskError:
+        return None
+    swan_logger.taskLogger(task, command, output.result)
+
+    ping = ios_parsers.parsePing(output.result)
+    if ping is None:
+        return None
+    return ping.average                                 # None if none of the pings came back
+
+
+
+# RANK MIRRORS
+# Function returns the mirrors in the order the host should try them in. Mirrors
+# the host (or its site) has history with come first, fastest first. Mirrors with
+# no history that are listed as local to the host's site (or are the built-in HTTP
+# server) are slotted in among those as if they ran at the median known speed, so a
+# mirror that is known to be fast is never passed over for an untested one. Every
+# other mirror with no history goes last, lowest ping first.
+################################################################################
+def rankMirrors(task, mirrors):
+    """
+    Orders the mirrors for a single host.
+
+    Parameters
+    ----------
+    task : Task
+        The host's Nornir task, used to ping mirrors from the switch.
+    mirrors : list
+        Output of mirrorList().
+
+    Returns
+    -------
+    list
+        The same mirror dictionaries, in the order they should be tried.
+    """
+    if len(mirrors) < 2:
+        return mirrors
+
+    site = ios_timeouts.siteOf(task.host)
+    known = []                                          # (bytes/sec, mirror)
+    local = []
+    unknown = []                                        # (ping in ms, mirror)
+    for mirror in mirrors:
+        rate = mirrorRate(task.nornir, task.host, mirror)
+        if rate is not None:
+            known.append((rate, mirror))
+        elif site in mirror["sites"] or mirror.get("preferred"):
+            local.append(mirror)
+        else:
+            unknown.append((probeMirror(task, mirror), mirror))
+
+    prior = statistics.median(entry[0] for entry in known) if len(known) != 0 else 0
+    ranked = known + [(prior, mirror) for mirror in local]
+    ranked.sort(key=lambda entry: entry[0], reverse=True)  # Stable, so a known mirror stays ahead of a local one at the same speed
+    unknown.sort(key=lambda entry: float("inf") if entry[0] is None else entry[0])
+    return [entry[1] for entry in ranked] + [entry[1] for entry in unknown]
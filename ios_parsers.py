@@ -0,0 +1,380 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds every parser for IOS command output used by the scripts. Output
+# used to be picked apart with find() and string slicing all over the place (the
+# version was sliced from "Version" + 8 up to the next comma, free space came out of
+# the last line of "dir", the MD5 was everything after ") =", etc.), so a single
+# switch with slightly different output could crash the whole run. Now every command
+# has one parser built on precompiled regexes that returns a small typed record and
+# never raises, a switch with output it can't make sense of just gets an empty record
+# (or None) back. Sample output of every command (IOS 16 and 17, single switches and
+# stacks, SCP and HTTP copies, etc.) lives in examples/parser_fixtures along with
+# what every parser should return for it. Running this script by itself checks every
+# parser against those samples:
+#   python3 ios_parsers.py
+
+from dataclasses import asdict, dataclass, field
+import json
+import os
+import re
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+VERSION_REGEX = re.compile(r"Version\s+([^,\s]+)")                      # First version string in show version, EX: "Version 16.09.01"
+HOSTNAME_REGEX = re.compile(r"^(\S+) uptime is", re.MULTILINE)          # EX: "c9300-test-01 uptime is 1 week, 2 days..."
+MEMBER_REGEX = re.compile(r"^(\*?)\s*(\d+)\s+\d+\s+(\S+)\s+(\S+)\s+\S+\s+(INSTALL|BUNDLE)\s*$", re.MULTILINE)    # Rows of the "Switch Ports Model" table
+DIRECTORY_REGEX = re.compile(r"^Directory of ([\w-]+):", re.MULTILINE)  # EX: "Directory of flash:/"
+FILE_REGEX = re.compile(r"^\s*\d+\s+[-dlrwx]+\s+(\d+)\s+(\w{3}\s+\d+\s+\d{4}\s+[\d:]+(?:\s+[+-][\d:]+)?)\s+(\S+)\s*$", re.MULTILINE)
+SPACE_REGEX = re.compile(r"(\d+) bytes total \((\d+) bytes free\)")
+MD5_REGEX = re.compile(r"verify /md5 \(([\w-]+):/?(\S+?)\)\s*=\s*([0-9a-fA-F]{32})")   # EX: "verify /md5 (flash:cat9k_iosxe.16.09.01.SPA.bin) = 258fb60c..."
+COPIED_REGEX = re.compile(r"(\d+) bytes copied in ([\d.]+) secs(?: \((\d+) bytes/sec\))?")    # EX: "699968920 bytes copied in 1227.164 secs (570381 bytes/sec)"
+PING_REGEX = re.compile(r"Success rate is (\d+) percent \((\d+)/(\d+)\)(?:, round-trip min/avg/max = (\d+)/(\d+)/(\d+) ms)?")
+SWITCH_REGEX = re.compile(r"^(\*?)\s*(\d+)\s+(Active|Standby|Member)\s+([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})\s+(\d+)\s+(?:(\S+)\s+)?(\S.*?)\s*$", re.MULTILINE)    # Rows of "show switch"
+ROMVAR_REGEX = re.compile(r"^\s*([A-Z][A-Z0-9_]*)=\"?(.*?)\"?\s*$", re.MULTILINE)    # EX: "SWITCH_IGNORE_STARTUP_CFG=0" or 'MANUAL_BOOT="no"'
+INTERFACE_REGEX = re.compile(r"GigabitEthernet(\d+)/\d+/\d+")           # EX: "interface TenGigabitEthernet2/1/1", the first number is the stack member
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "examples", "parser_fixtures")
+
+
+
+# VERSION FORMATTER
+# Function pads every part of a version string to two digits so it matches the
+# .bin version number format (EX: "16.9.1" -> "16.09.01"), same as the
+# INSTALL and BUNDLE scripts' old versionFormatter()
+################################################################################
+def formatVersion(string):
+    return ".".join(part.zfill(2) for part in string.split(".")[:3])
+
+
+
+# VERSION TUPLE
+# Function turns a version string into a tuple that compares the way versions do
+# (EX: "17.03.04a" -> (17, 3, 4)), anything that isn't a number is left out
+################################################################################
+def versionTuple(string):
+    numbers = []
+    for part in string.split(".")[:3]:
+        match = re.match(r"\d+", part)
+        if match is None:
+            break
+        numbers.append(int(match.group(0)))
+    return tuple(numbers)
+
+
+
+@dataclass
+class StackMember:
+    number: int
+    model: str
+    version: str
+    mode: str
+    active: bool                                        # Marked with a "*" in the table, the switch the session is on
+
+
+
+@dataclass
+class SwitchMember:
+    number: int
+    role: str                                           # "Active", "Standby", or "Member"
+    mac: str
+    priority: int
+    hwVersion: str                                      # "0" for a provisioned switch that isn't actually there
+    state: str                                          # EX: "Ready", "Provisioned", "Removed", "V-Mismatch"
+    active: bool                                        # Marked with a "*" in the table, the switch the session is on
+
+    @property
+    def ready(self):
+        return self.state == "Ready"
+
+
+
+@dataclass
+class VersionInfo:
+    hostname: str = ""
+    version: str = ""                                   # Formatted like the .bin file's version, EX: "16.09.01"
+    release: tuple = ()                                 # Comparable version, EX: (16, 9, 1)
+    mode: str = ""                                      # "INSTALL", "BUNDLE", or "" if show version doesn't say
+    members: list = field(default_factory=list)         # StackMember for every row of the "Switch Ports Model" table
+
+    @property
+    def stack(self):
+        return max(1, len(self.members))
+
+
+
+@dataclass
+class FileEntry:
+    name: str
+    size: int
+    date: str                                           # Whitespace squeezed down, EX: "Oct 17 2026 10:00:00 +00:00"
+
+
+
+@dataclass
+class DirListing:
+    filesystem: str = ""
+    files: dict = field(default_factory=dict)           # Filename -> FileEntry
+    totalSpace: int = 0
+    freeSpace: int = 0
+
+
+
+@dataclass
+class Md5Result:
+    filesystem: str
+    filename: str
+    md5: str                                            # Always lowercase
+
+
+
+@dataclass
+class TransferResult:
+    bytes: int
+    seconds: float
+    rate: int                                           # Bytes/sec, worked out from bytes and seconds if the switch left it off
+
+    # Same "X secs (Y bytes/sec)" string the scripts have always printed
+    def describe(self):
+        return f"{self.seconds} secs ({self.rate} bytes/sec)"
+
+
+
+@dataclass
+class PingResult:
+    successRate: int                                    # Percent
+    received: int
+    sent: int
+    minimum: int = None                                 # Round trip in ms, None if nothing came back
+    average: int = None
+    maximum: int = None
+
+
+
+@dataclass
+class BootConfig:
+    autoUpgrade: bool = False
+    bootVar: list = field(default_factory=list)         # Every "boot system" line
+
+
+
+# PARSE VERSION
+# Function pulls the hostname, IOS version, boot mode, and every stack member out
+# of "show version" (or NAPALM's os_version string)
+################################################################################
+def parseVersion(output):
+    """
+    Parses "show version".
+
+    Returns
+    -------
+    VersionInfo
+        Empty strings and no members for anything that isn't in the output.
+    """
+    info = VersionInfo()
+
+    match = HOSTNAME_REGEX.search(output)
+    if match:
+        info.hostname = match.group(1)
+
+    match = VERSION_REGEX.search(output)
+    if match:
+        info.version = formatVersion(match.group(1))
+        info.release = versionTuple(match.group(1))
+
+    for active, number, model, version, mode in MEMBER_REGEX.findall(output):
+        info.members.append(StackMember(int(number), model, formatVersion(version), mode, active == "*"))
+    if len(info.members) != 0:
+        info.mode = info.members[0].mode
+    elif "BUNDLE" in output:                            # Same check bundleOrInstall() has always done, for switches without the table
+        info.mode = "BUNDLE"
+    elif "INSTALL" in output:
+        info.mode = "INSTALL"
+    return info
+
+
+
+# PARSE DIR
+# Function pulls every file (with its size and date) along with the total and free
+# space in bytes out of "dir" or "dir | i"
+################################################################################
+def parseDir(output):
+    listing = DirListing()
+
+    match = DIRECTORY_REGEX.search(output)
+    if match:
+        listing.filesystem = match.group(1)
+
+    for size, date, name in FILE_REGEX.findall(output):
+        listing.files[name] = FileEntry(name, int(size), " ".join(date.split()))
+
+    match = SPACE_REGEX.search(output)
+    if match:
+        listing.totalSpace = int(match.group(1))
+        listing.freeSpace = int(match.group(2))
+    return listing
+
+
+
+# PARSE MD5
+# Function pulls the hash out of "verify /md5", returns None if the command didn't
+# finish (file missing, timed out, etc.)
+################################################################################
+def parseMd5(output):
+    match = MD5_REGEX.search(output)
+    if match is None:
+        return None
+    return Md5Result(match.group(1), match.group(2), match.group(3).lower())
+
+
+
+# PARSE COPIED
+# Function pulls the bytes, seconds, and speed out of the "copied in" line of a
+# copy, returns None if the copy never finished
+################################################################################
+def parseCopied(output):
+    match = COPIED_REGEX.search(output)
+    if match is None:
+        return None
+
+    nbytes = int(match.group(1))
+    seconds = float(match.group(2))
+    if match.group(3) is not None:
+        rate = int(match.group(3))
+    else:
+        rate = int(nbytes / seconds) if seconds > 0 else 0
+    return TransferResult(nbytes, seconds, rate)
+
+
+
+# PARSE PING
+# Function pulls the success rate and round trip times out of "ping", returns None
+# if the ping never ran (bad address, invalid input, etc.)
+################################################################################
+def parsePing(output):
+    match = PING_REGEX.search(output)
+    if match is None:
+        return None
+
+    result = PingResult(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    if match.group(4) is not None:
+        result.minimum, result.average, result.maximum = (int(match.group(i)) for i in (4, 5, 6))
+    return result
+
+
+
+# PARSE CONFIG
+# Function checks the filtered running-config for "software auto-upgrade enable"
+# and any "boot system" lines
+################################################################################
+def parseConfig(output):
+    config = BootConfig()
+
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("software auto-upgrade enable"):
+            config.autoUpgrade = True
+        elif line.startswith("boot system"):
+            config.bootVar.append(line)
+    return config
+
+
+
+# PARSE SWITCH
+# Function pulls the number, role, and state of every stack member out of "show
+# switch", returns an empty list for a switch that isn't stackable
+################################################################################
+def parseSwitch(output):
+    members = []
+    for active, number, role, mac, priority, hwVersion, state in SWITCH_REGEX.findall(output):
+        members.append(SwitchMember(int(number), role, mac.lower(), int(priority), hwVersion, state, active == "*"))
+    return members
+
+
+
+# PARSE ROMVAR
+# Function pulls every ROMMON variable out of "show romvar". A stack lists the
+# variables of every member, so each variable maps to a list with one value per
+# member that has it set (EX: {"SWITCH_IGNORE_STARTUP_CFG": ["0", "0", "1"]}).
+################################################################################
+def parseRomvar(output):
+    variables = {}
+    for name, value in ROMVAR_REGEX.findall(output):
+        variables.setdefault(name, []).append(value)
+    return variables
+
+
+
+# PARSE INTERFACES
+# Function returns the highest stack member number used in any interface name of
+# "show run | i GigabitEthernet", or 0 if there are none
+################################################################################
+def parseInterfaces(output):
+    return max((int(number) for number in INTERFACE_REGEX.findall(output)), default=0)
+
+
+
+PARSERS = {                                             # Fixture filename prefix -> parser, look at checkFixtures()
+    "version": parseVersion,
+    "dir": parseDir,
+    "md5": parseMd5,
+    "copy": parseCopied,
+    "ping": parsePing,
+    "config": parseConfig,
+    "switch": parseSwitch,
+    "romvar": parseRomvar,
+    "interfaces": parseInterfaces,
+}
+
+
+
+# TO PLAIN
+# Function turns a parser's record into plain JSON types so it can be compared with
+# the expected output of a fixture
+################################################################################
+def toPlain(record):
+    if isinstance(record, list):                        # parseSwitch() returns a list of records
+        return [toPlain(element) for element in record]
+    if hasattr(record, "__dataclass_fields__"):
+        record = asdict(record)
+    return json.loads(json.dumps(record))
+
+
+
+# CHECK FIXTURES
+# Function runs every fixture in examples/parser_fixtures through the parser its
+# filename starts with and compares the record with the fixture's entry in
+# expected.json. Returns the number of fixtures that didn't match.
+################################################################################
+def checkFixtures(directory=FIXTURES):
+    with open(os.path.join(directory, "expected.json"), "r") as file:
+        expected = json.load(file)
+
+    failures = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".txt"):
+            continue
+        parser = PARSERS[filename.split("_")[0]]
+        with open(os.path.join(directory, filename), "r") as file:
+            record = toPlain(parser(file.read()))
+
+        if filename not in expected:
+            print(f"{RED}{filename}{CLEAR} has no entry in expected.json, parsed as: {json.dumps(record)}")
+            failures = failures + 1
+        elif record != expected[filename]:
+            print(f"{RED}{filename}{CLEAR} does not match")
+            print(f"    expected: {json.dumps(expected[filename])}")
+            print(f"    parsed:   {json.dumps(record)}")
+            failures = failures + 1
+        else:
+            print(f"{GREEN}{filename}{CLEAR} matches")
+    return failures
+
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if checkFixtures() != 0 else 0)
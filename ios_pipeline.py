@@ -0,0 +1,207 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the per-host pipeline engine used by the INSTALL, BUNDLE, and
+# download scripts. Instead of running every step as its own fleet-wide nr.run()
+# call (where every switch has to wait on the slowest switch before anyone moves
+# on to the next step), each host walks through a list of stages on its own Nornir
+# worker thread. A fast switch can be verifying its MD5 or rebooting while a slow
+# WAN site is still downloading. Every stage can optionally be given a concurrency
+# limit so only so many hosts can be inside of that stage at once, which is set
+# per-stage in the "stage_limits" section of config.yaml. If a run journal is
+# passed (look at ios_journal.py), a stage can write down the phase it finishes
+# and hosts skip any stage whose phase they had already finished before the
+# script was resumed. On the swan runner (look at ios_runner.py) a stage also waits
+# for a worker of its task class, so the transfer, MD5, and activation budgets apply
+# to the stages themselves instead of to the whole pipeline. Every stage holds on
+# to the host's netmiko session slot while it runs (look at ios_connections.py), so
+# nothing else can close it for room.
+# Once a stage is done only its result is kept, the output of every command it ran
+# is thrown out right there (look at ios_stream.py) instead of piling up in the
+# AggregatedResult until every host in the fleet is done.
+
+from contextlib import nullcontext
+import ios_connections                                  # Connection manager, look at session()
+import ios_runner                                       # Workers of the stage's task class, look at slot()
+import ios_stream                                       # Output of a finished stage is thrown out, look at release()
+import ios_timing                                       # Every stage is timed as a span, look at span()
+from nornir.core.exceptions import NornirSubTaskError
+from nornir.core.task import Task, Result
+import threading
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+
+
+# STAGE
+# Function builds a single stage of the pipeline. A stage is just a Nornir task
+# function with a name, an optional concurrency limit, and an optional list of
+# hosts it should run on (every other host skips straight past the stage).
+################################################################################
+def stage(name, task, limit=None, hosts=None, phase=None, skipIf=None, **kwargs):
+    """
+    Builds a pipeline stage that can be handed to runPipeline().
+
+    Parameters
+    ----------
+    name : string
+        Name of the stage, used as the key the stage's result is stored under
+        in each host's context and as the key looked up in "stage_limits".
+    task : function
+        Nornir task function, called as task(task, context=context, **kwargs).
+    limit : int, optional
+        Max number of hosts that can be inside of this stage at the same time.
+        By default this is None, which falls back to config.yaml or no limit.
+    hosts : list, optional
+        Inventory names of the hosts that should run this stage. By default
+        this is None, meaning every host runs the stage.
+    phase : string, optional
+        Journal phase written down for the host once it makes it through the
+        stage. By default this is None, meaning nothing is written down.
+    skipIf : string, optional
+        Journal phase that, if the host had already finished it before the
+        script was resumed, skips the stage. By default this is the same as
+        phase.
+    **kwargs
+        Any extra arguments passed straight through to the task function.
+
+    Returns
+    -------
+    dict
+        Dictionary describing the stage.
+    """
+    if hosts is not None:
+        hosts = set(hosts)                              # Set for quick lookups from every worker thread
+    if skipIf is None:
+        skipIf = phase
+    return {"name": name, "task": task, "limit": limit, "hosts": hosts, "phase": phase, "skipIf": skipIf, "kwargs": kwargs}
+
+
+
+# PIPELINE TASK
+# Nornir task that is ran once per host by runPipeline(). Walks the host through
+# every stage in order, waiting on the stage's semaphore (if it has one) before
+# going in. If any stage fails the host drops out of the pipeline right there,
+# while every other host keeps on going.
+################################################################################
+def pipelineTask(task: Task, stages, semaphores, onFailed=None, journal=None) -> Result:
+    context = {}                                        # Per-host scratch space, every stage can read what the stages before it found
+
+    for element in stages:
+        name = element["name"]
+        if element["hosts"] is not None and task.host.name not in element["hosts"]:
+            continue                                    # Stage doesn't apply to this host
+        if journal is not None and element["skipIf"] is not None and journal.resumed(task.host.name, element["skipIf"]):
+            continue                                    # Host already finished this before the script was resumed
+
+        mark = len(task.results)                        # Everything after this is the output of this stage
+        try:
+            with semaphores.get(name, nullcontext()), ios_runner.slot(task.host, name):  # Blocks until there is room in the stage and a worker for its task class
+                with ios_timing.span(task.host.name, name), ios_connections.session(task.host, "netmiko", task.nornir.config, check=False):
+                    output = task.run(task=element["task"], name=name, context=context, **element["kwargs"])
+        except Exception as error:                      # Anything at all, or a wave would wait on this host forever
+            context["failedStage"] = name               # Host is done, a failed subtask result is already stored by Nornir
+            if onFailed is not None:                    # Letting anything waiting on this host (like a wave in ios_waves.py) know it dropped out
+                onFailed(task.host.name, name)
+            if isinstance(error, NornirSubTaskError):
+                return Result(host=task.host, result=context, failed=True)
+            return Result(host=task.host, result=context, failed=True, exception=error)
+
+        context[name] = output.result
+        if not ios_stream.keepOutput(task.nornir.config):
+            ios_stream.release(task.results, mark)      # Stage's result is in the context, the commands it ran aren't needed anymore
+        if journal is not None and element["phase"] is not None:
+            journal.record(task.host.name, element["phase"])
+    return Result(host=task.host, result=context)
+
+
+
+# RUN PIPELINE
+# Function runs the passed stages against every host in the Nornir object, with
+# each host moving through the stages independently of the others.
+################################################################################
+def runPipeline(nr, stages, name="pipeline", onFailed=None, journal=None):
+    """
+    Runs a list of stages made by stage() against every host in a Nornir object.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object to run the pipeline against.
+    stages : list
+        List of stages returned by stage(), ran in order on every host.
+    name : string, optional
+        Name of the Nornir task, shows up in nornir.log.
+    onFailed : function, optional
+        Called as onFailed(hostname, stageName) from the host's worker thread
+        whenever a host drops out of the pipeline.
+    journal : RunJournal, optional
+        Run journal from ios_journal.py that stage phases are written to and
+        checked against. By default this is None, meaning nothing is skipped.
+
+    Returns
+    -------
+    AggregatedResult
+        The Nornir output, each host's result is its context dictionary.
+    """
+    limits = nr.config.user_defined.get("stage_limits", {}) or {}
+    semaphores = {}
+    for element in stages:
+        limit = element["limit"] if element["limit"] is not None else limits.get(element["name"])
+        if limit is not None:
+            semaphores[element["name"]] = threading.BoundedSemaphore(int(limit))
+
+    return nr.run(task=pipelineTask, name=name, stages=stages, semaphores=semaphores, onFailed=onFailed, journal=journal)
+
+
+
+# PIPELINE CONTEXTS
+# Function unwraps the AggregatedResult returned by runPipeline() into a plain
+# dict of inventory name -> context dictionary, only for hosts that made it
+# through every stage.
+################################################################################
+def pipelineContexts(output):
+    contexts = {}
+    for hostname in output:
+        if not output[hostname].failed:
+            contexts[hostname] = output[hostname][0].result
+    return contexts
+
+
+
+# CHECK PIPELINE
+# Function prints out every host that dropped out of the pipeline and the stage
+# it dropped out in. Returns 1 if any host failed, otherwise returns 0.
+################################################################################
+def checkPipeline(output):
+    flag = 0
+
+    for hostname in output:
+        if output[hostname].failed:
+            flag = 1
+            context = output[hostname][0].result
+            failedStage = "unknown"
+            if isinstance(context, dict):               # Context is a traceback string if the pipeline itself crashed
+                failedStage = context.get("failedStage", "unknown")
+            print(f"{RED}{hostname}{CLEAR} failed during the {failedStage} stage")
+
+            reason = []
+            for result in output[hostname][1:]:         # Printing out the reason the stage failed
+                if result.failed:
+                    reason = str(result.result or result.exception).strip().splitlines()
+                    break
+            else:                                       # Stage blew up outside of a subtask (EX: its session couldn't be opened)
+                if isinstance(context, dict) and output[hostname][0].exception is not None:
+                    reason = str(output[hostname][0].exception).strip().splitlines()
+            if len(reason) != 0:                        # Last line of a traceback is the actual error
+                print(f"    {reason[-1]}")
+
+    if flag == 0:
+        print(f"{GREEN}All switches made it through every stage{CLEAR}\n")
+    else:
+        print()
+    return flag
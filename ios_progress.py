@@ -0,0 +1,240 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the download progress monitor that replaced downloadPercentage()
+# in ios_download_file.py. downloadPercentage() rescheduled itself with a new
+# threading.Timer every 10 seconds, ran a blocking "dir | i file" against the whole
+# fleet on a second Nornir object on every tick, and SIGKILLed the script if a single
+# switch came back empty. Now a single background thread samples every downloading
+# switch over its own lightweight netmiko session (opened next to the session the copy
+# is running on, look at MONITOR below) using a small fixed pool of workers. From the
+# samples it keeps a per-switch download speed and ETA, a fleet-wide ETA, and flags
+# any switch whose file hasn't grown in a while as stalled. The sampling interval
+# backs off while every download is moving along steadily and speeds back up once a
+# switch gets close to finishing. Every setting can be changed in the "progress"
+# section of config.yaml.
+
+from concurrent.futures import ThreadPoolExecutor
+import ios_connections                                  # Connection manager, the monitor never goes over a switch's session cap
+import ios_parsers                                      # parseDir() lives here
+from nornir.core.plugins.connections import ConnectionPluginRegister
+from nornir_netmiko.connections import Netmiko
+import threading
+import time
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+DEFAULTS = {
+    "min_interval": 5,                                  # Fastest sampling interval in seconds, used when a switch is close to finishing
+    "max_interval": 60,                                 # Slowest sampling interval in seconds
+    "stall_after": 120,                                 # Seconds without the file growing before a switch is flagged as stalled
+    "workers": 20,                                      # Max number of switches sampled at once
+}
+
+MONITOR = "netmiko_monitor"                             # Second netmiko connection on every host, so sampling never touches the session the copy is running on
+ConnectionPluginRegister.register(MONITOR, Netmiko)
+
+
+
+# PROGRESS OPTIONS
+# Function merges the "progress" section of config.yaml over the defaults above
+################################################################################
+def progressOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("progress", {}) or {})
+    return options
+
+
+
+# FORMAT SECONDS
+# Function turns a number of seconds into HH:MM:SS, or "--:--:--" if it is unknown
+################################################################################
+def formatSeconds(seconds):
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+
+# PROGRESS MONITOR
+# Samples how much of the file every downloading host has on a single background
+# thread until every host is done or stop() is called
+################################################################################
+class ProgressMonitor:
+    def __init__(self, nr, hostnames, filename, filesize):
+        self.nr = nr
+        self.filename = filename
+        self.filesize = filesize
+        self.options = progressOptions(nr)
+        self.interval = self.options["min_interval"]
+        self.stopped = threading.Event()
+        self.thread = None
+        self.pool = None
+        self.hosts = {}                                 # Hostname -> progress of the host's download, look at update()
+        for hostname in hostnames:
+            self.hosts[hostname] = {"size": 0, "rate": None, "sampled": None, "changed": None, "done": False, "reported": False, "error": False}
+
+
+    # Starts sampling on the background thread
+    def start(self):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(self.options["workers"], len(self.hosts))), thread_name_prefix="progress")
+        self.thread = threading.Thread(target=self.run, name="progress-monitor", daemon=True)
+        self.thread.start()
+
+
+    # Stops sampling and closes every monitor session
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+        for hostname in self.hosts:
+            ios_connections.evict(self.nr.inventory.hosts[hostname], MONITOR)
+
+
+    def run(self):
+        while not self.stopped.is_set():
+            pending = [hostname for hostname, entry in self.hosts.items() if not entry["done"]]
+            if len(pending) == 0:
+                return
+            changed = False
+            for hostname, size in zip(pending, self.pool.map(self.sample, pending)):
+                changed = self.update(hostname, size, time.time()) or changed
+            self.report()
+            self.interval = self.nextInterval(changed)
+            self.stopped.wait(self.interval)
+
+
+    # Returns how many bytes of the file the host has, or None if the host couldn't
+    # be checked (including when the switch has no free session slot). Ran on the
+    # worker pool.
+    def sample(self, hostname):
+        host = self.nr.inventory.hosts[hostname]
+        try:
+            with ios_connections.session(host, MONITOR, self.nr.config, wait=False, retries=0) as connection:
+                if connection is None:
+                    return None
+                output = connection.send_command(f"dir flash:{self.filename}", read_timeout=15)
+        except Exception:                               # Session dropped or the switch is too busy to log into, opened again next time around
+            ios_connections.evict(host, MONITOR)
+            return None
+        files = ios_parsers.parseDir(output).files
+        if self.filename not in files:                  # Copy hasn't started yet, usually waiting in line for a transfer slot
+            return 0
+        return files[self.filename].size
+
+
+    # Updates the host's speed with the new sample. Returns True if the host started,
+    # finished, or started over since the last sample.
+    def update(self, hostname, size, now):
+        entry = self.hosts[hostname]
+        entry["error"] = size is None
+        if size is None:
+            return False
+
+        changed = False
+        if size > entry["size"]:
+            if entry["size"] == 0:
+                changed = True
+            if entry["sampled"] is not None:
+                rate = (size - entry["size"]) / max(now - entry["sampled"], 0.001)
+                if entry["rate"] is None:
+                    entry["rate"] = rate
+                else:
+                    entry["rate"] = 0.3 * rate + 0.7 * entry["rate"]    # Smoothed so a single slow sample doesn't throw off the ETA
+            entry["changed"] = now
+        elif size < entry["size"]:                      # Partial file was deleted and the copy started over
+            changed = True
+            entry["changed"] = now
+
+        entry["size"] = size
+        entry["sampled"] = now
+        if size >= self.filesize:
+            entry["done"] = True
+            changed = True
+            ios_connections.evict(self.nr.inventory.hosts[hostname], MONITOR)
+        return changed
+
+
+    # Seconds left on the host's download, or None if it isn't moving yet
+    def eta(self, entry):
+        if entry["done"]:
+            return 0
+        if entry["rate"] is None or entry["rate"] <= 0 or entry["size"] == 0:
+            return None
+        return (self.filesize - entry["size"]) / entry["rate"]
+
+
+    # True if the host's download started but the file hasn't grown in a while
+    def stalled(self, entry):
+        if entry["done"] or entry["size"] == 0 or entry["changed"] is None:
+            return False
+        return time.time() - entry["changed"] >= self.options["stall_after"]
+
+
+    # Seconds until every host is done. Hosts still waiting for a transfer slot are
+    # covered by dividing every byte left by the combined speed of the running
+    # downloads, so the ETA never drops below the slowest running download.
+    def fleetEta(self):
+        remaining = 0
+        totalRate = 0
+        slowest = 0
+        for entry in self.hosts.values():
+            if entry["done"]:
+                continue
+            remaining = remaining + self.filesize - entry["size"]
+            eta = self.eta(entry)
+            if eta is not None and not self.stalled(entry):
+                totalRate = totalRate + entry["rate"]
+                slowest = max(slowest, eta)
+        if remaining == 0:
+            return 0
+        if totalRate == 0:
+            return None
+        return max(slowest, remaining / totalRate)
+
+
+    # Samples quickly while downloads are starting or finishing and backs off while
+    # every download is moving along steadily
+    def nextInterval(self, changed):
+        soonest = min([eta for eta in (self.eta(entry) for entry in self.hosts.values() if not entry["done"]) if eta is not None], default=None)
+        if changed or (soonest is not None and soonest < 2 * self.interval):
+            interval = self.options["min_interval"]
+            if soonest is not None:
+                interval = max(interval, soonest / 2)
+        else:
+            interval = self.interval * 1.5
+        return min(interval, self.options["max_interval"])
+
+
+    # Prints every running download along with a summary line for the whole fleet
+    def report(self):
+        waiting = 0
+        done = 0
+        stalled = 0
+        for hostname, entry in self.hosts.items():
+            percent = round(100 * entry["size"] / self.filesize, 1)
+            if entry["done"]:
+                done = done + 1
+                if not entry["reported"]:               # Only printed on the sample it finished on
+                    entry["reported"] = True
+                    print(f"{GREEN}{hostname}{CLEAR} - 100.0% downloaded")
+            elif entry["error"]:
+                print(f"{RED}{hostname}{CLEAR} - {percent}% downloaded (unable to check, trying again)")
+            elif entry["size"] == 0:
+                waiting = waiting + 1
+            elif self.stalled(entry):
+                stalled = stalled + 1
+                print(f"{RED}{hostname}{CLEAR} - {percent}% downloaded, STALLED for {formatSeconds(time.time() - entry['changed'])}")
+            else:
+                rate = 0 if entry["rate"] is None else entry["rate"]
+                print(f"{hostname} - {percent}% downloaded ({round(rate / 1048576, 2)} MiB/s, ETA {formatSeconds(self.eta(entry))})")
+
+        running = len(self.hosts) - done - waiting
+        print(f"{done} done, {running} downloading ({stalled} stalled), {waiting} waiting - fleet ETA {formatSeconds(self.fleetEta())}\n")
@@ -0,0 +1,151 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the reboot readiness detector that replaced the old "sleep 5 minutes
+# then napalm_get every switch every 30 seconds" loop in checkAliveReboot2(). A single
+# asyncio event loop (running on its own background thread) watches every rebooting
+# switch at once using nothing but cheap TCP connections to the SSH port and reading
+# the "SSH-2.0-..." banner. Each switch goes through three states:
+#   1. Waiting for the switch to actually go down (the reload really started)
+#   2. Waiting for the SSH banner to come back, polling with a backoff that speeds back
+#      up once the switch gets close to how long the other switches took to come back
+#   3. Opening a real CLI session, which is the point the switch is marked as ready
+# Every setting can be changed in the "reboot" section of config.yaml.
+
+import asyncio
+import ios_connections                                  # Connection manager, look at cliCheck()
+import statistics
+import threading
+import time
+
+
+DEFAULTS = {
+    "port": 22,                                         # Port probed for the SSH banner
+    "probe_timeout": 5,                                 # Seconds to wait on a single connection/banner
+    "down_timeout": 900,                                # Seconds to wait for the switch to go down before assuming the reload was missed
+    "max_wait": 3600,                                   # Seconds before giving up on a switch entirely
+    "min_interval": 5,                                  # Fastest polling interval in seconds
+    "max_interval": 30,                                 # Slowest polling interval in seconds
+}
+
+DETECTOR = None                                         # Shared ReadinessDetector, made the first time getDetector() is called
+DETECTOR_LOCK = threading.Lock()
+
+
+
+# REBOOT OPTIONS
+# Function merges the "reboot" section of config.yaml over the defaults above
+################################################################################
+def rebootOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("reboot", {}) or {})
+    return options
+
+
+
+# PROBE BANNER
+# Coroutine opens a TCP connection to the switch and returns True if it answers
+# with an SSH banner. Connection refused, timeouts, and resets all return False.
+################################################################################
+async def probeBanner(address, port, timeout):
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        banner = await asyncio.wait_for(reader.readline(), timeout)
+        return banner.startswith(b"SSH-")
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+
+# CLI CHECK
+# Function closes out the host's dead sessions from before the reboot and opens a
+# fresh netmiko session. Returns True once the switch accepts a CLI session.
+# Ran on the event loop's thread pool since netmiko is blocking.
+################################################################################
+def cliCheck(host, configuration):
+    ios_connections.evict(host)
+    try:
+        ios_connections.connect(host, "netmiko", configuration, retries=0)    # Polling is already the retry, no backoff on top of it
+        return True
+    except Exception:                                   # Banner is up but the switch isn't taking logins quite yet
+        ios_connections.evict(host)
+        return False
+
+
+
+# READINESS DETECTOR
+# Owns the background event loop every host is watched on
+################################################################################
+class ReadinessDetector:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="reboot-detector", daemon=True)
+        self.thread.start()
+        self.downDurations = []                         # How long every switch so far was down for, used to speed polling back up
+
+
+    # Median of how long the switches watched so far have been down, or None
+    def expectedDowntime(self):
+        if len(self.downDurations) == 0:
+            return None
+        return statistics.median(self.downDurations)
+
+
+    # Coroutine that walks a single host through the three states explained at the
+    # top of the script. Returns a dict with the final state of the host.
+    async def watchHost(self, host, configuration, options):
+        start = time.time()
+        status = {"ready": False, "sawDown": False, "downtime": None, "elapsed": 0}
+        address = host.hostname
+        port = host.port or options["port"]             # Port set on the host in hosts.yaml wins over the config.yaml default
+        timeout = options["probe_timeout"]
+
+        while time.time() - start < options["down_timeout"]:    # State 1: waiting for the reload to start
+            if not await probeBanner(address, port, timeout):
+                status["sawDown"] = True
+                break
+            await asyncio.sleep(options["min_interval"])
+
+        downStart = time.time()
+        interval = options["min_interval"]
+        while time.time() - start < options["max_wait"]:        # States 2 and 3: waiting for the switch to come back
+            if await probeBanner(address, port, timeout):
+                ready = await self.loop.run_in_executor(None, cliCheck, host, configuration)
+                if ready:
+                    status["ready"] = True
+                    if status["sawDown"]:
+                        status["downtime"] = round(time.time() - downStart)
+                        self.downDurations.append(status["downtime"])
+                    break
+                interval = options["min_interval"]      # Almost there, polling fast again
+            else:
+                expected = self.expectedDowntime()
+                if expected is not None and time.time() - downStart >= expected - 2 * options["min_interval"]:
+                    interval = options["min_interval"]  # Getting close to when the other switches came back
+                else:
+                    interval = min(options["max_interval"], interval * 1.5)
+            await asyncio.sleep(interval)
+
+        status["elapsed"] = round(time.time() - start)
+        return status
+
+
+    # Starts watching a host, returns a concurrent.futures.Future holding the status
+    def watch(self, host, configuration, options):
+        return asyncio.run_coroutine_threadsafe(self.watchHost(host, configuration, options), self.loop)
+
+
+
+# GET DETECTOR
+# Function returns the shared detector, starting it the first time it is needed
+################################################################################
+def getDetector():
+    global DETECTOR
+    with DETECTOR_LOCK:
+        if DETECTOR is None:
+            DETECTOR = ReadinessDetector()
+    return DETECTOR
@@ -0,0 +1,117 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the pre-upgrade config remediation used by the INSTALL and BUNDLE
+# scripts. The config fixes used to each be their own fleet-wide trip with their own
+# save: setIgnoreStartupCfg() opened a config session and saved, resetBootVar() (or
+# removeBundleBoot()) opened two more config sessions and saved again, and
+# checkAutoUpgrade() opened a config session and saved once per switch that needed it.
+# On a big stack every "write memory" takes several seconds. Now the config every switch
+# needs is worked out from its facts (look at ios_facts.py) ahead of time:
+#   - "no system ignore startupconfig switch all" unless "show romvar" shows that
+#     SWITCH_IGNORE_STARTUP_CFG is already 0 on every member
+#   - "software auto-upgrade enable" (INSTALL script only) unless it is already there
+#   - "no boot system" + "boot system flash:packages.conf" unless that is already the
+#     one and only boot variable
+# and whatever is left is sent in a single config session followed by a single save.
+# A switch that doesn't need anything isn't touched at all.
+
+import ios_pipeline                                     # Every switch is fixed as a single pipeline stage
+from nornir.core.task import Task, Result
+from nornir_netmiko.tasks import netmiko_send_config
+from nornir_netmiko.tasks import netmiko_save_config
+import swan_logger                                      # Custom written logger script, look at remediateTask()
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+IGNORE_STARTUP = "no system ignore startupconfig switch all"
+AUTO_UPGRADE = "software auto-upgrade enable"
+BOOT_VAR = "boot system flash:packages.conf"
+
+
+
+# PLAN REMEDIATION
+# Function returns the config commands a single switch needs before it can be
+# upgraded, worked out from its facts. An empty list means nothing needs changing.
+################################################################################
+def planRemediation(facts, autoUpgrade=False):
+    commands = []
+    if facts.get("ignoreStartupCfg") is not False:      # None (register not shown, or cached before it was gathered) gets the command just in case
+        commands.append(IGNORE_STARTUP)
+    if autoUpgrade and not facts.get("autoUpgrade", False):
+        commands.append(AUTO_UPGRADE)
+    if facts.get("bootVar") != [BOOT_VAR]:              # Boot variable on next reload only updates after saving config
+        commands.extend(["no boot system", BOOT_VAR])
+    return commands
+
+
+
+# REMEDIATE TASK
+# Pipeline stage that sends a switch's planned config in one config session and
+# saves once, keeping its facts in line with the new config
+################################################################################
+def remediateTask(task: Task, context, facts, autoUpgrade=False) -> Result:
+    hostFacts = facts[task.host.name]
+    commands = planRemediation(hostFacts, autoUpgrade)
+    if len(commands) == 0:
+        return Result(host=task.host, result=[])
+
+    output = task.run(task=netmiko_send_config, config_commands=commands)
+    swan_logger.taskLogger(task, "; ".join(commands), output.result)
+    output2 = task.run(task=netmiko_save_config)
+    swan_logger.taskLogger(task, "write memory", output2.result)
+
+    hostFacts["ignoreStartupCfg"] = False               # Keeping the facts (and the facts cache) in line with the new config
+    if AUTO_UPGRADE in commands:
+        hostFacts["autoUpgrade"] = True
+    hostFacts["bootVar"] = [BOOT_VAR]
+    return Result(host=task.host, result=commands)
+
+
+
+# REMEDIATE
+# Function plans and applies the pre-upgrade config on every host in the Nornir
+# object. Returns a list of the hosts that made it through.
+################################################################################
+def remediate(nr, facts, autoUpgrade=False):
+    """
+    Fixes the config of every switch that needs it before the upgrade.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object.
+    facts : dict
+        Inventory name -> facts dictionary from ios_facts.gatherFacts(), updated
+        in place with the new config.
+    autoUpgrade : bool, optional
+        Whether "software auto-upgrade enable" is needed, which is only the case
+        in the INSTALL script. By default this is False.
+
+    Returns
+    -------
+    list
+        Inventory names of every host that is configured and saved (or didn't
+        need anything).
+    """
+    print("Checking switch config before the upgrade")
+    planned = 0
+    for hostname in nr.inventory.hosts:
+        commands = planRemediation(facts[hostname], autoUpgrade)
+        if len(commands) != 0:
+            print(f"{RED}{hostname}{CLEAR} needs: {', '.join(commands)}")
+            planned = planned + 1
+    if planned == 0:
+        print("All switches are already configured, nothing to change\n")
+        return list(nr.inventory.hosts)
+
+    output = ios_pipeline.runPipeline(nr, [ios_pipeline.stage("config", remediateTask, facts=facts, autoUpgrade=autoUpgrade)], name="config")
+    ios_pipeline.checkPipeline(output)
+    contexts = ios_pipeline.pipelineContexts(output)
+    changed = [hostname for hostname in contexts if len(contexts[hostname]["config"]) != 0]
+    print(f"{len(changed)} of {planned} switches configured and saved\n")
+    return list(contexts)
@@ -0,0 +1,327 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the Nornir runner plugin every script uses ("swan" in the runner
+# section of config.yaml). The stock threaded runner gave every nr.run() the same
+# num_workers, whether it was a 1 second "show version" or a 90 minute SCP, and ran
+# the hosts in whatever order they were in hosts.yaml. This runner adds:
+#   - A worker budget per task class. Every pipeline stage (and any other nr.run())
+#     is sorted into a class by its name (EX: the "transfer" and "stackCopy" stages
+#     are both "transfer", look at TASK_CLASSES), and only that class's number of
+#     switches can be inside of it at once instead of num_workers
+#   - Per-group caps, a group with max_workers in its data section of groups.yaml
+#     never has more than that many of its switches holding a worker at once. A
+#     capped switch is skipped over and the next one in line gets the worker instead
+#   - Longest expected job first. For facts, transfers, and MD5 checks the switches
+#     that should take the longest (big stacks, slow WAN sites going off of the
+#     transfer history in ios_timeouts.py) are handed a worker first, so the run
+#     isn't left waiting on one slow switch that happened to be at the bottom of hosts.yaml
+# A pipeline (look at ios_pipeline.py) gives every switch its own thread, and a switch
+# only holds on to a worker while it is inside of a stage that is in a task class.
+# A switch waiting on its reboot wave (look at ios_waves.py), on the rest of its site
+# (look at ios_fanout.py), or on its reboot isn't taking a worker from anyone.
+# That is on purpose and not a fixed size pool of threads: those waits block the
+# thread, and they wait on switches further back in line (a source waits on the rest
+# of its site to copy from it, a switch in wave 3 waits on waves 1 and 2). With a
+# pool smaller than the inventory, every thread can end up waiting on a switch that
+# never gets a thread. Since a thread is mostly just its stack sitting in a wait,
+# the number of switches a single pipeline will take is capped by max_threads
+# instead, and the workers per task class are what actually limit the load.
+
+import ios_cache                                        # Stack sizes come out of the facts cache
+import ios_timeouts                                     # Transfer and MD5 speeds come out of the timing history
+from contextlib import contextmanager
+from nornir.core.plugins.runners import RunnersPluginRegister
+from nornir.core.task import AggregatedResult
+import bisect
+import statistics
+import threading
+
+
+TASK_CLASSES = {                                        # Pipeline stage name (or name passed to nr.run()) -> task class
+    "facts": "facts",
+    "config": "facts",
+    "versionCheck": "facts",
+    "transfer": "transfer",
+    "stackCopy": "transfer",
+    "md5": "md5",
+    "upgrade": "activate",
+}
+
+LONGEST_FIRST = {                                       # Task class -> timing history kind its expected time is sized off of
+    "facts": None,                                      # Stack size only
+    "transfer": "transfer",
+    "md5": "md5",
+}
+
+CURRENT = threading.local()                             # Slot budget of the pipeline run the current thread is walking a host through
+
+
+
+# HOST GROUPS
+# Function returns every group the host is in, including the groups of its groups
+################################################################################
+def hostGroups(host):
+    groups = []
+    pending = list(host.groups)
+    while len(pending) != 0:
+        group = pending.pop(0)
+        if group not in groups:
+            groups.append(group)
+            pending.extend(group.groups)
+    return groups
+
+
+
+# GROUP CAPS
+# Function returns group name -> max_workers for every group of the passed hosts
+# that has one set in groups.yaml
+################################################################################
+def groupCaps(hosts):
+    caps = {}
+    for host in hosts:
+        for group in hostGroups(host):
+            cap = group.data.get("max_workers")
+            if cap is not None:
+                caps[group.name] = int(cap)
+    return caps
+
+
+
+# EXPECTED COSTS
+# Function returns hostname -> how long the task is expected to take on the host,
+# relative to the other hosts (number of switches in the stack times how slow the
+# host's transfers or MD5 checks have been). Hosts without any history get the
+# median speed of the hosts that have some.
+################################################################################
+def expectedCosts(nr, hosts, kind):
+    facts = ios_cache.cachedFacts(nr, trusted=[host.name for host in hosts])
+    rates = {}
+    if kind is not None:
+        for host in hosts:
+            rate = ios_timeouts.expectedRate(nr, host, kind)
+            if rate is not None and rate > 0:
+                rates[host.name] = rate
+    fallback = statistics.median(rates.values()) if len(rates) != 0 else 1
+
+    costs = {}
+    for host in hosts:
+        stack = facts.get(host.name, {}).get("stack", 1)
+        costs[host.name] = stack / rates.get(host.name, fallback)
+    return costs
+
+
+
+# PIPELINE STAGES
+# Function returns the name of every stage if the nr.run() is a pipeline (look at
+# ios_pipeline.runPipeline()), or None for any other task
+################################################################################
+def pipelineStages(task):
+    if getattr(task.task, "__name__", None) != "pipelineTask":
+        return None
+    return [element["name"] for element in task.params.get("stages", [])]
+
+
+
+# SLOT BUDGET
+# Shared between every host's thread in a pipeline run. Hands out the workers of
+# each task class (and room under the group caps) to the hosts waiting on them,
+# the host that is first in line for the class going first.
+################################################################################
+class SlotBudget:
+    def __init__(self, tasks, workers, caps, ranks):
+        self.tasks = tasks                              # Stage name -> task class
+        self.free = dict(workers)                       # Task class -> number of free workers
+        self.caps = caps
+        self.ranks = ranks                              # Task class -> {hostname: place in line}
+        self.running = {}                               # Group name -> number of its hosts holding a worker right now
+        self.waiting = {}                               # Task class -> sorted [(place in line, hostname)]
+        self.events = {}                                # (task class, hostname) -> (Host, Event set once the host has its worker)
+        self.lock = threading.Lock()
+
+
+    def fits(self, host):
+        return all(self.running.get(group.name, 0) < self.caps[group.name] for group in hostGroups(host) if group.name in self.caps)
+
+
+    # Hands out every free worker it can. Called with the lock held.
+    def dispatch(self):
+        for taskClass, waiting in self.waiting.items():
+            i = 0
+            while i < len(waiting) and self.free[taskClass] > 0:
+                host, event = self.events[(taskClass, waiting[i][1])]
+                if not self.fits(host):
+                    i = i + 1                           # Group is at its cap, the next host in line gets the worker instead
+                    continue
+                del waiting[i]
+                del self.events[(taskClass, host.name)]
+                self.free[taskClass] = self.free[taskClass] - 1
+                for group in hostGroups(host):
+                    if group.name in self.caps:
+                        self.running[group.name] = self.running.get(group.name, 0) + 1
+                event.set()
+
+
+    # Blocks until the host has one of the task class's workers
+    def acquire(self, host, taskClass):
+        event = threading.Event()
+        with self.lock:
+            bisect.insort(self.waiting.setdefault(taskClass, []), (self.ranks[taskClass][host.name], host.name))
+            self.events[(taskClass, host.name)] = (host, event)
+            self.dispatch()
+        event.wait()
+
+
+    def release(self, host, taskClass):
+        with self.lock:
+            self.free[taskClass] = self.free[taskClass] + 1
+            for group in hostGroups(host):
+                if group.name in self.caps:
+                    self.running[group.name] = self.running[group.name] - 1
+            self.dispatch()
+
+
+
+# SLOT
+# Holds one of the workers of the stage's task class for the length of a with
+# block. Stages that aren't in a task class, and pipelines that aren't running on
+# the swan runner, go straight through.
+################################################################################
+@contextmanager
+def slot(host, name):
+    budget = getattr(CURRENT, "budget", None)
+    taskClass = budget.tasks.get(name) if budget is not None else None
+    if taskClass is None:
+        yield
+        return
+    budget.acquire(host, taskClass)
+    try:
+        yield
+    finally:
+        budget.release(host, taskClass)
+
+
+
+# SWAN RUNNER
+# Nornir runner plugin, configured under "runner" in config.yaml:
+#   runner:
+#       plugin: swan
+#       options:
+#           num_workers: 100        Workers for anything not in a task class below
+#           max_threads: 5000       Most switches a single pipeline will run (one thread each)
+#           classes:                Task class -> workers
+#               facts: 200
+#               transfer: 100
+################################################################################
+class SwanRunner:
+    def __init__(self, num_workers=20, classes=None, tasks=None, max_threads=5000):
+        self.num_workers = num_workers
+        self.max_threads = max_threads                  # Pipelines with more hosts than this are refused, look at runPipeline()
+        self.classes = dict(classes or {})              # Task class -> number of workers
+        self.tasks = dict(TASK_CLASSES)
+        self.tasks.update(tasks or {})                  # Any task name can be moved into a class in config.yaml
+
+
+    # Task class of the nr.run(), or None if it isn't in one
+    def taskClass(self, task):
+        return self.tasks.get(task.name)
+
+
+    # Hosts in the order they should be started in
+    def order(self, task, hosts, taskClass):
+        if taskClass not in LONGEST_FIRST or task.nornir is None:
+            return list(hosts)
+        try:
+            costs = expectedCosts(task.nornir, hosts, LONGEST_FIRST[taskClass])
+        except Exception:                               # Cache or timing history can't be read, hosts.yaml order it is
+            return list(hosts)
+        return sorted(hosts, key=lambda host: costs[host.name], reverse=True)  # Stable, so equal costs keep hosts.yaml order
+
+
+    # Every host gets its own thread, and only holds on to a worker while it is
+    # inside of a stage that is in a task class (look at slot()). Look at the top of
+    # the script for why this isn't a fixed size pool. Exits before starting any
+    # thread if there are more hosts than max_threads.
+    def runPipeline(self, task, hosts, stages):
+        if self.max_threads is not None and len(hosts) > int(self.max_threads):
+            raise SystemExit(f"{len(hosts)} switches is more than the {self.max_threads} a single pipeline runs (max_threads in the runner section "
+                             "of config.yaml), run the script on a smaller inventory or raise max_threads")
+        classes = set(self.tasks[name] for name in stages if name in self.tasks)
+        workers = {}
+        ranks = {}
+        for taskClass in classes:
+            workers[taskClass] = int(self.classes.get(taskClass, self.num_workers))
+            ranks[taskClass] = {host.name: i for i, host in enumerate(self.order(task, hosts, taskClass))}
+        budget = SlotBudget(self.tasks, workers, groupCaps(hosts), ranks)
+        results = {}
+
+        def worker(host):
+            CURRENT.budget = budget
+            try:
+                results[host.name] = task.copy().start(host)
+            finally:
+                CURRENT.budget = None
+
+        threads = [threading.Thread(target=worker, args=(host,), name=f"swan-pipeline-{host.name}", daemon=True) for host in hosts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.aggregate(task, hosts, results)
+
+
+    def run(self, task, hosts):
+        stages = pipelineStages(task)
+        if stages is not None:
+            return self.runPipeline(task, hosts, stages)
+
+        taskClass = self.taskClass(task)
+        workers = int(self.classes.get(taskClass, self.num_workers)) if taskClass is not None else self.num_workers
+        pending = self.order(task, hosts, taskClass)
+        caps = groupCaps(hosts)
+        running = {}                                    # Group name -> number of its hosts running right now
+        results = {}
+        condition = threading.Condition()
+
+        def fits(host):
+            return all(running.get(group.name, 0) < caps[group.name] for group in hostGroups(host) if group.name in caps)
+
+        def worker():
+            while True:
+                with condition:
+                    while True:
+                        if len(pending) == 0:
+                            return
+                        host = next((element for element in pending if fits(element)), None)
+                        if host is not None:
+                            break
+                        condition.wait()        # Every host left is in a group that is at its cap
+                    pending.remove(host)
+                    groups = [group.name for group in hostGroups(host) if group.name in caps]
+                    for name in groups:
+                        running[name] = running.get(name, 0) + 1
+                try:
+                    results[host.name] = task.copy().start(host)
+                finally:
+                    with condition:
+                        for name in groups:
+                            running[name] = running[name] - 1
+                        condition.notify_all()
+
+        threads = [threading.Thread(target=worker, name=f"swan-runner-{i}", daemon=True) for i in range(max(1, min(workers, len(hosts))))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.aggregate(task, hosts, results)
+
+
+    def aggregate(self, task, hosts, results):
+        result = AggregatedResult(task.name)
+        for host in hosts:                              # Back in hosts.yaml order, same as the threaded runner
+            result[host.name] = results[host.name]
+        return result
+
+
+
+RunnersPluginRegister.register("swan", SwanRunner)
@@ -0,0 +1,385 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the per-host versions of the steps in the INSTALL, BUNDLE, and
+# download scripts so that they can be chained together with ios_pipeline.py.
+# Every function in here is a Nornir task that only ever touches a single host,
+# takes the host's pipeline context as its first argument after task, and returns
+# a Result whose result gets stored in the context under the stage's name.
+# A stage that needs to stop the host from going any further returns a failed Result.
+
+from contextlib import nullcontext
+from datetime import datetime
+import ios_async                                        # Optional asyncio transport, the long copies, MD5 checks, and installs are sent over it when it is turned on
+import ios_cache                                        # Every task that changes a switch throws out its cached facts first
+import ios_connections                                  # Connection manager, dead sessions are thrown out through it
+import ios_fanout                                       # Peer-to-peer fan-out, look at scpTask()
+import ios_facts                                        # factsTask() is reused to check the version after a reboot
+import ios_flash                                        # Flash index, kept up to date after every copy and delete
+import ios_ledger                                       # Verified-image ledger, lets md5Task() skip files that were already hashed
+import ios_mirrors                                      # Mirror selection, look at scpTask()
+import ios_parsers                                      # Transfer and MD5 output is parsed in here
+import ios_reboot                                       # Reboot readiness detector, look at rebootWaitTask()
+import ios_timeouts                                     # Adaptive read timeouts, look at copyFromSource() and md5Task()
+import ios_timing                                       # install add and activate are timed on their own inside of the upgrade stage
+from nornir.core.exceptions import NornirSubTaskError
+from nornir.core.task import Task, Result
+from nornir_netmiko.tasks import netmiko_send_command
+from nornir_netmiko.tasks import netmiko_save_config
+import swan_logger                                      # Custom written logger script, look at taskLogger() or script for more details
+import time
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+
+
+# COPY FROM SOURCE
+# Function runs a single "copy" of the file from the passed source URL (a file
+# server or a peer switch) on the host, a password of None meaning an HTTP(S) copy.
+# The read timeout is sized off of this switch's (or its site's) previous copies of
+# the same kind (look at ios_timeouts.py), with readTimeout as the most it can be.
+# A copy that times out has its session and partial file thrown out and is started
+# over up to "retries" times. If a TransferScheduler is passed, the copy only
+# starts once the scheduler hands out a slot for the server. With the async
+# transport turned on, the copy itself is sent over it (look at ios_async.py) while
+# this thread waits on it. Returns the output of the copy, raises
+# NornirSubTaskError if the copy never finished (with the partial file already
+# deleted).
+################################################################################
+def copyFromSource(task: Task, source, server, filename, filesize, password, readTimeout, scheduler=None, kind="transfer"):
+    options = ios_timeouts.timeoutOptions(task.nornir)
+    timeout = ios_timeouts.estimateTimeout(task.nornir, task.host, kind, filesize, readTimeout)
+    command = f"copy {source} flash:/{filename}"
+
+    slot = nullcontext()
+    if scheduler is not None:                           # Waits in line for a free transfer slot, look at ios_transfers.py
+        slot = scheduler.slot(task.host, server)
+    with slot:
+        attempt = 0
+        while True:
+            try:
+                if ios_async.enabled(task.nornir):      # Copy is sent over the async transport, every step is logged in there
+                    output3 = task.run(task=ios_async.dialogTask, dialog=ios_async.copyDialog, command=command, password=password, timeout=timeout)
+                else:
+                    output = task.run(task=netmiko_send_command, command_string=command, expect_string=r'Destination filename', read_timeout=60)
+                    swan_logger.taskLogger(task, command, output.result, "STARTCOMMAND")
+
+                    if password is None:                # HTTP(S) copy, goes straight into the download after the destination filename
+                        output3 = task.run(task=netmiko_send_command, command_string="", expect_string=r"copied", read_timeout=timeout, cmd_verify=False)
+                        swan_logger.taskLogger(task, "", output3.result, "ENDCOMMAND")
+                    else:
+                        output2 = task.run(task=netmiko_send_command, command_string="", expect_string=r"Password", read_timeout=5)    # Blank string to accept the destination filename, then a 5 second wait on the password prompt
+                        swan_logger.taskLogger(task, "", output2.result, "CONTINUECOMMAND")
+
+                        output3 = task.run(task=netmiko_send_command, command_string=password, expect_string=r"copied", read_timeout=timeout, cmd_verify=False)
+                        swan_logger.taskLogger(task, "***DO NOT ACTUALY LOG PASSWORD***", output3.result, "ENDCOMMAND")
+                ios_timeouts.recordTransfer(task.nornir, task.host, output3.result, kind)
+                break
+            except NornirSubTaskError:
+                ios_connections.evict(task.host, "netmiko")    # Stuck session is thrown out along with the partial file, the progress monitor's session is left alone
+                deleteCommand = f"delete /force flash:{filename}"
+                output = task.run(task=netmiko_send_command, command_string=deleteCommand)
+                swan_logger.taskLogger(task, deleteCommand, output.result)
+                ios_flash.recordDelete(task.host.name, filename)
+                if attempt >= options["retries"]:
+                    raise
+                attempt = attempt + 1
+                print(f"{RED}{task.host.name}{CLEAR}'s copy from {server} did not finish within {timeout} seconds, starting it over")
+                timeout = min(timeout * 2, readTimeout)
+
+    ios_flash.forget([task.host.name], "flash:")        # Listed again on the next lookup (md5Task()) for the new file's exact size and date
+    return output3.result
+
+
+
+# COPY FROM MIRRORS
+# Function pulls the file from the fastest mirror for this switch (look at
+# ios_mirrors.py), moving on to the next mirror whenever a copy fails. Returns the
+# output of the copy and the mirror it came from.
+################################################################################
+def copyFromMirrors(task: Task, mirrors, filename, filesize, fileUsername, filePassword, readTimeout, scheduler=None):
+    mirrors = ios_mirrors.rankMirrors(task, mirrors)
+    for i in range(len(mirrors)):
+        mirror = mirrors[i]
+        source = ios_mirrors.mirrorSource(mirror, filename, fileUsername)
+        password = filePassword
+        if mirror["protocol"] != "scp":                 # HTTP(S) copies don't ask for a password
+            password = None
+        try:
+            result = copyFromSource(task, source, mirror["ip"], filename, filesize, password, readTimeout, scheduler)
+            ios_mirrors.recordMirror(task.nornir, task.host, mirror, result)
+            return result, mirror["ip"]
+        except NornirSubTaskError:
+            if i == len(mirrors) - 1:                   # Every mirror failed
+                raise
+            print(f"{RED}{task.host.name}{CLEAR} could not copy {filename} from {mirror['ip']}, moving on to {mirrors[i+1]['ip']}")
+
+
+
+# SCP TASK
+# Downloads the file onto a single host. The file server credentials are prompted for
+# once in main() before the pipeline starts, since every host is running this at
+# the same time. The file is pulled from the fastest of the passed mirrors, or just
+# FileServerIP if no mirrors are passed. If a PeerDistributor is passed (look at
+# ios_fanout.py), only one switch per site pulls from the mirrors and the rest copy
+# from a peer at their site, with every switch checking its MD5 right after its
+# copy so it can become a source for the rest of the site. Result is the "copied in"
+# portion of the copy output.
+################################################################################
+def scpTask(task: Task, context, ipAddress, folderPath, filename, filesize, fileUsername, filePassword, readTimeout,
+            scheduler=None, mirrors=None, distributor=None) -> Result:
+    ios_cache.invalidate(task.nornir, [task.host.name])
+    if mirrors is None:
+        mirrors = ios_mirrors.mirrorList(ipAddress, folderPath)[:1]
+
+    if distributor is None:
+        result, source = copyFromMirrors(task, mirrors, filename, filesize, fileUsername, filePassword, readTimeout, scheduler)
+    else:
+        peer = distributor.claim(task.host)
+        verified = False
+        try:
+            result = None
+            if peer is not None:
+                source = peer.name
+                try:
+                    result = copyFromSource(task, f"scp://{peer.username}@{peer.hostname}/flash:{filename}", peer.hostname,
+                                            filename, filesize, peer.password, readTimeout, kind="peer")
+                except NornirSubTaskError:
+                    print(f"{RED}{task.host.name}{CLEAR} could not copy {filename} from {peer.name}, pulling it from the file server instead")
+            if result is None:
+                result, source = copyFromMirrors(task, mirrors, filename, filesize, fileUsername, filePassword, readTimeout, scheduler)
+            task.run(task=md5Task, context=context, filename=filename, MD5=distributor.MD5, readTimeout=readTimeout)
+            ios_fanout.enableScpServer(task, distributor)
+            verified = True
+        finally:
+            distributor.finish(task.host, peer, verified)
+
+    transfer = ios_parsers.parseCopied(result)
+    duration = transfer.describe() if transfer is not None else "an unknown amount of time"
+    print(f"{GREEN}{task.host.name}{CLEAR} took {duration} to transfer {filename} from {source}")
+    return Result(host=task.host, result=duration)
+
+
+
+# MD5 TASK
+# Per-host version of MD5Checker(), fails the host if the hashes dont match. The
+# hash is skipped if the ledger shows this exact file (same size and timestamp,
+# looked up in the flash index) already passed an MD5 check on this switch.
+################################################################################
+def md5Task(task: Task, context, filename, MD5, readTimeout) -> Result:
+    task.run(task=ios_flash.dirTask, filesystem="flash:")   # Only reads the switch if flash: isn't indexed yet
+    metadata = ios_flash.lookup(task.host.name, filename)
+
+    if ios_ledger.isVerified(task.nornir, task.host.name, filename, metadata, MD5):
+        print(f"{GREEN}{task.host.name}{CLEAR}'s {filename} already matched the given MD5 and hasn't changed, skipping")
+        return Result(host=task.host, result=MD5.strip())
+
+    if metadata is not None:                            # Sized off of previous MD5 checks, look at ios_timeouts.py
+        readTimeout = ios_timeouts.estimateTimeout(task.nornir, task.host, "md5", metadata["size"], readTimeout)
+
+    command = "verify /md5 flash:" + filename
+    start = time.time()
+    if ios_async.enabled(task.nornir):                  # Hash is sent over the async transport, logged in there
+        output = task.run(task=ios_async.dialogTask, dialog=ios_async.md5Dialog, filename=filename, timeout=readTimeout)
+    else:
+        output = task.run(task=netmiko_send_command, command_string=command, read_timeout=readTimeout)
+        swan_logger.taskLogger(task, command, output.result)
+    if metadata is not None:
+        ios_timeouts.recordTiming(task.nornir, task.host, "md5", metadata["size"], time.time() - start)
+
+    parsed = ios_parsers.parseMd5(output.result)
+    fileHash = parsed.md5 if parsed is not None else "no hash"
+
+    if fileHash == MD5.strip().lower():
+        print(f"{GREEN}{task.host.name}{CLEAR}'s {filename} matches the given MD5")
+        ios_ledger.recordVerified(task.nornir, task.host.name, filename, metadata, MD5)
+        return Result(host=task.host, result=fileHash)
+
+    print(f"{RED}{task.host.name}{CLEAR}'s {filename} does not match the given MD5")
+    return Result(host=task.host, result=f"{fileHash} =/= {MD5.strip()}", failed=True)
+
+
+
+# MEMBER COPY TASK
+# Copies the file from flash: to a single stack member's flash and checks that the
+# copy on the member is the exact size of the file in flash:. A member that already
+# has the exact file is left alone, and one with a different file of the same name
+# has it deleted first (copying over the top of a file hangs on a prompt). Result
+# is the "copied in" portion of the copy output.
+################################################################################
+def memberCopyTask(task: Task, flash, filename, filesize, readTimeout) -> Result:
+    task.run(task=ios_flash.dirTask, filesystem=flash)  # Only reads the switch if this member's flash isn't indexed yet
+    existing = ios_flash.lookup(task.host.name, filename, flash)
+    if existing is not None and existing["size"] == filesize:
+        return Result(host=task.host, result="already there")
+    if existing is not None:
+        deleteCommand = f"delete /force {flash}{filename}"
+        output = task.run(task=netmiko_send_command, command_string=deleteCommand)
+        swan_logger.taskLogger(task, deleteCommand, output.result)
+        ios_flash.recordDelete(task.host.name, filename, flash)
+
+    timeout = ios_timeouts.estimateTimeout(task.nornir, task.host, "stack", filesize, readTimeout)
+    command = f"copy flash:{filename} {flash}{filename}"
+    try:
+        if ios_async.enabled(task.nornir):              # Same dialog as an HTTP(S) copy, no password prompt
+            output2 = task.run(task=ios_async.dialogTask, dialog=ios_async.copyDialog, command=command, password=None, timeout=timeout)
+        else:
+            output = task.run(task=netmiko_send_command, command_string=command, expect_string=r'Destination filename', read_timeout=60)
+            swan_logger.taskLogger(task, command, output.result, "STARTCOMMAND")
+
+            output2 = task.run(task=netmiko_send_command, command_string="", expect_string=r"copied", read_timeout=timeout, cmd_verify=False)
+            swan_logger.taskLogger(task, command, output2.result, "ENDCOMMAND")
+    except NornirSubTaskError:
+        ios_connections.evict(task.host, "netmiko")    # Stuck session is thrown out along with the partial file
+        deleteCommand = f"delete /force {flash}{filename}"
+        task.run(task=netmiko_send_command, command_string=deleteCommand)
+        ios_flash.recordDelete(task.host.name, filename, flash)
+        raise
+    ios_timeouts.recordTransfer(task.nornir, task.host, output2.result, "stack")
+
+    task.run(task=ios_flash.dirTask, filesystem=flash, refresh=True)   # Verifying the copy that actually landed on the member
+    copied = ios_flash.lookup(task.host.name, filename, flash)
+    if copied is None or copied["size"] != filesize:
+        size = copied["size"] if copied is not None else 0
+        return Result(host=task.host, result=f"{flash} has {size} of {filesize} bytes", failed=True)
+    return Result(host=task.host, result=output2.result)
+
+
+
+# STACK COPY TASK
+# Stage the BUNDLE script runs right after md5. Copies the file from flash: to
+# every other member of the host's stack (look at ios_facts.stackTargets() for the
+# order), one member after another since a switch only runs a single copy at a
+# time. Every host runs this as soon as its own MD5 checks out, so no stack waits
+# on another's download. A member that fails doesn't stop the rest of the members,
+# but fails the host at the end.
+# Technically not needed for the 9000 series switches as the one shot command
+# has a built-in "Initial File Sync" where it does the same, but I don't believe the
+# older switch models do this and this saves time during the one-shot command.
+################################################################################
+def stackCopyTask(task: Task, context, facts, filename, filesize, readTimeout) -> Result:
+    for member in facts[task.host.name]["members"]:
+        if not member["active"] and member["state"] != "Ready":
+            print(f"Skipping switch {member['number']} in {task.host.name}'s stack ({member['state']})")
+
+    copied = []
+    failed = []
+    for flash in ios_facts.stackTargets(facts[task.host.name]):
+        try:
+            task.run(task=memberCopyTask, name=f"copy to {flash}", flash=flash, filename=filename, filesize=filesize, readTimeout=readTimeout)
+            copied.append(flash)
+        except NornirSubTaskError:
+            print(f"{RED}{task.host.name}{CLEAR} could not copy {filename} to {flash[:-1]}")
+            failed.append(flash)
+
+    if len(failed) != 0:
+        return Result(host=task.host, result=f"Copy failed on {', '.join(failed)}", failed=True)
+    if len(copied) != 0:
+        print(f"{GREEN}{task.host.name}{CLEAR} has {filename} on every stack member ({', '.join(copied)})")
+    return Result(host=task.host, result=copied)
+
+
+
+# UPGRADE INSTALL TASK
+# Saves, expands the .bin with "install add", and activates it, reloading the switch
+################################################################################
+def upgradeInstallTask(task: Task, context, filename) -> Result:
+    ios_cache.invalidate(task.nornir, [task.host.name])
+    ios_flash.forget([task.host.name])                  # install add unpacks the .bin into flash
+    task.run(task=netmiko_save_config)                  # install activate complains if you haven't saved before an activation
+
+    if ios_async.enabled(task.nornir):                  # Both commands are sent over the async transport, every step is logged in there
+        with ios_timing.span(task.host.name, "install add"):
+            task.run(task=ios_async.dialogTask, dialog=ios_async.installAddDialog, filename=filename)
+        with ios_timing.span(task.host.name, "activate"):
+            task.run(task=ios_async.dialogTask, dialog=ios_async.activateDialog)
+    else:
+        command = "install add file flash:" + filename
+        with ios_timing.span(task.host.name, "install add"):
+            output = task.run(task=netmiko_send_command, command_string=command, read_timeout=600)
+        swan_logger.taskLogger(task, command, output.result)
+
+        command2 = "install activate"
+        with ios_timing.span(task.host.name, "activate"):
+            output2 = task.run(task=netmiko_send_command, command_string=command2, strip_command=False, read_timeout=600, expect_string=r"want to proceed", cmd_verify=False)
+            swan_logger.taskLogger(task, command2, output2.result, "STARTCOMMAND")
+
+            output3 = task.run(task=netmiko_send_command, command_string="y", strip_command=False, read_timeout=600, expect_string=r"will reload the system", cmd_verify=False)
+            swan_logger.taskLogger(task, "y", output3.result, "ENDCOMMAND")
+
+    tempTime = datetime.now().strftime("%I:%M:%S %p")
+    print(f"{task.host.name} is restarting - {tempTime}")
+    return Result(host=task.host, result=time.time())   # Time the reload started, used by rebootWaitTask()
+
+
+
+# UPGRADE BUNDLE TASK
+# Saves and runs the one-shot "install add file ... activate commit" command, reloading the switch
+################################################################################
+def upgradeBundleTask(task: Task, context, filename) -> Result:
+    ios_cache.invalidate(task.nornir, [task.host.name])
+    ios_flash.forget([task.host.name])                  # install add unpacks the .bin into flash
+    task.run(task=netmiko_save_config)
+
+    if ios_async.enabled(task.nornir):                  # The one-shot command has to stay in a single session, so it is timed as one phase
+        with ios_timing.span(task.host.name, "activate"):
+            task.run(task=ios_async.dialogTask, dialog=ios_async.bundleDialog, filename=filename)
+    else:
+        command = f"install add file flash:{filename} activate commit"
+        with ios_timing.span(task.host.name, "install add"):
+            output = task.run(task=netmiko_send_command, command_string=command, expect_string=r"flash:packages.conf", read_timeout=600, cmd_verify=False)
+            swan_logger.taskLogger(task, command, output.result, "STARTCOMMAND")
+
+        with ios_timing.span(task.host.name, "activate"):
+            output2 = task.run(task=netmiko_send_command, command_string="y", expect_string=r"want to proceed", read_timeout=600, cmd_verify=False)
+            swan_logger.taskLogger(task, "", output2.result, "CONTINUECOMMAND")
+
+            output3 = task.run(task=netmiko_send_command, command_string="y", expect_string=r"", read_timeout=600, cmd_verify=False)
+            swan_logger.taskLogger(task, "", output3.result, "ENDCOMMAND")
+
+    tempTime = datetime.now().strftime("%I:%M:%S %p")
+    print(f"{task.host.name} is restarting - {tempTime}")
+    return Result(host=task.host, result=time.time())
+
+
+
+# REBOOT WAIT TASK
+# Waits for the host to come back from its reload. Hands the host off to the shared reboot
+# readiness detector (look at ios_reboot.py), which watches the SSH port until the
+# switch goes down, comes back, and accepts a fresh CLI session. The new netmiko
+# session the detector opens is the one every stage after this one uses. Fails the
+# host if it hasn't come back after "max_wait" seconds.
+################################################################################
+def rebootWaitTask(task: Task, context) -> Result:
+    options = ios_reboot.rebootOptions(task.nornir)
+    status = ios_reboot.getDetector().watch(task.host, task.nornir.config, options).result()
+
+    if not status["ready"]:
+        ios_connections.evict(task.host)
+        return Result(host=task.host, result=f"Did not come back online after {options['max_wait']} seconds", failed=True)
+
+    if not status["sawDown"]:
+        print(f"{RED}{task.host.name}{CLEAR} never went down for its reload, it might not have rebooted")
+    print(f"{GREEN}{task.host.name}{CLEAR} is online")
+    return Result(host=task.host, result=status["elapsed"])
+
+
+
+# VERSION CHECK TASK
+# Per-host version of upgradeChecker(), ran after the switch comes back from its
+# reboot. Fails the host if its IOS version does not match the new version.
+################################################################################
+def versionCheckTask(task: Task, context, newIOSVersion) -> Result:
+    output = task.run(task=ios_facts.factsTask, context=context)
+    version = output.result["version"]
+
+    if version != newIOSVersion:
+        print(f"{RED}{task.host.name}{CLEAR}'s IOS version does not match the upgrade's IOS version")
+        return Result(host=task.host, result=f"Switch Ver: {version}   Upgrade Ver: {newIOSVersion}", failed=True)
+
+    print(f"{GREEN}{task.host.name}{CLEAR} upgraded its IOS version to {newIOSVersion}")
+    return Result(host=task.host, result=version)
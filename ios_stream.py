@@ -0,0 +1,157 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the streaming result handling used for every fleet-wide command.
+# nr.run() hands back an AggregatedResult that holds on to every switch's full output
+# (along with the output of every subtask it ran) until the calling function is done
+# with it, and commandLogger() then went back over all of it a second time. "dir" on a
+# busy flash, "show version" of a big stack, and the install add/activate transcripts
+# add up fast across thousands of switches. Now:
+#   - streamCommand() logs each switch's output the moment that switch finishes and
+#     runs it through its parser (look at ios_parsers.py), so the result handed back
+#     for every switch is a small typed record (EX: an Md5Result) instead of the text
+#   - streamRun() does the same for tasks that log and parse their own output (like
+#     ios_flash.dirTask()), only throwing out the output of their subtasks
+#   - The pipeline (look at ios_pipeline.py) throws out the subtask output of every
+#     stage as soon as the stage is done, keeping only what the stage returned
+# Output of anything that failed is always kept so the reason can still be printed.
+# Setting keep_output in the "streaming" section of config.yaml keeps every output
+# around like before (handy for debugging with print_result()).
+
+from nornir_netmiko.tasks import netmiko_send_command
+import swan_logger                                      # Custom written logger script, every streamed command is logged in here
+
+
+DEFAULTS = {
+    "keep_output": False,                               # Keeps the raw output of every command until the whole fleet is done with it
+}
+
+
+
+# STREAM OPTIONS
+# Function merges the "streaming" section of config.yaml over the defaults above.
+# Takes the Nornir config (nr.config or task.nornir.config) since the pipeline only
+# has the task.
+################################################################################
+def streamOptions(configuration):
+    options = dict(DEFAULTS)
+    options.update(configuration.user_defined.get("streaming", {}) or {})
+    return options
+
+
+
+# RELEASE
+# Function throws out every result after start that didn't fail, along with all of
+# the output it was holding on to
+################################################################################
+def release(results, start=0):
+    for i in reversed(range(start, len(results))):
+        if not results[i].failed:
+            del results[i]
+
+
+
+# STREAM PROCESSOR
+# Nornir processor that handles each switch's result from that switch's worker
+# thread, as soon as the switch is done. Logs the output (if command is set), swaps
+# it for whatever the parser returns (or None without a parser) if the switch didn't
+# fail, and throws out the output of every subtask.
+################################################################################
+class StreamProcessor:
+    def __init__(self, options, command=None, parser=None, flag=None):
+        self.options = options
+        self.command = command                          # Command written to the log, None if the task logs its own output
+        self.parser = parser
+        self.flag = flag
+
+
+    def task_instance_completed(self, task, host, result):
+        if self.command is not None:
+            output = str(result[0].result)
+            swan_logger.logger(host.name, self.command, output, self.flag)
+            if result[0].failed:                        # Output (or traceback) of a failed switch is kept so the reason can be printed
+                pass
+            elif self.parser is not None:
+                result[0].result = self.parser(output)
+            elif not self.options["keep_output"]:
+                result[0].result = None
+        if not self.options["keep_output"]:
+            release(result, 1)
+
+
+    def task_started(self, task):
+        pass
+
+
+    def task_completed(self, task, result):
+        pass
+
+
+    def task_instance_started(self, task, host):
+        pass
+
+
+    def subtask_instance_started(self, task, host):
+        pass
+
+
+    def subtask_instance_completed(self, task, host, result):
+        pass
+
+
+
+# STREAM RUN
+# Function runs a task against every host in the Nornir object, throwing out the
+# output of the task's subtasks as each switch finishes. Anything else is passed
+# straight to nr.run().
+################################################################################
+def streamRun(nr, task, **kwargs):
+    processor = StreamProcessor(streamOptions(nr.config))
+    return nr.with_processors(list(nr.processors) + [processor]).run(task=task, **kwargs)
+
+
+
+# STREAM COMMAND
+# Function runs a single command on every host in the Nornir object, logging and
+# parsing each switch's output as soon as that switch is done
+################################################################################
+def streamCommand(nr, command, parser=None, flag=None, log=None, **kwargs):
+    """
+    Runs netmiko_send_command on every host, keeping only a parsed record of
+    each switch's output.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object.
+    command : string
+        The IOS command (or answer to a prompt, EX: "y") to send.
+    parser : function, optional
+        Called with each switch's output, whatever it returns is the switch's
+        result. By default this is None, meaning the result is None once the
+        output is logged.
+    flag : string, optional
+        Same optional flags that swan_logger.commandLogger() takes.
+    log : string, optional
+        What gets written to the log instead of the command. By default this
+        is the command itself.
+    **kwargs
+        Passed straight to netmiko_send_command (expect_string, read_timeout,
+        cmd_verify, etc.).
+
+    Returns
+    -------
+    AggregatedResult
+        Same shape nr.run() returns, only every switch's result is its record.
+    """
+    processor = StreamProcessor(streamOptions(nr.config), command if log is None else log, parser, flag)
+    return nr.with_processors(list(nr.processors) + [processor]).run(netmiko_send_command, command_string=command, **kwargs)
+
+
+
+# KEEP OUTPUT
+# Function returns True if keep_output is turned on, used by anything that throws
+# out its own output (look at ios_pipeline.pipelineTask())
+################################################################################
+def keepOutput(configuration):
+    return bool(streamOptions(configuration)["keep_output"])
@@ -0,0 +1,184 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the adaptive read timeout model. The scripts used to size every
+# netmiko read_timeout off of a fixed worst-case speed (250 KiB/s plus 15 minutes for
+# a transfer), so a transfer that hung would tie up a worker thread for hours before
+# anyone noticed. Now every finished transfer ("X bytes copied in Y secs") and every
+# timed "verify /md5" is written down in a table inside of the same SQLite database
+# as the facts cache (look at ios_cache.py). Timeouts are then sized off of the slow
+# end of the switch's own history, falling back to the history of every switch in
+# the same site, and only falling back to the old fixed estimate when neither has
+# enough history yet. The old fixed estimate is always the most a timeout can be.
+# Every setting can be changed in the "timeouts" section of config.yaml.
+
+import ios_cache                                        # openDatabase() lives here
+import ios_parsers                                      # parseCopied() lives here
+import statistics
+import time
+
+
+DEFAULTS = {
+    "safety": 2.0,                                      # Multiplier on the expected duration
+    "slack": 120,                                       # Seconds added on top of the multiplied duration
+    "min_timeout": 300,                                 # A timeout is never shorter than this
+    "samples": 20,                                      # How many of the most recent measurements are looked at
+    "min_samples": 3,                                   # Measurements needed before they are trusted over the fixed estimate
+    "retries": 1,                                       # How many times a transfer that timed out is started over
+}
+
+DEFAULT_SITE = "default"                                # Site of every switch that doesn't have a "site" set in hosts.yaml or groups.yaml
+
+
+
+# TIMEOUT OPTIONS
+# Function merges the "timeouts" section of config.yaml over the defaults above
+################################################################################
+def timeoutOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("timeouts", {}) or {})
+    return options
+
+
+
+# SITE OF
+# Function returns the site a host is in, which is the "site" key in the host's
+# (or one of its groups') data, or DEFAULT_SITE if no site was set anywhere.
+# Inventory groups (EX: install/bundle) say nothing about where a switch is, so
+# they are never used as a site on their own.
+################################################################################
+def siteOf(host):
+    site = host.get("site")
+    if site is None:
+        site = DEFAULT_SITE
+    return site
+
+
+
+# OPEN TIMINGS
+# Function opens the facts cache database and makes sure the timings table exists
+################################################################################
+def openTimings(nr):
+    conn = ios_cache.openDatabase(nr)
+    conn.execute("CREATE TABLE IF NOT EXISTS timings (host TEXT, site TEXT, kind TEXT, bytes INTEGER, seconds REAL, recorded REAL)")
+    return conn
+
+
+
+# RECORD TIMING
+# Function writes down how long a transfer ("transfer") or MD5 check ("md5") of a
+# file with the passed number of bytes took on a host
+################################################################################
+def recordTiming(nr, host, kind, nbytes, seconds):
+    if nbytes <= 0 or seconds <= 0:
+        return
+
+    conn = openTimings(nr)
+    try:
+        with conn:                                      # Commits on the way out
+            conn.execute("INSERT INTO timings (host, site, kind, bytes, seconds, recorded) VALUES (?, ?, ?, ?, ?, ?)",
+                         (host.name, siteOf(host), kind, nbytes, seconds, time.time()))
+    finally:
+        conn.close()
+
+
+
+# RECORD TRANSFER
+# Function pulls the bytes and seconds out of the "copied in" line of a copy's
+# output and records them. Copies from a peer switch (look at ios_fanout.py) are
+# recorded as "peer" so they don't skew the file server numbers. Returns the
+# transfer speed in bytes/sec, or None if the output has no "copied in" line.
+################################################################################
+def recordTransfer(nr, host, output, kind="transfer"):
+    transfer = ios_parsers.parseCopied(output)
+    if transfer is None:
+        return None
+
+    recordTiming(nr, host, kind, transfer.bytes, transfer.seconds)
+    if transfer.seconds <= 0:
+        return None
+    return transfer.bytes / transfer.seconds
+
+
+
+# RECENT RATES
+# Function returns the most recent speeds (bytes/sec) of the host, or of every host
+# in its site if the host itself doesn't have enough history yet
+################################################################################
+def recentRates(nr, host, kind):
+    options = timeoutOptions(nr)
+    conn = openTimings(nr)
+    try:
+        rows = conn.execute("SELECT bytes / seconds FROM timings WHERE host = ? AND kind = ? ORDER BY recorded DESC LIMIT ?",
+                            (host.name, kind, options["samples"])).fetchall()
+        if len(rows) < options["min_samples"]:          # Not enough history for this switch, looking at the whole site
+            rows = conn.execute("SELECT bytes / seconds FROM timings WHERE site = ? AND kind = ? ORDER BY recorded DESC LIMIT ?",
+                                (siteOf(host), kind, options["samples"])).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+
+# EXPECTED RATE
+# Function returns the typical (median) speed in bytes/sec of the host's recent
+# transfers or MD5 checks, or None if there isn't enough history
+################################################################################
+def expectedRate(nr, host, kind):
+    rates = recentRates(nr, host, kind)
+    if len(rates) < timeoutOptions(nr)["min_samples"]:
+        return None
+    return statistics.median(rates)
+
+
+
+# ESTIMATE TIMEOUT
+# Function sizes a read timeout off of the host's history, then its site's history,
+# and returns the fallback if there isn't enough of either
+################################################################################
+def estimateTimeout(nr, host, kind, nbytes, fallback):
+    """
+    Sizes a read timeout for a transfer or MD5 check off of previous runs.
+
+    Parameters
+    ----------
+    nr : Nornir
+        Any Nornir object, only used to find the database and config.
+    host : Host
+        The host the command is about to be ran on.
+    kind : string
+        "transfer", "peer", "stack", or "md5".
+    nbytes : int
+        Size of the file in bytes.
+    fallback : int
+        The old fixed estimate, returned when there isn't enough history and used
+        as the upper bound otherwise.
+
+    Returns
+    -------
+    int
+        Number of seconds to pass to netmiko as read_timeout.
+    """
+    options = timeoutOptions(nr)
+    rates = recentRates(nr, host, kind)
+    if len(rates) < options["min_samples"]:
+        return fallback
+
+    rates = sorted(rates)
+    rate = rates[len(rates) // 10]                      # Slow end (10th percentile) of the recent speeds
+    timeout = int(nbytes / rate * options["safety"] + options["slack"])
+    return max(options["min_timeout"], min(timeout, fallback))
+
+
+
+# FLEET TIMEOUT
+# Function returns the largest estimated timeout of every host in the Nornir
+# object, for the fleet-wide nr.run() calls that can only take one timeout
+################################################################################
+def fleetTimeout(nr, kind, nbytes, fallback):
+    timeout = 0
+    for host in nr.inventory.hosts.values():
+        timeout = max(timeout, estimateTimeout(nr, host, kind, nbytes, fallback))
+    if timeout == 0:
+        return fallback
+    return timeout
@@ -0,0 +1,252 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the per-host, per-phase timing used by every script. Apart from
+# the "copied in" line of a transfer and a few timestamps printed along the way, there
+# was no way to tell where a 3 hour maintenance window actually went. Now every phase
+# a switch goes through (connecting, gathering facts, waiting for a transfer slot, the
+# transfer itself, the MD5 check, install add, activate, the reboot wait, the commit,
+# etc.) is timed as a span. Every pipeline stage is timed automatically (look at
+# ios_pipeline.py) and anything inside of a stage can time its own smaller spans with
+# span(). At the end of the run every span is written to a .jsonl file and an
+# OpenMetrics .prom file in the reports directory, and a summary of the slowest
+# switches and the phases that made up the longest switch's run is printed. The
+# directory can be changed in the "timing" section of config.yaml.
+
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import threading
+import time
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+DEFAULTS = {
+    "directory": "reports",                             # Where the report files go, relative to where the script is ran from
+    "slowest": 5,                                       # How many of the slowest switches are printed in the summary
+}
+
+FLEET = "fleet"                                         # Host name used for spans that cover every switch at once
+
+RUN = None                                              # RunTimer of the current run, made by startRun()
+
+
+
+# TIMING OPTIONS
+# Function merges the "timing" section of config.yaml over the defaults above
+################################################################################
+def timingOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("timing", {}) or {})
+    return options
+
+
+
+# RUN TIMER
+# Holds every span of the current run. Shared between every host's worker thread,
+# each thread keeps its own stack of open spans so a span knows which phase it is
+# inside of.
+################################################################################
+class RunTimer:
+    def __init__(self, nr, name):
+        self.name = name
+        self.options = timingOptions(nr)
+        self.started = time.time()
+        self.spans = []                                 # {"host", "phase", "parent", "start", "end", "seconds", "failed"}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+
+
+# START RUN
+# Function starts timing a new run, every span() after this is written down
+################################################################################
+def startRun(nr, name):
+    global RUN
+    RUN = RunTimer(nr, name)
+    return RUN
+
+
+
+# SPAN
+# Times everything inside of the with block as one phase of the host. Does nothing
+# if startRun() was never called.
+################################################################################
+@contextmanager
+def span(host, phase):
+    """
+    Times a single phase of a single host.
+
+    Parameters
+    ----------
+    host : string
+        Inventory name of the host, or None for a phase that covers the whole
+        fleet at once.
+    phase : string
+        Name of the phase (EX: "transfer", "install add", "reboot").
+    """
+    run = RUN
+    if run is None:
+        yield
+        return
+
+    stack = run.stack()
+    parent = stack[-1] if len(stack) != 0 else None
+    stack.append(phase)
+    start = time.time()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        stack.pop()
+        end = time.time()
+        run.add({"host": host or FLEET, "phase": phase, "parent": parent, "start": start, "end": end,
+                 "seconds": round(end - start, 3), "failed": failed})
+
+
+
+# FLEET SPAN
+# Times a fleet-wide nr.run() call as the same phase for every one of the hosts
+################################################################################
+@contextmanager
+def fleetSpan(hostnames, phase):
+    run = RUN
+    if run is None:
+        yield
+        return
+
+    start = time.time()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        end = time.time()
+        for hostname in hostnames:
+            run.add({"host": hostname, "phase": phase, "parent": None, "start": start, "end": end,
+                     "seconds": round(end - start, 3), "failed": failed})
+
+
+
+# HOST TOTALS
+# Function returns every host's top-level spans in the order they started, along
+# with the host's first start and last end: {hostname: (start, end, [spans])}
+################################################################################
+def hostTotals(spans):
+    hosts = {}
+    for element in sorted(spans, key=lambda element: element["start"]):
+        if element["parent"] is not None or element["host"] == FLEET:
+            continue
+        start, end, phases = hosts.get(element["host"], (element["start"], element["end"], []))
+        phases.append(element)
+        hosts[element["host"]] = (min(start, element["start"]), max(end, element["end"]), phases)
+    return hosts
+
+
+
+# OPEN METRICS
+# Function turns the spans into OpenMetrics text, one gauge per host and phase with
+# the seconds of every span of that phase added together
+################################################################################
+def openMetrics(run):
+    phases = {}
+    for element in run.spans:
+        key = (element["host"], element["phase"])
+        phases[key] = phases.get(key, 0) + element["seconds"]
+
+    lines = ["# TYPE swan_phase_seconds gauge",
+             "# HELP swan_phase_seconds Seconds a host spent in a phase."]
+    for (host, phase), seconds in sorted(phases.items()):
+        lines.append(f'swan_phase_seconds{{run="{run.name}",host="{host}",phase="{phase}"}} {round(seconds, 3)}')
+
+    lines.append("# TYPE swan_host_seconds gauge")
+    lines.append("# HELP swan_host_seconds Seconds from a host's first phase starting to its last phase ending.")
+    for host, (start, end, _) in sorted(hostTotals(run.spans).items()):
+        lines.append(f'swan_host_seconds{{run="{run.name}",host="{host}"}} {round(end - start, 3)}')
+
+    lines.append("# TYPE swan_run_seconds gauge")
+    lines.append(f'swan_run_seconds{{run="{run.name}"}} {round(time.time() - run.started, 3)}')
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+
+# PRINT SUMMARY
+# Function prints the slowest hosts, the phases that made up the slowest host's run
+# (the critical path, since the run can't finish before it does), and how long
+# every phase took across the whole fleet
+################################################################################
+def printSummary(run):
+    hosts = hostTotals(run.spans)
+    if len(hosts) == 0:
+        return
+
+    print("\nTiming summary")
+    print("################################################################################")
+    slowest = sorted(hosts.items(), key=lambda item: item[1][1] - item[1][0], reverse=True)
+    for hostname, (start, end, phases) in slowest[:run.options["slowest"]]:
+        longest = max(phases, key=lambda element: element["seconds"])
+        print(f"{hostname} - {round(end - start, 1)} secs, longest phase {longest['phase']} ({longest['seconds']} secs)")
+
+    hostname, (start, end, phases) = max(hosts.items(), key=lambda item: item[1][1])    # Last host to finish
+    print(f"\nCritical path ({hostname}, finished last):")
+    for element in phases:
+        share = round(100 * element["seconds"] / max(end - start, 0.001), 1)
+        flag = f" {RED}FAILED{CLEAR}" if element["failed"] else ""
+        print(f"    {element['phase']} - {element['seconds']} secs ({share}%){flag}")
+
+    totals = {}                                         # Phase -> (seconds added across every host, longest single host)
+    for element in run.spans:
+        if element["parent"] is not None:
+            continue
+        total, longest = totals.get(element["phase"], (0, 0))
+        totals[element["phase"]] = (total + element["seconds"], max(longest, element["seconds"]))
+    print("\nEvery phase across the fleet:")
+    for phase, (total, longest) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+        print(f"    {phase} - {round(total, 1)} secs total, {round(longest, 1)} secs longest")
+    print()
+
+
+
+# WRITE REPORT
+# Function writes every span of the run to a .jsonl file and an OpenMetrics .prom
+# file, prints the summary, and returns the path of the .jsonl file (or None if
+# nothing was timed)
+################################################################################
+def writeReport():
+    run = RUN
+    if run is None or len(run.spans) == 0:
+        return None
+
+    directory = os.path.join(os.getcwd(), run.options["directory"])
+    os.makedirs(directory, exist_ok=True)
+    basename = os.path.join(directory, f"{datetime.fromtimestamp(run.started).strftime('%Y-%m-%d-%H%M%S')}-{run.name}")
+
+    with run.lock:
+        spans = sorted(run.spans, key=lambda element: element["start"])
+    with open(basename + ".jsonl", "w") as file:
+        for element in spans:
+            file.write(json.dumps(element) + "\n")
+    with open(basename + ".prom", "w") as file:
+        file.write(openMetrics(run))
+
+    printSummary(run)
+    print(f"Timing report written to {GREEN}{basename}.jsonl{CLEAR} and {GREEN}{basename}.prom{CLEAR}\n")
+    return basename + ".jsonl"
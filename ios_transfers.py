@@ -0,0 +1,114 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the bandwidth-aware transfer scheduler. scpIOSBin() used to start
+# "copy scp://..." on every switch missing the file at the exact same moment, so with
+# 100 Nornir workers that was up to 100 pulls of a ~700 MB file from one file server,
+# all fighting over the same WAN links and finishing later than if they had taken
+# turns. Now every transfer has to get a slot from the scheduler first. A slot is only
+# handed out while the file server, the switch's site, and every one of the switch's
+# groups are all under their cap on concurrent transfers, and (if a bandwidth budget
+# is set) while the expected speeds of every running transfer plus this one fit in
+# the budget. Expected speeds come out of the transfer history in ios_timeouts.py.
+# The moment a transfer finishes, the next switch in line that fits is let loose.
+# Every setting can be changed in the "transfers" section of config.yaml, and any
+# group in groups.yaml can set its own "max_transfers". Switches without a site
+# (look at siteOf() in ios_timeouts.py) aren't held to the per-site cap.
+
+from contextlib import contextmanager
+import ios_timeouts                                     # siteOf() and expectedRate() live here
+import ios_timing                                       # Time spent waiting in line is timed as its own span
+import threading
+
+
+DEFAULTS = {
+    "per_server": 10,                                   # Max concurrent transfers from a single file server
+    "per_site": 4,                                      # Max concurrent transfers into a single site
+    "bandwidth_mbps": 0,                                # Total budget across every transfer in megabits/sec, 0 turns it off
+    "assumed_rate_mbps": 20,                            # Speed assumed for a switch with no transfer history
+}
+
+
+
+# TRANSFER OPTIONS
+# Function merges the "transfers" section of config.yaml over the defaults above
+################################################################################
+def transferOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("transfers", {}) or {})
+    return options
+
+
+
+# TRANSFER SCHEDULER
+# Shared between every host's worker thread in the pipeline. Hosts wait in line
+# in scpTask() until a slot opens up that fits under every cap.
+################################################################################
+class TransferScheduler:
+    def __init__(self, nr):
+        self.nr = nr
+        self.options = transferOptions(nr)
+        self.budget = self.options["bandwidth_mbps"] * 125000   # Megabits/sec to bytes/sec
+        self.active = {}                                # Hostname -> (server, site, group names, expected bytes/sec) of every running transfer
+        self.waiting = []                               # (hostname, server, site, groups, expected bytes/sec) of every host in line, first come first served
+        self.condition = threading.Condition()
+
+
+    # Number of running transfers that match the passed check
+    def count(self, check):
+        return len([entry for entry in self.active.values() if check(entry)])
+
+
+    # Returns True if a transfer with the passed details can start right now.
+    # Should only be called while holding self.condition.
+    def fits(self, server, site, groups, rate):
+        if self.options["per_server"] and self.count(lambda entry: entry[0] == server) >= self.options["per_server"]:
+            return False
+        if self.options["per_site"] and site != ios_timeouts.DEFAULT_SITE and self.count(lambda entry: entry[1] == site) >= self.options["per_site"]:
+            return False
+        for group in groups:
+            cap = group.data.get("max_transfers")       # Set in the group's data section of groups.yaml
+            if cap is not None and self.count(lambda entry: group.name in entry[2]) >= cap:
+                return False
+        if self.budget and len(self.active) != 0:       # A single transfer is always allowed, even if it is bigger than the whole budget
+            if sum(entry[3] for entry in self.active.values()) + rate > self.budget:
+                return False
+        return True
+
+
+    # Blocks until the host is allowed to start its transfer from the server. A host
+    # only skips ahead of the hosts in line before it if none of them fit right now
+    # (EX: their site is full), so a full site never holds back the rest of the line.
+    def acquire(self, host, server):
+        rate = ios_timeouts.expectedRate(self.nr, host, "transfer")
+        if rate is None:
+            rate = self.options["assumed_rate_mbps"] * 125000
+        entry = (host.name, server, ios_timeouts.siteOf(host), host.groups, rate)
+
+        with ios_timing.span(host.name, "transfer queue"), self.condition:
+            self.waiting.append(entry)
+            while True:
+                ahead = self.waiting[:self.waiting.index(entry)]
+                if self.fits(*entry[1:]) and not any(self.fits(*other[1:]) for other in ahead):
+                    break
+                self.condition.wait()
+            self.waiting.remove(entry)
+            self.active[host.name] = (server, entry[2], set(group.name for group in host.groups), rate)
+            self.condition.notify_all()                 # Whoever was behind this host might fit now too
+
+
+    # Frees up the host's slot and wakes up everyone still in line
+    def release(self, host):
+        with self.condition:
+            self.active.pop(host.name, None)
+            self.condition.notify_all()
+
+
+    # Holds a transfer slot for the duration of a with block
+    @contextmanager
+    def slot(self, host, server):
+        self.acquire(host, server)
+        try:
+            yield
+        finally:
+            self.release(host)
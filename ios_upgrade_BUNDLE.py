@@ -1,5 +1,5 @@
 # Script by: DarkSplash
-# Last edited: 02/27/2023
+# Last edited: 10/17/2026
 
 # This script is designed to upgrade the IOS version of a c9000 IOS or IOS-XE switch.
 # Currently the script looks for a file located somewhere in a specified fileserver directory,
@@ -9,19 +9,32 @@
 # IOS files that are no longer used after the update to free up space on the switches.
 
 
+import argparse
 from datetime import datetime
 import getpass
+import ios_async                                        # Optional asyncio transport for the commit/abort and remove inactive (the pipeline steps use it too), look at ios_async.py
+import ios_cache                                        # On-disk facts cache, thrown out for any switch that gets changed
+import ios_connections                                  # Connection manager, one Nornir object lasts the whole run
+import ios_fanout                                       # Peer-to-peer fan-out, one switch per site pulls the file and the rest copy from it
+import ios_facts                                        # Gathers every pre-flight fact over one session per switch
 import ios_file_data                                    # Script to hold IOS file variables
+import ios_flash                                        # Flash index, every file and free space check is a lookup in here
+import ios_http_server                                  # Optional built-in HTTP(S) image server, look at startServer()
+import ios_journal                                      # Crash-safe run journal, lets --resume skip everything a switch already finished
+import ios_mirrors                                      # Mirror selection, each switch pulls from its fastest file server
+import ios_pipeline                                     # Per-host pipeline engine, look at runPipeline() or script for more details
+import ios_remediation                                  # Pre-upgrade config planned from the facts, one config session and one save per switch
+import ios_runner                                       # Registers the "swan" runner plugin set in config.yaml, has to be imported before InitNornir()
+import ios_stages                                       # Per-host versions of the functions in this script that get chained in the pipeline
+import ios_stream                                       # Streaming results, every fleet-wide command is logged and parsed as each switch finishes
+import ios_timing                                       # Per-host, per-phase timing, a report is written when the script exits
+import ios_transfers                                    # Bandwidth-aware transfer scheduler, caps concurrent copies per file server and site
+import ios_waves                                        # Rolling wave scheduler, caps how many switches reboot at once
 import logging
 from nornir import InitNornir
 from nornir.core.filter import F
-from nornir.core.task import Task, Result
-from nornir_napalm.plugins.tasks import napalm_get
-from nornir_netmiko.tasks import netmiko_send_command
-from nornir_netmiko.tasks import netmiko_send_config
 from nornir_netmiko.tasks import netmiko_save_config
 import swan_logger                                      # Custom written logger script, look at commandLogger() or script for more details
-import time
 
 
 # Packageless Terminal Colors: https://stackoverflow.com/a/21786287
@@ -31,6 +44,16 @@ CLEAR = "\x1b[0m"
 
 
 
+# PARSE ARGUMENTS
+# Function reads the command line arguments the script was ran with
+################################################################################
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Upgrades every BUNDLE mode switch in hosts.yaml to the IOS file in ios_file_data.py")
+    parser.add_argument("--resume", action="store_true", help="pick the last run for the same file back up, skipping everything each switch already finished")
+    return parser.parse_args()
+
+
+
 # https://nornir.discourse.group/t/using-getpass-getpass-instead-of-pre-filled-password/78 (Now a dead site, RIP my sweet prince)
 # This man is a god amongst us mere mortals, how to set Nornir credentials on runtime
 ################################################################################
@@ -76,6 +99,8 @@ def newIOSData():
         print(f"\nNew IOS Version: {newIOSVersion}")
         print(f"New Fileserver IP: {newFileServerIP}")
         print(f"New Fileserver Path: {newFileServerPath}")
+        for mirror in ios_mirrors.mirrorList(newFileServerIP, newFileServerPath)[1:]:
+            print(f"Mirror: {mirror['ip']}//{mirror['path']}")
         print(f"New IOS File: {newIOSFile}")
         print(f"New IOS MD5: {newIOSMD5}")
         print(f"New IOS Size: {newIOSSize}")
@@ -94,21 +119,17 @@ def newIOSData():
 
 
 # NORNIR INIT
-# Function explititly made to solve bugs in checkAliveReboot2(), look there for why
-# this function was made.  This is now the main function used to initialize nornir objects
-# instead of using InitNornir(), just moved the code that used to exist in the
-# preconfiguration portion of main() to create the nornir object and made it
-# so you can create an object whenever you want.  This function only gets passed
-# the username and password parameters when a new nornir object is being initialized
-# after the old nornir object has timed out/stopped responding after a reboot.
+# Function used to initialize the nornir object instead of using InitNornir(), asks
+# for the switch credentials and filters down to only the switches this script works
+# on. This used to be called a second time after the reboot (with the credentials
+# pulled back out of the old object by credentialGrabber()) since every session on
+# the old object was dead after the reload. The connection manager now throws out
+# dead sessions and reconnects on its own (look at ios_connections.py), so the one
+# object made here lasts the whole run.
 ################################################################################
-def nornirInit(configFile, username=None, password=None):
+def nornirInit(configFile):
     nr = InitNornir(config_file=configFile)             # Initializing Nornir object
-    
-    if username is not None and password is not None:   # Portion of code for re-initializing nornir object, look at checkAliveReboot2() for more info
-        nornir_set_creds(nr, username, password)
-    else:
-        nornir_set_creds(nr)
+    nornir_set_creds(nr)
     
     print("\nFiltering to only BUNDLE mode switches...\n")
     nr = nr.filter(F(groups__contains="bundle"))        # Bundle mode filter
@@ -116,78 +137,25 @@ def nornirInit(configFile, username=None, password=None):
     return nr
 
 
-# CREDENTIAL GRABBER
-# Function was made due to the bugs that were being encountered in checkAliveReboot2().
-# To fix these bugs, reinitializing the nr object seemed to do the job, but requires
-# a username and password each time it was made. Since the user already needed to manually
-# enter in their credentials at the beginning, and nornir stores those values, I can just
-# grab those already existing login credentials and recreate the nornir object.
-# The "if username is not..." portion of nornirInit() is where this data is being passed to
-################################################################################
-def credentialGrabber(nr):
-    username = ""                                       # Grabbing username and password so every recreation of the
-    password = ""                                       # Nornir object doesn't prompt you for credentials
-    for host in nr.inventory.hosts.values():
-            username = host.username
-            password = host.password
-            break
-    return username, password
-
-
-
-# IS ALIVE TASK
-# Shamelessly ripped code from the creator of netmiko (who also maintains nornir & napalm)
-# https://github.com/nornir-automation/nornir/issues/493
-# is_alive() checks to see if nornir can communicate with port 22 on a switch
-################################################################################
-def isAliveTask(task: Task) -> Result:
-    napalm = task.host.get_connection("napalm", task.nornir.config)     # task.host is variable holding hosts.yaml variable name (not hostname)
-    alive = napalm.is_alive()                                           # get_connection was passed napalm for its plugin to connect with and passed the current config variable of nornir
-    return Result(host=task.host, result=alive)                         # This manages to create a napalm variable that you can run napalm functions off of
-
-
-
-# CHECK ALIVE
-# Checks dict made by napalm's is_alive() function
-# Returns 1 if any of the switches are offline
-################################################################################
-def checkAlive(nr):
-    print("Checking if switches are online...")
-    output = nr.run(task=isAliveTask)
-
-    for hostname in output:                             # Grabs the name of the inventory from hosts.yaml (Non-indented part of file) 
-        result = output[hostname].result                # Unwrapping a single device's results out of nornir's weird dict-esque variable (AggregatedResult)
-                                                        # NOTE: Both of these happen ALOT in other functions, so this will be the only comment about it
-
-        if type(result) != dict:                        # Alive hosts are contained within a dict, whereas dead hosts are a string traceback
-            print(f"{RED}{hostname}{CLEAR} does not appear to be online")
-            return 1                                    # This super ugly block is due to is_alive() crashing this program due to non-alive hosts
-        else:                                           # returning the string traceback of the error (thank you NAPALM, very cool!)
-            if result['is_alive'] == False:             # No idea if this will ever be called, but here in case result doesnt throw a string traceback
-                print(f"{RED}{hostname}{CLEAR} does not appear to be online")
-                return 1
-        
-    print("All switches appear to be online\n")
-
-
 
 # BUNDLE OR INSTALL
 # Function looks at all hosts and determines if the boot mode is INSTALL mode or
 # BUNDLE mode. If BUNDLE mode is detected, the function immediately exits out
 # and reports what switches need to be removed from the host list for this script
 # to properly work, as this script was written for switches in INSTALL mode.
+# The boot mode is pulled out of the facts gathered by ios_facts.gatherFacts(),
+# and a switch whose boot mode couldn't be read is treated the same as one in the
+# wrong mode, since the script can't tell which commands it would take.
 ################################################################################
-def bundleOrInstall(nr):
+def bundleOrInstall(nr, facts):
     print("Checking what boot mode the switches use...")
-    command = "show version"
-    output = nr.run(netmiko_send_command, command_string=command)
     filterFlag = 0                                      # Flag used to warn users in main of the issues of running this script against bundle mode switches
-    
-    swan_logger.commandLogger(command, output, "STARTLOG")  # Start log banner being added
-    swan_logger.commandLogger(command, output)          # Actually logging first command
+    modes = {}                                          # Hostname -> string containing the boot mode
+
+    for hostname in facts:
+        modes[hostname] = facts[hostname]["mode"] or ""
 
-    for hostname in output:                       
-        result = output[hostname].result
+    for hostname, result in modes.items():
 
         if "INSTALL" in result:
             print(f"{RED}{hostname}{CLEAR} is configured to be in INSTALL mode")
@@ -195,166 +163,14 @@ def bundleOrInstall(nr):
             
         elif "BUNDLE" in result:
             print(f"{GREEN}{hostname}{CLEAR} is configured to be in BUNDLE mode")
+        else:                                           # Neither mode showed up in show version, can't be upgraded safely
+            print(f"{RED}{hostname}{CLEAR}'s boot mode could not be read")
+            filterFlag = 1
     print()
     return filterFlag
 
 
 
-# SET IGNORE STARTUP CFG
-# Function goes through and runs the command "no system ignore startupconfig switch all"
-# on all switches. Done because if this is not set, after reboot, the switch will
-# not load its configuration, taking it offline.
-################################################################################
-def setIgnoreStartupCfg(nr):
-    print("Making sure the SWITCH_IGNORE_STARTUP_CFG register is set to 0")
-    command = "no system ignore startupconfig switch all"
-
-    output = nr.run(netmiko_send_config, config_commands=command)
-    swan_logger.commandLogger(command, output)
-
-    output2 = nr.run(netmiko_save_config)
-    print("SWITCH_IGNORE_STARTUP_CFG has been set to 0\n")
-
-
-
-# REMOVE BUNDLE BOOT
-# Function unsets the boot variable and then re-sets it to packages.conf, because
-# for some reason, the Cisco IOS one-shot upgrade command does not do this
-# automatically, and will cause the switch to act very odd with two boot variables.
-# Unique function to BUNDLE mode script.
-################################################################################
-def removeBundleBoot(nr):
-    print("Removing BUNDLE mode boot variable...")
-    command = "no boot system"
-    output = nr.run(netmiko_send_config, config_commands=command)
-    swan_logger.commandLogger(command, output)
-
-    command2 = "boot system flash:packages.conf"
-    output2 = nr.run(netmiko_send_config, config_commands=command2)
-    
-    output3 = nr.run(netmiko_save_config)               # Boot variable on next reload only updates after saving config
-
-    print("BUNDLE mode boot variable has been removed\n")
-
-
-
-# GET SWITCH DATA
-# Function iterates through hosts.yaml and grabs their hostnames and IOS versions,
-# could change result["facts"]["hostname"] to result["facts"]["fqdn"] for a fully qualified name
-# Try/Except added in for case where you dont wait for all hosts to come back online during restart
-################################################################################
-def getSwitchData(nr):
-    print("Getting switch hostnames & IOS versions...")
-    output = nr.run(napalm_get, getters="facts")
-    switchHostnames = []
-    switchIOSVersion = []
-
-    for hostname in output:
-        try:
-            result = output[hostname].result
-            name = result["facts"]["hostname"]
-            switchHostnames.append(name)
-        except Exception as e:
-            print()
-    
-    for hostname in output:
-        try:
-            result = output[hostname].result
-            substring = result["facts"]["os_version"]       # Selecting only the OS version portion of the napalm result
-            x = substring.find("Version") + 8               # Finding starting location of version number string (8 characters after "Version")
-            substring = substring[x:]
-            y = substring.find(",")                         # Finding end index of version number string
-            substring = substring[:y]                       # Trimming fluff
-            switchIOSVersion.append(versionFormatter(substring))
-        except Exception as e:
-            print(f"Error gathering switch data, one or more switches probably offline")
-    
-    print("Complete!\n")
-    return switchHostnames, switchIOSVersion
-
-
-
-# GET FREE SPACE
-# Function iterates through hosts.yaml and grabs the free space remaining in bytes
-################################################################################
-def getFreeSpace(nr):
-    print("Getting remaining free space on switches...")
-    command = "dir"
-    output = nr.run(netmiko_send_command, command_string=command)
-    switchFreeSpace = []
-
-    swan_logger.commandLogger(command, output)
-
-    for hostname in output:
-        result = output[hostname].result
-        lastLine = result.splitlines()[-1]              # Grabbing line with free space so filenames dont mess with substrings
-        x = lastLine.find("(") + 1                      # Finding index of first parenthesis where free space starts
-        substring = lastLine[x:]
-        y = lastLine.find(" ")                          # Finding index of space after free space size
-        size = int(substring[:y])                       # Trimming fluff and casting to int instead of str
-        switchFreeSpace.append(size)
-
-    print("Complete!\n")
-    return switchFreeSpace
-
-
-# GET SWITCH STACK
-# Shamelessly ripped this idea off of another IOS upgrade BUNDLE mode script
-# Link: https://github.com/nouse4it/Netmiko_IOS_Update
-################################################################################
-def getSwitchStack(nr):
-    print("Getting number of switches in stack")
-    command = "show run | i GigabitEthernet"
-    output = nr.run(netmiko_send_command, command_string=command)
-    switchStack = []
-
-    swan_logger.commandLogger(command, output)
-
-    for hostname in output:                             # Using Cisco interface naming scheme to determine how many switches are in a stack
-        result = output[hostname].result
-        if "GigabitEthernet9" in result:
-            switchStack.append(9)
-        elif "GigabitEthernet8" in result:
-            switchStack.append(8)
-        elif "GigabitEthernet7" in result:
-            switchStack.append(7)
-        elif "GigabitEthernet6" in result:
-            switchStack.append(6)
-        elif "GigabitEthernet5" in result:
-            switchStack.append(5)
-        elif "GigabitEthernet4" in result:
-            switchStack.append(4)
-        elif "GigabitEthernet3" in result:
-            switchStack.append(3)
-        elif "GigabitEthernet2" in result:
-            switchStack.append(2)
-        elif "GigabitEthernet1" in result:
-            switchStack.append(1)
-    
-    return switchStack
-
-
-
-# IOS VERSION FORMATTER
-# Function takes a string and sanatizes its format to match the .bin version number format (XX.XX.XX)
-################################################################################
-def versionFormatter(string):
-    arr = string.split(".")                             # Splitting the string delimited by "." into three substrings
-    counter = 0
-    version = ""
-
-    for x in arr:                                       # Taking each individual substring
-        if len(x) != 2:                                 # If it is not 2 characters long, append a zero to the front
-            x = "0" + x
-        if counter < 2:                                 # If it is the first or second element, add a period after the substring
-            version = version + x + "."
-            counter = counter + 1
-        elif counter == 2:                              # If it is the third element, just append the substring to the end
-            version = version + x
-    return version
-
-
-
 # PRINT FORMATTER
 # Function takes master switch array and makes a pretty string to print out
 ################################################################################
@@ -453,229 +269,6 @@ def checkFreeSpace(arr, requiredSpace, missingFile):
 
 
 
-# MISSING FILE CHECKER
-# Function checks to see if the passed file exists on the switches. Used once
-# to check before the download, and once to insure files actually downloaded
-# Returns a list of switch hostnames that are missing the file
-################################################################################
-def missingFileChecker(nr, filename):
-    command = "dir flash: | i " + filename              # BUG: If you are checking for a file named "test" and there is a file already named "test2", this will erroneously report that "test" already exists.  To fix just do better string comparisons
-    output = nr.run(netmiko_send_command, command_string=command)    # Looking if the passed filename is in the flash
-    missingFile = []                                    # List to hold all hostnames that do not have the new file
-
-    swan_logger.commandLogger(command, output)
-
-    print(f"Checking if switches have {filename}...")
-    for hostname in output:                       
-        result = output[hostname].result
-        if result == "":
-            print(f"{RED}{hostname}{CLEAR} does not have {filename} in it's flash")
-            missingFile.append(hostname)                # Adding hostname
-        else:
-            print(f"{GREEN}{hostname}{CLEAR} has {filename} in it's flash")
-    print()
-    return missingFile
-
-
-
-# SCP IOS BIN
-# Function sends the bin file via SCP to all of the selected switches, 
-# missingFile is what is returned by missingFileChecker() above, an array of
-# only switches that are missing the desired file
-################################################################################
-def scpIOSBin(nr, ipAddress, folderPath, filename, filesize, missingFile):
-    filter = nr.filter(F(name__in=missingFile))         # name__in filters by a list of hostnames, filter object is only switches that are missing the requested file
-
-    fileUsername = input(f"Enter file server ({ipAddress}) username: ")
-    filePassword = getpass.getpass()
-
-    tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when download started
-    print(f"\nBeginning SCP transfer... - {tempTime}")
-    
-    command = f"copy scp://{fileUsername}@{ipAddress}//{folderPath}/{filename} flash:/{filename}"
-    output = filter.run(netmiko_send_command, command_string=command, expect_string=r'Destination filename', read_timeout=60)
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
-
-    output2 = filter.run(netmiko_send_command, command_string="", expect_string=r"Password", read_timeout=5)    # I have no idea why I need to pass a blank string before the password nor why you need a 5 second timeout delay, but you do
-    swan_logger.commandLogger("", output2, "CONTINUECOMMAND")
-    
-    nornirLogger = logging.getLogger("nornir.core")
-    nornirLogger.disabled = True
-    output3 = filter.run(netmiko_send_command, command_string=filePassword, expect_string=r"copied", read_timeout=readTimeoutEstimate(filesize), cmd_verify=False)
-    swan_logger.commandLogger("***DO NOT ACTUALY LOG PASSWORD***", output3, "ENDCOMMAND")
-    nornirLogger.disabled = False
-
-    print("Transfer completed!\n")
-    
-    for hostname in output3:
-        result = output3[hostname].result               # Grabbing string containing how much time the transfer took
-        x = result.find("copied in") + 10               # Getting starting string index of transfer time & speed 
-        duration = result[x:]
-        y = duration.find("/sec)") + 5                  # Getting ending string index of transfer time & speed
-        duration = duration[:y]
-        print(f"{GREEN}{hostname}{CLEAR} took {duration} to transfer {filename}")
-    print()
-
-
-
-
-# MD5 CHECKER
-# Function checks the MD5 hash of the file on the switch after it has been downloaded
-# Returns 1 if the hashes do not match
-################################################################################
-def MD5Checker(nr, filename, filesize, MD5):
-    print("Checking MD5 hash (this may take a few minutes)...")
-    command = "verify /md5 flash:" + filename
-    output = nr.run(netmiko_send_command, command_string=command, read_timeout=readTimeoutEstimate(filesize))
-    flag = 0                                            # Will be set to 1 if hashes dont match
-
-    swan_logger.commandLogger(command, output)
-
-    for hostname in output:
-        result = output[hostname].result
-        x = result.find(") =") + 4
-        fileHash = result[x:]                           # Substringing MD5 portion of command output
-        
-        if fileHash.strip() == MD5.strip():             # Stripping newlines and other chars that will mess this up
-            print(f"{GREEN}{hostname}{CLEAR}'s {filename} matches the given MD5")
-        else:
-            print(f"{RED}{hostname}{CLEAR}'s {filename} does not match the given MD5")
-            print(f"{fileHash.strip()} =/= {MD5.strip()}\n")
-            flag = 1
-    return flag
-
-
-
-# COPY IOS BIN
-# Function takes initially downloaded IOS file and distributes it to all other
-# switches on the stack. The script starts at the max flash number (EX: flash-7:),
-# determines how many switches in the host list have 7 switches in a stack, copies
-# the file to all flash-7:'s on the switches, and then decrements until flash-2:
-# gets the files copied over.
-# Technically not needed for the 9000 series switches as the one shot command
-# has a built-in "Initial File Sync" where it does the same, but I don't believe the
-# older switch models do this and this saves time during the one-shot command.
-################################################################################
-def copyIOSBin(nr, arr, filename, filesize):
-    maxStack = 0                                        # Variable to hold the number of switches in the largest stack
-    for element in arr:
-        if element[3] > maxStack:
-            maxStack = element[3]
-
-    print("\nCopying file to all switches in stack...\n")
-    
-    switchFilter = []                                   # Variable to hold what switches need flash-i:
-    for i in range(maxStack, 1, -1):                    # Starts at max stack number and decrements down to 2 (1 is not included)
-        for element in arr:
-            if i <= element[3]:                         # If the switch's stack number is greater than or equal to current number i,
-                switchFilter.append(element[0])         # append the hostname to the filter array to have file copied to "flash-i:"
-        
-        filter = nr.filter(F(name__in=switchFilter))
-
-        checkFileCommand = f"dir flash-{i}: | i {filename}" # Command to check if each switch in stack already has file (as this will cause the program to hang)
-        fileOutput = filter.run(netmiko_send_command, command_string=checkFileCommand)
-        swan_logger.commandLogger(checkFileCommand, fileOutput)
-
-        deleteFilter = []                               # Varaible to hold what switches are getting a potentially old file deleted
-        for hostname in fileOutput:                       
-            result = fileOutput[hostname].result
-            if result != "":                            # If the output does contain the file...
-                print(f"File already found in {hostname} flash-{i}, deleting...")
-                deleteFilter.append(hostname)           # ...append the hostname to a variable to filter with
-        
-        if len(deleteFilter) != 0:                      # If there are switches that need a files deleted...
-            hosts = filter.filter(F(name__in=deleteFilter)) # Filter to only that one specific host
-            deleteCommand = f"del flash-{i}:{filename}"
-            delete = hosts.run(netmiko_send_command, command_string=deleteCommand, expect_string=r'Delete filename', read_timeout=300, cmd_verify=False)
-            swan_logger.commandLogger(deleteCommand, delete, "STARTCOMMAND")
-
-            delete2 = hosts.run(netmiko_send_command, command_string=f"", expect_string=r'confirm', read_timeout=300, cmd_verify=False)
-            swan_logger.commandLogger(deleteCommand, delete2, "CONTINUECOMMAND")
-
-            delete3 = hosts.run(netmiko_send_command, command_string=f"")
-            swan_logger.commandLogger(deleteCommand, delete3, "ENDCOMMAND")
-            print("File(s) deleted\n")
-
-        print(f"Copying to all {i}-stack switches")
-        print(f"Switch List = {switchFilter}")
-        command = f"copy flash:{filename} flash-{i}:{filename}" # Command to copy IOS .bin to specified flash
-        output = filter.run(netmiko_send_command, command_string=command, expect_string=r'Destination filename')
-        swan_logger.commandLogger(command, output, "STARTCOMMAND")
-
-        output2 = filter.run(netmiko_send_command, command_string="", expect_string=r'copied', read_timeout=readTimeoutCopyEstimate(filesize), cmd_verify=False)
-        swan_logger.commandLogger(command, output2, "ENDCOMMAND")
-        print(f"{filename} copied to all {i}-stack switches\n")
-
-        switchFilter = []                               # Resetting hostname filter back to empty
-
-
-
-# UPGRADE IOS
-# Function that actually runs the upgrade commands on the switch. Starts off with 
-# install add file flash:{filename} to expand the .bin file archive followed by
-# install activate which is what actually changes configs and restarts the switch.
-# Slightly differnt in the BUNDLE script to get the switch to be INSTALL mode.
-################################################################################
-def upgradeIOS(nr, filename):
-    print("\nSaving switch config...")
-    nr.run(netmiko_save_config)                                 # install activate complains if you haven't saved before an activation
-    print("Saved!")
-
-    print("\nRunning one-shot upgrade command (takes a few minutes)...")
-    command = f"install add file flash:{filename} activate commit"
-    output = nr.run(netmiko_send_command, command_string=command, expect_string=r"flash:packages.conf",read_timeout=600, cmd_verify=False)
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
-
-    output2 = nr.run(netmiko_send_command, command_string="y", expect_string=r"want to proceed", read_timeout=600, cmd_verify=False)
-    swan_logger.commandLogger("", output2, "CONTINUECOMMAND")
-
-    output3 = nr.run(netmiko_send_command, command_string="y", expect_string=r"", read_timeout=600, cmd_verify=False)
-    swan_logger.commandLogger("", output3, "ENDCOMMAND")
-    print("Restarting...\n\n")
-
-
-
-# CHECK ALIVE REBOOT2
-# Completely different check alive function as NAPALM checks to see if port 22 is
-# open in its is_alive() function, and port 22 never gets closed during the upgrade.
-# Netmiko seems to encounter some socket closed error if you keep on running it's tasks on
-# the same global nornir object (the nr one) during the upgrade process so that was also dropped.
-# To fix these issues, I first reinitalize a completely new Nornir object in main()
-# with all of the same configs and filtering as the global Nornir object and runs a NAPALM task
-# over and over again until that task does not fail on any hosts, meaning that all hosts are
-# online. This used to recreate a new host every query, but this was filling up switch TTY's
-# Function returns 0 once all hosts come back online
-################################################################################
-def checkAliveReboot2(nr):
-    hostnameList = list(nr.inventory.hosts.keys())      # List of all hostnames pulled from hosts.yaml inventory file
-    now = datetime.now()
-    print("Sleeping 5 minutes before starting to check if machines are up...")
-    print(f"Current Time: ", now.strftime("%H:%M:%S"))
-    time.sleep(300)
-    print("5 minutes have elapsed\n")
-
-    try:    
-        while True:
-            print("\nPolling devices...")
-            output = nr.run(napalm_get, getters="facts", on_failed=True)
-
-            if len(nr.data.failed_hosts) == 0:
-                print("All switches online")
-                return 0
-            elif len(nr.data.failed_hosts) > 0:
-                for hostname in hostnameList:
-                    if hostname in nr.data.failed_hosts:
-                        print(f"{RED}{hostname}{CLEAR} is offline")
-                    else:
-                        print(f"{GREEN}{hostname}{CLEAR} is online")
-            nr.data.reset_failed_hosts()                # Reseting failed host list so every host gets checked again next loop
-            time.sleep(30)
-    except KeyboardInterrupt:
-        print("Exiting check alive loop")
-        return 0
-
-
-
 # UPGRADE CHECKER
 # Function is ran after the upgrade has been committed, and checks to see if the
 # switches' IOS version they have matches the IOS version you wanted to upgrade to.
@@ -705,13 +298,19 @@ def upgradeChecker(updatedSwitches, newIOSVer):
 # they want to remove old IOS files to clear up some space
 ################################################################################
 def removeInactive(nr):
+    ios_cache.invalidate(nr)                            # Flash contents are about to change
+    ios_flash.forget(nr.inventory.hosts)
     print("\nRemoving inactive files...  (This may take a few minutes)")
     command = "install remove inactive"
-    output = nr.run(netmiko_send_command, command_string=command, read_timeout=300, expect_string=r"Do you want to remove the above files", cmd_verify=False)   # 5 min wait
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
+    if ios_async.enabled(nr):                           # Remove and save in one dialog per switch, look at ios_async.py
+        output = ios_async.runDialog(nr, ios_async.removeInactiveDialog, name="remove inactive")
+        ios_async.checkDialog(output)
+        print("Inactive files removed and config saved!")
+        swan_logger.commandLogger(command, output, "ENDLOG")        # Outputting ending banner in logs
+        return
 
-    output2 = nr.run(netmiko_send_command, command_string="y", read_timeout=300, expect_string=r"SUCCESS: install_remove", cmd_verify=False)
-    swan_logger.commandLogger(command, output2, "ENDCOMMAND")
+    output = ios_stream.streamCommand(nr, command, flag="STARTCOMMAND", read_timeout=300, expect_string=r"Do you want to remove the above files", cmd_verify=False)   # 5 min wait
+    ios_stream.streamCommand(nr, "y", flag="ENDCOMMAND", log=command, read_timeout=300, expect_string=r"SUCCESS: install_remove", cmd_verify=False)
     print("Inactive files removed!\n")
 
     print("Saving config...")
@@ -725,54 +324,55 @@ def removeInactive(nr):
 # MAIN
 ################################################################################
 def main():
+    args = parseArguments()                             # Only --resume for now, look at parseArguments()
+
     ################################################################################
     #                               PRECONFIGURATION                               #
     ################################################################################
     newIOSVersion, newFileServerIP, newFileServerPath, newIOSFile, newIOSMD5, newIOSSize = newIOSData() #Function populating new IOS file info
 
-    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit to (re)create the nr object a few times
-    nr = nornirInit(configFile)                         # Custom built initialization function that fixes bugs, look at checkAliveReboot2() for more details
+    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit
+    nr = nornirInit(configFile)                         # Custom built initialization function, this one object is used for the whole run
+    journal = ios_journal.RunJournal(nr, newIOSFile, resume=args.resume)   # Every phase a switch finishes is written down, look at ios_journal.py
+    journal.printResumed()
+    ios_timing.startRun(nr, "bundle")                   # Every phase of every switch is timed from here on out
     
     ################################################################################
     #                              9000 CONFIGURATION                              #
     ################################################################################  
-    if checkAlive(nr) == 1:                             # Function only returns 1 if one or more switches are offline
-        print(f"List of all hosts offline: {nr.data.failed_hosts}")
+    swan_logger.commandLogger("", nr.inventory.hosts.keys(), "STARTLOG")   # Start log banner being added
+    print("\nGathering switch data...")
+    print("################################################################################\n")
+    trusted = [hostname for hostname in nr.inventory.hosts if journal.resumed(hostname, "facts")]
+    facts, offline = ios_facts.gatherFacts(nr, trusted=trusted)  # One session per switch for everything below, doubles as the check that every switch is online
+    if len(offline) != 0:
+        print(f"List of all hosts offline: {offline}")
         print("\nExiting...")
         print("\nIf this failed on the first host in the inventory or you believe that")
         print("the host is alive, you may have mistyped your password")
         return
-
-    filterFlag = bundleOrInstall(nr)                    # Determining what boot mode the switches are using
-    if filterFlag == 1:                                 # Functions only returns 1 if one or more switches are in INSTALL mode
-        print("One or more switches in the host file are configured in INSTALL mode,")
-        print("this script only works on switches that are configured in BUNDLE mode.")
-        print("Please remove the offending switch from the \"bundle\" group in the")
-        print("hosts.yaml file and run this script again.")
+    journal.recordAll(journal.pending(facts, "facts"), "facts")
+
+    filterFlag = bundleOrInstall(nr, facts)             # Determining what boot mode the switches are using
+    if filterFlag == 1:                                 # Functions only returns 1 if one or more switches are in INSTALL mode or their mode couldn't be read
+        print("One or more switches in the host file are configured in INSTALL mode (or their")
+        print("boot mode couldn't be read), this script only works on switches that are")
+        print("configured in BUNDLE mode. Please remove the offending switch from the")
+        print("\"bundle\" group in the hosts.yaml file and run this script again.")
         return
 
-    setIgnoreStartupCfg(nr)                             # Function sets register that may break upgrade
-    removeBundleBoot(nr)                                # Function removes boot variable that for some reason never gets updated in the upgrade
+    remediate = nr.filter(F(name__in=journal.pending(facts, "config")))   # Switches that had their config fixed before the script was resumed are left alone
+    if len(remediate.inventory.hosts) != 0:
+        with ios_timing.fleetSpan(remediate.inventory.hosts, "config"):
+            configured = ios_remediation.remediate(remediate, facts)    # Ignore startup config register and the BUNDLE mode boot variable, one config session and one save per switch
+        journal.recordAll(configured, "config")
+    ios_cache.storeFacts(nr, facts)                     # Saving the config changes above into the facts cache
 
-    switches = []                                       # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes, number of switches in stack:
+    switches = ios_facts.factsToSwitches(facts, stack=True) # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes, number of switches in stack:
                                                         # [['hostname','XX.XX.XX', 8000000000, 4], ['hostname2','XX.XX.YY', 7000000000, 6]]
-    print("\nGathering switch data...")
-    print("################################################################################\n")
-    switchHostnames, temp = getSwitchData(nr)           # Using a whole bunch of getter methods to gather switch data, returns two arrays
-    switchIOSVersion = []
-    for version in temp:                                # Formatting the IOS versions once more, can never be too sure...
-        switchIOSVersion.append(versionFormatter(version))
-    switchFreeSpace = getFreeSpace(nr)
-    switchStack = getSwitchStack(nr)                    # Getting number of switches in a stack
-
-    print("Formatting data...\n")                       # Formatting all of the data into the switches array that was explained above
-    for x in range(len(switchHostnames)):               # Using switchHostnames array length, but any of them should work as they should
-        tempList = []                                   # all be the same size and in the same order as the hosts.yaml file
-        tempList.append(switchHostnames[x])
-        tempList.append(switchIOSVersion[x])
-        tempList.append(switchFreeSpace[x])
-        tempList.append(switchStack[x])
-        switches.append(tempList)
+    missingFile = ios_facts.missingFile(facts, newIOSFile)  # List to hold all hostnames that do not have the new file
+    missingFile = journal.pending(missingFile, "activated") # Switches activated before the script was resumed don't need the file anymore
+    journal.forget(missingFile, ["file", "md5"])        # Flash says the file isn't there, so those switches start over from the download
 
     printFormatter(switches, newIOSVersion)             # Prints out switch data formatted in table
    
@@ -781,14 +381,12 @@ def main():
     else:
         print(f"{len(switches)} switches in list\n")
 
-    missingFile = missingFileChecker(nr, newIOSFile)    # Grabbing a list of switch hostnames that are missing the file
+    fileUsername = None
+    filePassword = None
     if len(missingFile) == 0:                           # If all switches happen to have the .bin file
         print("All switches have the new file in their flash\n")
-        if MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
-                print("Exiting...")
-                return
     else:                                               # If one or more switches are missing the file
-        while True:                                     # Loop for downloading the specified file
+        while True:                                     # Loop for confirming the download of the specified file
             print(f"One or more switches is missing {newIOSFile}")
             
             if checkFreeSpace(switches, newIOSSize, missingFile) == 1:  # Function only returns 1 if one or more switches dont have enough free space
@@ -799,37 +397,26 @@ def main():
             answer = input("\nKnowing this, do you wish to start the transfer (yes or no)?\n")
             
             if "yes" in answer.lower():
-                print("\n\nDownloading IOS files...")
-                print("################################################################################")
-                scpIOSBin(nr, newFileServerIP, newFileServerPath, newIOSFile, newIOSSize, missingFile)    # Downloads file only on switches that are missing the file
-                print("Ensuring file was downloaded properly...\n")
-                missingFileChecker(nr, newIOSFile)                          # Checking to make sure file now exists
-                if MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
-                    print("Exiting...")
-                    return
+                fileUsername = input(f"Enter file server ({newFileServerIP}) username: ")   # Asked for here since every switch downloads on its own in the pipeline
+                filePassword = getpass.getpass()
                 break
             elif "no" in answer.lower():
                 return
             else:
                 print("Please either answer \"yes\" or \"no\".\n\n")
 
-    print("\n\nCopying IOS files to all switches in stack...")
-    print("################################################################################")
-    copyIOSBin(nr, switches, newIOSFile, newIOSSize)    # Copying file from flash: to all other flashes in stack
-
-    skipFlag = True                                     # Flag for checking if checkAliveReboot2() is needed or not
+    skipFlag = True                                     # Flag for checking if the upgrade and reboot stages are needed or not
     while True:                                         # Loop for upgrading new IOS version
-        print("\nUpgrading the switches...")
+        print("\n\nUpgrading the switches...")
         print("################################################################################\n")
-        print(f"{newIOSFile} has been successfully downloaded on all switches")
+        print(f"Each switch will be upgraded as soon as it has a verified copy of {newIOSFile} on every stack member")
         print("\nDo you wish to start the IOS upgrade process, skip this step, or stop the script (start/skip/stop)?")
-        print("Skipping this step brings you to the option to remove inactive files.")
+        print("Skipping this step only downloads, verifies, and copies the file to the stack, then brings you to the option to remove inactive files.")
         print("Since BUNDLE -> INSTALL mode requires a one-shot install command, there")
         print("is no option to rollback to the last IOS verion after the install.")
         answer = input("NOTE: This will reboot the switches if you choose to start the upgrade\n")
         
         if "start" in answer.lower():
-            upgradeIOS(nr, newIOSFile)
             break
         elif "stop" in answer.lower():
             return
@@ -839,20 +426,52 @@ def main():
             break
         else:
             print("\n\nPlease either answer (start/stop/skip).")
-    
-    nornirLogger = logging.getLogger("nornir.core.task")
-    nornirLogger.disabled = True                        # Temporarily disabling nornir.log error tracebacks as checkAliveReboot2() just spams the log full of 'em
 
-    user, passw = credentialGrabber(nr)                 # User & Pass to automatically make downloadNR object
-    pollingNR = nornirInit(configFile, user, passw)     # Nornir object used ONLY for figuring out when switch restarts
-    while True and skipFlag:                            # Will only skip this step if skipFlag is set to false above
-        if checkAliveReboot2(pollingNR) == 0:           # Function only returns a 0 once all switches are back online and can have a command ran on them
-            break
+    pendingHosts = journal.pending(facts, "activated")  # Switches activated before the script was resumed already rebooted
+    distributor = None
+    if ios_fanout.fanoutOptions(nr)["enabled"]:         # One switch per site pulls from the file server, the rest copy from a peer
+        distributor = ios_fanout.PeerDistributor(nr, missingFile, newIOSMD5)
+    stages = [                                          # Download (if missing) -> MD5 -> stack copy -> upgrade -> wait for reboot, all per switch
+        ios_pipeline.stage("transfer", ios_stages.scpTask, hosts=missingFile, ipAddress=newFileServerIP, folderPath=newFileServerPath,
+                           filename=newIOSFile, filesize=newIOSSize, fileUsername=fileUsername, filePassword=filePassword, readTimeout=readTimeoutEstimate(newIOSSize),
+                           scheduler=ios_transfers.TransferScheduler(nr), mirrors=ios_mirrors.mirrorList(newFileServerIP, newFileServerPath, nr),
+                           distributor=distributor, phase="file"),
+        ios_pipeline.stage("md5", ios_stages.md5Task, filename=newIOSFile, MD5=newIOSMD5, readTimeout=readTimeoutEstimate(newIOSSize), phase="md5"),
+        ios_pipeline.stage("stackCopy", ios_stages.stackCopyTask, hosts=pendingHosts, facts=facts, filename=newIOSFile, filesize=newIOSSize,
+                           readTimeout=readTimeoutCopyEstimate(newIOSSize)),   # Copying file from flash: to all other flashes in stack, look at stackCopyTask() in ios_stages.py
+    ]
+    if distributor is not None and skipFlag:            # Sources wait for the rest of their site to finish copying before upgrading
+        stages.append(ios_pipeline.stage("fanout", ios_fanout.drainTask, hosts=missingFile, distributor=distributor))
+    gate = None
+    if skipFlag:                                        # Upgrade -> wait for reboot -> check version, one wave of switches at a time
+        waves = ios_waves.planWaves(nr.filter(F(name__in=pendingHosts)))
+        ios_waves.printWaves(waves)
+        gate = ios_waves.WaveGate(waves, ios_waves.waveOptions(nr)["max_wait"])
+        stages.append(ios_pipeline.stage("waveWait", ios_waves.waveWaitTask, gate=gate, skipIf="activated"))
+        stages.append(ios_pipeline.stage("upgrade", ios_stages.upgradeBundleTask, filename=newIOSFile, phase="activated"))
+        stages.append(ios_pipeline.stage("reboot", ios_stages.rebootWaitTask, skipIf="activated"))
+        stages.append(ios_pipeline.stage("versionCheck", ios_stages.versionCheckTask, newIOSVersion=newIOSVersion))
+        stages.append(ios_pipeline.stage("waveDone", ios_waves.waveDoneTask, gate=gate, skipIf="activated"))
+
+    tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when the pipeline started
+    print(f"\nStarting upgrade pipeline... - {tempTime}")
+    nornirLogger = logging.getLogger("nornir.core")
+    nornirLogger.disabled = True                        # File server password is being sent and reboot polling spams the log full of tracebacks
+    ios_http_server.startServer(nr)                     # Built-in image server, only started if it is turned on in config.yaml
+    output = ios_pipeline.runPipeline(nr, stages, name="upgrade", onFailed=gate.drop if gate is not None else None, journal=journal)
     nornirLogger.disabled = False
+    ios_http_server.stopServer()
+    ios_fanout.cleanup(nr, distributor, save=skipFlag)  # Turning the sources' SCP servers back off, saved since the upgrade saved them on
+
+    if ios_pipeline.checkPipeline(output) == 1:         # Function only returns 1 if one or more switches dropped out of the pipeline
+        print("Continuing with only the switches that made it through every stage...\n")
+    upgradedHosts = list(ios_pipeline.pipelineContexts(output))
+    if len(upgradedHosts) == 0:
+        print("Exiting...")
+        return
     
-    username, password = credentialGrabber(nr)          # Grabbing credentials to...
-    nr2 = nornirInit(configFile, username, password)    # ...reinitialize the nornir object as the old one has timed out after reboot and will no longer run any commands,
-                                                        # as it literally cant find the host. All future nornir calls use this nr2 object
+    nr2 = nr.filter(F(name__in=upgradedHosts))          # Leaving out any switch that dropped out of the pipeline, same hosts and sessions as nr
+    ios_connections.refresh(nr2)                        # Throws out any session that died during the reboot, look at ios_connections.py
     
     ################################################################################
     #                              POST-UPDATE CHECKS                              #
@@ -860,24 +479,10 @@ def main():
     tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when the upgrade finished
     print(f"Upgrade Finished - {tempTime}")
     
-    updatedSwitches = []                                # Array that holds all switch data after the update has occured
     print("\n\nGathering upgraded switch data...")
     print("################################################################################\n")
-    updatedSwitchHostnames, temp2 = getSwitchData(nr2)  # This is identical to the first time switch data was grabbed, so I'll spare you the comments
-    updatedSwitchIOSVersion = []
-    for version2 in temp2:
-        updatedSwitchIOSVersion.append(versionFormatter(version2))
-    updatedSwitchFreeSpace = getFreeSpace(nr2)
-    updatedSwitchStack = getSwitchStack(nr2)
-
-    print("Formatting data...\n")
-    for x in range(len(updatedSwitchHostnames)):
-        tempList2 = []
-        tempList2.append(updatedSwitchHostnames[x])
-        tempList2.append(updatedSwitchIOSVersion[x])
-        tempList2.append(updatedSwitchFreeSpace[x])
-        tempList2.append(updatedSwitchStack[x])
-        updatedSwitches.append(tempList2)
+    updatedFacts, offline = ios_facts.gatherFacts(nr2)  # This is identical to the first time switch data was grabbed, so I'll spare you the comments
+    updatedSwitches = ios_facts.factsToSwitches(updatedFacts, stack=True)   # Array that holds all switch data after the update has occured
 
     printFormatter(updatedSwitches, newIOSVersion)      # Printing out table with new switch data
     print(f"{len(updatedSwitches)} Switches in list\n")
@@ -903,4 +508,7 @@ def main():
 
 
 if __name__ == "__main__":                              # Running main()
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        ios_timing.writeReport()                        # Timing report for however far the run got, look at ios_timing.py
\ No newline at end of file
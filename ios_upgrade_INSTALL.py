@@ -1,5 +1,5 @@
 # Script by: DarkSplash
-# Last edited: 02/27/2023
+# Last edited: 10/17/2026
 
 # This script is designed to upgrade the IOS version of a c9000 IOS or IOS-XE switch.
 # Currently the script looks for a file located somewhere in a specified fileserver directory,
@@ -9,19 +9,35 @@
 # IOS files that are no longer used after the update to free up space on the switches.
 
 
+import argparse
 from datetime import datetime
 import getpass
+import ios_async                                        # Optional asyncio transport for the commit/abort and remove inactive (the pipeline steps use it too), look at ios_async.py
+import ios_cache                                        # On-disk facts cache, thrown out for any switch that gets changed
+import ios_connections                                  # Connection manager, one Nornir object lasts the whole run
+import ios_fanout                                       # Peer-to-peer fan-out, one switch per site pulls the file and the rest copy from it
+import ios_facts                                        # Gathers every pre-flight fact over one session per switch
 import ios_file_data                                    # Script to hold IOS file variables
+import ios_flash                                        # Flash index, every file and free space check is a lookup in here
+import ios_http_server                                  # Optional built-in HTTP(S) image server, look at startServer()
+import ios_journal                                      # Crash-safe run journal, lets --resume skip everything a switch already finished
+import ios_ledger                                       # Verified-image ledger, lets MD5Checker() skip files that were already hashed
+import ios_mirrors                                      # Mirror selection, each switch pulls from its fastest file server
+import ios_parsers                                      # Compiled parsers for every command's output
+import ios_pipeline                                     # Per-host pipeline engine, look at runPipeline() or script for more details
+import ios_remediation                                  # Pre-upgrade config planned from the facts, one config session and one save per switch
+import ios_runner                                       # Registers the "swan" runner plugin set in config.yaml, has to be imported before InitNornir()
+import ios_stages                                       # Per-host versions of the functions in this script that get chained in the pipeline
+import ios_stream                                       # Streaming results, every fleet-wide command is logged and parsed as each switch finishes
+import ios_timeouts                                     # Adaptive read timeouts learned from previous transfers and MD5 checks
+import ios_timing                                       # Per-host, per-phase timing, a report is written when the script exits
+import ios_transfers                                    # Bandwidth-aware transfer scheduler, caps concurrent copies per file server and site
+import ios_waves                                        # Rolling wave scheduler, caps how many switches reboot at once
 import logging
 from nornir import InitNornir
 from nornir.core.filter import F
-from nornir.core.task import Task, Result
-from nornir_napalm.plugins.tasks import napalm_get
-from nornir_netmiko.tasks import netmiko_send_command
-from nornir_netmiko.tasks import netmiko_send_config
 from nornir_netmiko.tasks import netmiko_save_config
 import swan_logger                                      # Custom written logger script, look at commandLogger() or script for more details
-import time
 
 
 # Packageless Terminal Colors: https://stackoverflow.com/a/21786287
@@ -31,6 +47,16 @@ CLEAR = "\x1b[0m"
 
 
 
+# PARSE ARGUMENTS
+# Function reads the command line arguments the script was ran with
+################################################################################
+def parseArguments():
+    parser = argparse.ArgumentParser(description="Upgrades every INSTALL mode switch in hosts.yaml to the IOS file in ios_file_data.py")
+    parser.add_argument("--resume", action="store_true", help="pick the last run for the same file back up, skipping everything each switch already finished")
+    return parser.parse_args()
+
+
+
 # https://nornir.discourse.group/t/using-getpass-getpass-instead-of-pre-filled-password/78 (Now a dead site, RIP my sweet prince)
 # This man is a god amongst us mere mortals, how to set Nornir credentials on runtime
 ################################################################################
@@ -76,6 +102,8 @@ def newIOSData():
         print(f"\nNew IOS Version: {newIOSVersion}")
         print(f"New Fileserver IP: {newFileServerIP}")
         print(f"New Fileserver Path: {newFileServerPath}")
+        for mirror in ios_mirrors.mirrorList(newFileServerIP, newFileServerPath)[1:]:
+            print(f"Mirror: {mirror['ip']}//{mirror['path']}")
         print(f"New IOS File: {newIOSFile}")
         print(f"New IOS MD5: {newIOSMD5}")
         print(f"New IOS Size: {newIOSSize}")
@@ -94,21 +122,17 @@ def newIOSData():
 
 
 # NORNIR INIT
-# Function explititly made to solve bugs in checkAliveReboot2(), look there for why
-# this function was made.  This is now the main function used to initialize nornir objects
-# instead of using InitNornir(), just moved the code that used to exist in the
-# preconfiguration portion of main() to create the nornir object and made it
-# so you can create an object whenever you want.  This function only gets passed
-# the username and password parameters when a new nornir object is being initialized
-# after the old nornir object has timed out/stopped responding after a reboot.
+# Function used to initialize the nornir object instead of using InitNornir(), asks
+# for the switch credentials and filters down to only the switches this script works
+# on. This used to be called a second time after the reboot (with the credentials
+# pulled back out of the old object by credentialGrabber()) since every session on
+# the old object was dead after the reload. The connection manager now throws out
+# dead sessions and reconnects on its own (look at ios_connections.py), so the one
+# object made here lasts the whole run.
 ################################################################################
-def nornirInit(configFile, username=None, password=None):
+def nornirInit(configFile):
     nr = InitNornir(config_file=configFile)             # Initializing Nornir object
-    
-    if username is not None and password is not None:   # Portion of code for re-initializing nornir object, look at checkAliveReboot2() for more info
-        nornir_set_creds(nr, username, password)
-    else:
-        nornir_set_creds(nr)
+    nornir_set_creds(nr)
 
     print("\nFiltering to only INSTALL mode switches...\n")
     nr = nr.filter(F(groups__contains="install"))       # Install mode filter
@@ -116,78 +140,25 @@ def nornirInit(configFile, username=None, password=None):
     return nr
 
 
-# CREDENTIAL GRABBER
-# Function was made due to the bugs that were being encountered in checkAliveReboot2().
-# To fix these bugs, reinitializing the nr object seemed to do the job, but requires
-# a username and password each time it was made. Since the user already needed to manually
-# enter in their credentials at the beginning, and nornir stores those values, I can just
-# grab those already existing login credentials and recreate the nornir object.
-# The "if username is not..." portion of nornirInit() is where this data is being passed to
-################################################################################
-def credentialGrabber(nr):
-    username = ""                                       # Grabbing username and password so every recreation of the
-    password = ""                                       # Nornir object doesn't prompt you for credentials
-    for host in nr.inventory.hosts.values():
-            username = host.username
-            password = host.password
-            break
-    return username, password
-
-
-
-# IS ALIVE TASK
-# Shamelessly ripped code from the creator of netmiko (who also maintains nornir & napalm)
-# https://github.com/nornir-automation/nornir/issues/493
-# is_alive() checks to see if nornir can communicate with port 22 on a switch
-################################################################################
-def isAliveTask(task: Task) -> Result:
-    napalm = task.host.get_connection("napalm", task.nornir.config)     # task.host is variable holding hosts.yaml variable name (not hostname)
-    alive = napalm.is_alive()                                           # get_connection was passed napalm for its plugin to connect with and passed the current config variable of nornir
-    return Result(host=task.host, result=alive)                         # This manages to create a napalm variable that you can run napalm functions off of
-
-
-
-# CHECK ALIVE
-# Checks dict made by napalm's is_alive() function
-# Returns 1 if any of the switches are offline
-################################################################################
-def checkAlive(nr):
-    print("Checking if switches are online...")
-    output = nr.run(task=isAliveTask)
-
-    for hostname in output:                             # Grabs the name of the inventory from hosts.yaml (Non-indented part of file) 
-        result = output[hostname].result                # Unwrapping a single device's results out of nornir's weird dict-esque variable (AggregatedResult)
-                                                        # NOTE: Both of these happen ALOT in other functions, so this will be the only comment about it
-
-        if type(result) != dict:                        # Alive hosts are contained within a dict, whereas dead hosts are a string traceback
-            print(f"{RED}{hostname}{CLEAR} does not appear to be online")
-            return 1                                    # This super ugly block is due to is_alive() crashing this program due to non-alive hosts
-        else:                                           # returning the string traceback of the error (thank you NAPALM, very cool!)
-            if result['is_alive'] == False:             # No idea if this will ever be called, but here in case result doesnt throw a string traceback
-                print(f"{RED}{hostname}{CLEAR} does not appear to be online")
-                return 1
-        
-    print("All switches appear to be online\n")
-
-
 
 # BUNDLE OR INSTALL
 # Function looks at all hosts and determines if the boot mode is INSTALL mode or
 # BUNDLE mode. If BUNDLE mode is detected, the function immediately exits out
 # and reports what switches need to be removed from the host list for this script
 # to properly work, as this script was written for switches in INSTALL mode.
+# The boot mode is pulled out of the facts gathered by ios_facts.gatherFacts(),
+# and a switch whose boot mode couldn't be read is treated the same as one in the
+# wrong mode, since the script can't tell which commands it would take.
 ################################################################################
-def bundleOrInstall(nr):
+def bundleOrInstall(nr, facts):
     print("Checking what boot mode the switches use...")
-    command = "show version"
-    output = nr.run(netmiko_send_command, command_string=command)
     filterFlag = 0                                      # Flag used to warn users in main of the issues of running this script against bundle mode switches
-    
-    swan_logger.commandLogger(command, output, "STARTLOG")  # Start log banner being added
-    swan_logger.commandLogger(command, output)          # Actually logging first command
+    modes = {}                                          # Hostname -> string containing the boot mode
+
+    for hostname in facts:
+        modes[hostname] = facts[hostname]["mode"] or ""
 
-    for hostname in output:                       
-        result = output[hostname].result
+    for hostname, result in modes.items():
 
         if "BUNDLE" in result:
             print(f"{RED}{hostname}{CLEAR} is configured to be in BUNDLE mode")
@@ -195,158 +166,14 @@ def bundleOrInstall(nr):
             
         elif "INSTALL" in result:
             print(f"{GREEN}{hostname}{CLEAR} is configured to be in INSTALL mode")
+        else:                                           # Neither mode showed up in show version, can't be upgraded safely
+            print(f"{RED}{hostname}{CLEAR}'s boot mode could not be read")
+            filterFlag = 1
     print()
     return filterFlag
 
 
 
-# CHECK AUTO UPGRADE
-# Function iterates through hosts.yaml and looks to see if c9348s have
-# the command "software auto-upgrade enable" as it is needed to upgrade all
-# switches in a stack that are using INSTALL mode.
-# Unique function to INSTALL mode script.
-################################################################################
-def checkAutoUpgrade(nr):
-    print("Checking if \"software auto-upgrade enable\" is configured on switches")
-    command = "sh run | i software auto"
-    output = nr.run(netmiko_send_command, command_string=command)   # Looking if "software auto-upgrade enable" is in the running config
-
-    swan_logger.commandLogger(command, output)
-
-    for hostname in output:
-        result = output[hostname].result
-
-        if result == "":                                # When "software auto-upgrade enable" is not yet configured (blank string meaning the config wasnt found)
-            print(f"{RED}{hostname}{CLEAR} is missing \"software auto-upgrade enable\" in running-config, adding...")
-            filter = nr.filter(F(name=hostname))        # Creating a new nornir object that only has a single host which doesnt have software auto-upgrade enable configured
-            filterResult = filter.run(netmiko_send_config, config_commands="software auto-upgrade enable")  # Adding the missing config
-            filterResult2 = filter.run(netmiko_save_config)
-            print("Configuration successfully added and saved!\n")
-    print("All switches are configured with \"software auto-upgrade enable\"\n")
-
-
-
-# SET IGNORE STARTUP CFG
-# Function goes through and runs the command "no system ignore startupconfig switch all"
-# on all switches. Done because if this is not set, after reboot, the switch will
-# not load its configuration, taking it offline.
-################################################################################
-def setIgnoreStartupCfg(nr):
-    print("Making sure the SWITCH_IGNORE_STARTUP_CFG register is set to 0")
-    command = "no system ignore startupconfig switch all"
-
-    output = nr.run(netmiko_send_config, config_commands=command)
-    swan_logger.commandLogger(command, output)
-
-    output2 = nr.run(netmiko_save_config)
-    print("SWITCH_IGNORE_STARTUP_CFG has been set to 0\n")
-
-
-
-# RESET BOOT VAR
-# This is identical to removeBundleBoot() in the BUNDLE script. I have never needed
-# to run this function and the script works fine without this function, but during
-# code review, I was told that for IOS 17+, they for some reason now have you set 
-# the boot var explicitly to packages.conf, even though you have never needed to
-# do this previously. Function unsets the boot variable and then re-sets it to 
-# packages.conf because Cisco says to...
-################################################################################
-def resetBootVar(nr):
-    print("Resetting boot variable...")
-    command = "no boot system"
-    output = nr.run(netmiko_send_config, config_commands=command)
-    swan_logger.commandLogger(command, output)
-
-    command2 = "boot system flash:packages.conf"
-    output2 = nr.run(netmiko_send_config, config_commands=command2)
-    
-    output3 = nr.run(netmiko_save_config)               # Boot variable on next reload only updates after saving config
-
-    print("Boot variable has been reset to packages.conf!\n")
-
-
-
-# GET SWITCH DATA
-# Function iterates through hosts.yaml and grabs their hostnames and IOS versions,
-# could change result["facts"]["hostname"] to result["facts"]["fqdn"] for a fully qualified name
-# Try/Except added in for case where you dont wait for all hosts to come back online during restart
-################################################################################
-def getSwitchData(nr):
-    print("Getting switch hostnames & IOS versions...")
-    output = nr.run(napalm_get, getters="facts")
-    switchHostnames = []
-    switchIOSVersion = []
-
-    for hostname in output:
-        try:
-            result = output[hostname].result
-            name = result["facts"]["hostname"]
-            switchHostnames.append(name)
-        except Exception as e:
-            print()
-    
-    for hostname in output:
-        try:
-            result = output[hostname].result
-            substring = result["facts"]["os_version"]       # Selecting only the OS version portion of the napalm result
-            x = substring.find("Version") + 8               # Finding starting location of version number string (8 characters after "Version")
-            substring = substring[x:]
-            y = substring.find(",")                         # Finding end index of version number string
-            substring = substring[:y]                       # Trimming fluff
-            switchIOSVersion.append(versionFormatter(substring))
-        except Exception as e:
-            print(f"Error gathering switch data, one or more switches probably offline")
-    
-    print("Complete!\n")
-    return switchHostnames, switchIOSVersion
-
-
-
-# GET FREE SPACE
-# Function iterates through hosts.yaml and grabs the free space remaining in bytes
-################################################################################
-def getFreeSpace(nr):
-    print("Getting remaining free space on switches...")
-    command = "dir"
-    output = nr.run(netmiko_send_command, command_string=command)
-    switchFreeSpace = []
-
-    swan_logger.commandLogger(command, output)
-
-    for hostname in output:
-        result = output[hostname].result
-        lastLine = result.splitlines()[-1]              # Grabbing line with free space so filenames dont mess with substrings
-        x = lastLine.find("(") + 1                      # Finding index of first parenthesis where free space starts
-        substring = lastLine[x:]
-        y = lastLine.find(" ")                          # Finding index of space after free space size
-        size = int(substring[:y])                       # Trimming fluff and casting to int instead of str
-        switchFreeSpace.append(size)
-
-    print("Complete!\n")
-    return switchFreeSpace
-
-
-
-# IOS VERSION FORMATTER
-# Function takes a string and sanatizes its format to match the .bin version number format (XX.XX.XX)
-################################################################################
-def versionFormatter(string):
-    arr = string.split(".")                             # Splitting the string delimited by "." into three substrings
-    counter = 0
-    version = ""
-
-    for x in arr:                                       # Taking each individual substring
-        if len(x) != 2:                                 # If it is not 2 characters long, append a zero to the front
-            x = "0" + x
-        if counter < 2:                                 # If it is the first or second element, add a period after the substring
-            version = version + x + "."
-            counter = counter + 1
-        elif counter == 2:                              # If it is the third element, just append the substring to the end
-            version = version + x
-    return version
-
-
-
 # PRINT FORMATTER
 # Function takes master switch array and makes a pretty string to print out
 ################################################################################
@@ -431,90 +258,37 @@ def checkFreeSpace(arr, requiredSpace, missingFile):
 
 
 
-# MISSING FILE CHECKER
-# Function checks to see if the passed file exists on the switches. Used once
-# to check before the download, and once to insure files actually downloaded
-# Returns a list of switch hostnames that are missing the file
-################################################################################
-def missingFileChecker(nr, filename):
-    command = "dir | i " + filename                     # BUG: If you are checking for a file named "test" and there is a file already named "test2", this will erroneously report that "test" already exists. To fix just do better string comparisons
-    output = nr.run(netmiko_send_command, command_string=command)    # Looking if the passed filename is in the flash
-    missingFile = []                                    # List to hold all hostnames that do not have the new file
-
-    swan_logger.commandLogger(command, output)
-
-    print(f"Checking if switches have {filename}...")
-    for hostname in output:                       
-        result = output[hostname].result
-        if result == "":
-            print(f"{RED}{hostname}{CLEAR} does not have {filename} in it's flash")
-            missingFile.append(hostname)                # Adding hostname
-        else:
-            print(f"{GREEN}{hostname}{CLEAR} has {filename} in it's flash")
-    print()
-    return missingFile
-
-
-
-# SCP IOS BIN
-# Function sends the bin file via SCP to all of the selected switches, 
-# missingFile is what is returned by missingFileChecker() above, an array of
-# only switches that are missing the desired file
-################################################################################
-def scpIOSBin(nr, ipAddress, folderPath, filename, filesize, missingFile):
-    filter = nr.filter(F(name__in=missingFile))         # name__in filters by a list of hostnames, filter object is only switches that are missing the requested file
-
-    fileUsername = input(f"Enter file server ({ipAddress}) username: ")
-    filePassword = getpass.getpass()
-
-    tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when download started
-    print(f"\nBeginning SCP transfer... - {tempTime}")
-    
-    command = f"copy scp://{fileUsername}@{ipAddress}//{folderPath}/{filename} flash:/{filename}"
-    output = filter.run(netmiko_send_command, command_string=command, expect_string=r'Destination filename', read_timeout=60)
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
-
-    output2 = filter.run(netmiko_send_command, command_string="", expect_string=r"Password", read_timeout=5)    # I have no idea why I need to pass a blank string before the password nor why you need a 5 second timeout delay, but you do
-    swan_logger.commandLogger("", output2, "CONTINUECOMMAND")
-    
-    nornirLogger = logging.getLogger("nornir.core")
-    nornirLogger.disabled = True
-    output3 = filter.run(netmiko_send_command, command_string=filePassword, expect_string=r"copied", read_timeout=readTimeoutEstimate(filesize), cmd_verify=False)
-    swan_logger.commandLogger("***DO NOT ACTUALY LOG PASSWORD***", output3, "ENDCOMMAND")
-    nornirLogger.disabled = False
-
-    print("Transfer completed!\n")
-    
-    for hostname in output3:
-        result = output3[hostname].result               # Grabbing string containing how much time the transfer took
-        x = result.find("copied in") + 10               # Getting starting string index of transfer time & speed 
-        duration = result[x:]
-        y = duration.find("/sec)") + 5                  # Getting ending string index of transfer time & speed
-        duration = duration[:y]
-        print(f"{GREEN}{hostname}{CLEAR} took {duration} to transfer {filename}")
-    print()
-
-
-
 # MD5 CHECKER
 # Function checks the MD5 hash of the file on the switch after it has been downloaded
+# Switches where the ledger shows the exact same file already passed are skipped
 # Returns 1 if the hashes do not match
 ################################################################################
 def MD5Checker(nr, filename, filesize, MD5):
     print("Checking MD5 hash (this may take a few minutes)...")
-    command = "verify /md5 flash:" + filename
-    output = nr.run(netmiko_send_command, command_string=command, read_timeout=readTimeoutEstimate(filesize))
     flag = 0                                            # Will be set to 1 if hashes dont match
 
-    swan_logger.commandLogger(command, output)
+    metadata = ios_ledger.fileMetadata(nr, filename)    # Size and timestamp of the file on each switch
+    unverified = []                                     # Switches that actually need the file hashed
+    for hostname in metadata:
+        if ios_ledger.isVerified(nr, hostname, filename, metadata[hostname], MD5):
+            print(f"{GREEN}{hostname}{CLEAR}'s {filename} already matched the given MD5 and hasn't changed, skipping")
+        else:
+            unverified.append(hostname)
+    if len(unverified) == 0:
+        return flag
+
+    command = "verify /md5 flash:" + filename
+    unverifiedNR = nr.filter(F(name__in=unverified))
+    output = ios_stream.streamCommand(unverifiedNR, command, parser=ios_parsers.parseMd5,   # Each switch's output is logged and parsed as soon as its hash is done
+                                      read_timeout=ios_timeouts.fleetTimeout(unverifiedNR, "md5", filesize, readTimeoutEstimate(filesize)))
 
     for hostname in output:
-        result = output[hostname].result
-        x = result.find(") =") + 4
-        fileHash = result[x:]                           # Substringing MD5 portion of command output
+        parsed = output[hostname].result if not output[hostname].failed else None  # Output of a failed switch isn't parsed
+        fileHash = parsed.md5 if parsed is not None else "no hash"
         
-        if fileHash.strip() == MD5.strip():             # Stripping newlines and other chars that will mess this up
+        if fileHash == MD5.strip().lower():             # Stripping newlines and other chars that will mess this up
             print(f"{GREEN}{hostname}{CLEAR}'s {filename} matches the given MD5")
+            ios_ledger.recordVerified(nr, hostname, filename, metadata[hostname], MD5)
         else:
             print(f"{RED}{hostname}{CLEAR}'s {filename} does not match the given MD5")
             print(f"{fileHash.strip()} =/= {MD5.strip()}\n")
@@ -523,81 +297,27 @@ def MD5Checker(nr, filename, filesize, MD5):
 
 
 
-# UPGRADE IOS
-# Function that actually runs the upgrade commands on the switch. Starts off with 
-# install add file flash:{filename} to expand the .bin file archive followed by
-# install activate which is what actually changes configs and restarts the switch
-################################################################################
-def upgradeIOS(nr, filename):
-    print("\nSaving switch config...")
-    nr.run(netmiko_save_config)                                 # install activate complains if you haven't saved before an activation
-    print("Saved!")
-
-    print("\nExpanding .bin to .pkg files (step 1 of 3, takes a few minutes)...")
-    command = "install add file flash:" + filename
-    output = nr.run(netmiko_send_command, command_string=command, read_timeout=600)
-    swan_logger.commandLogger(command, output)
- 
-    print("\nChanging .conf files (step 2 of 3, takes a few minutes)...")
-    command2 = "install activate"
-    output2 = nr.run(netmiko_send_command, command_string=command2, strip_command=False, read_timeout=600, expect_string=r"want to proceed", cmd_verify=False)
-    swan_logger.commandLogger(command2, output2, "STARTCOMMAND")
-
-    print("\nActivating new package (step 3 of 3, takes a few minutes)...")
-    output3 = nr.run(netmiko_send_command, command_string="y", strip_command=False, read_timeout=600, expect_string=r"will reload the system", cmd_verify=False)
-    swan_logger.commandLogger("y", output3, "ENDCOMMAND")
-
-    print("\nRestarting...\n")
-
-
-
-# CHECK ALIVE REBOOT2
-# Completely different check alive function as NAPALM checks to see if port 22 is
-# open in its is_alive() function, and port 22 never gets closed during the upgrade.
-# Netmiko seems to encounter some socket closed error if you keep on running it's tasks on
-# the same global nornir object (the nr one) during the upgrade process so that was also dropped.
-# To fix these issues, I first reinitalize a completely new Nornir object in main()
-# with all of the same configs and filtering as the global Nornir object and runs a NAPALM task
-# over and over again until that task does not fail on any hosts, meaning that all hosts are
-# online. This used to recreate a new host every query, but this was filling up switch TTY's
-# Function returns 0 once all hosts come back online
+# FINISHED HOSTS
+# Function prints out every switch the commit or abort failed on and returns the
+# inventory names of every switch it went through on
 ################################################################################
-def checkAliveReboot2(nr):
-    hostnameList = list(nr.inventory.hosts.keys())      # List of all hostnames pulled from hosts.yaml inventory file
-    now = datetime.now()
-    print("Sleeping 5 minutes before starting to check if machines are up...")
-    print(f"Current Time: ", now.strftime("%H:%M:%S"))
-    time.sleep(300)
-    print("5 minutes have elapsed\n")
-    
-    try:
-        while True:
-            print("\nPolling devices...")
-            output = nr.run(napalm_get, getters="facts", on_failed=True)
-
-            if len(nr.data.failed_hosts) == 0:
-                print("All switches online")
-                return 0
-            elif len(nr.data.failed_hosts) > 0:
-                for hostname in hostnameList:
-                    if hostname in nr.data.failed_hosts:
-                        print(f"{RED}{hostname}{CLEAR} is offline")
-                    else:
-                        print(f"{GREEN}{hostname}{CLEAR} is online")
-            
-            nr.data.reset_failed_hosts()                # Reseting failed host list so every host gets checked again next loop
-            time.sleep(30)
-    except KeyboardInterrupt:
-        print("Exiting check alive loop")
-        return 0
-
+def finishedHosts(output):
+    finished = []
+    for hostname in output:
+        if output[hostname].failed:
+            reason = str(output[hostname][0].result or output[hostname][0].exception).strip().splitlines()
+            print(f"{RED}{hostname}{CLEAR} failed: {reason[-1] if len(reason) != 0 else 'unknown error'}")  # Last line of a traceback is the actual error
+        else:
+            finished.append(hostname)
+    return finished
 
 
 
 # UPGRADE FINISHER
 # Runs the last couple of commands required to either commit or abort the upgrade
 # Committing the upgrade takes a few seconds, while aborting the upgrade
-# will cause the switches to reboot while rolling back changes
+# will cause the switches to reboot while rolling back changes. Returns the
+# inventory names of every switch the commit or abort went through on.
 ################################################################################
 def upgradeFinisher(nr, answer):
     tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when the upgrade finished
@@ -605,21 +325,33 @@ def upgradeFinisher(nr, answer):
 
     if "commit" in answer.lower():                      # If you want to commit the new upgrade
         print("\nCommitting IOS upgrade...")
-        command = "install commit"
-        output = nr.run(netmiko_send_command, command_string=command, read_timeout=600, expect_string=r"SUCCESS", cmd_verify=False)
-        print("Successfully committed IOS upgrade!")
-        swan_logger.commandLogger(command, output)
-    
+        if ios_async.enabled(nr):                       # Same commit over the async transport, look at ios_async.py
+            output = ios_async.runDialog(nr, ios_async.commitDialog, name="commit")
+        else:
+            command = "install commit"
+            output = ios_stream.streamCommand(nr, command, read_timeout=600, expect_string=r"SUCCESS", cmd_verify=False)
+        finished = finishedHosts(output)
+        if len(finished) == len(output):
+            print("Successfully committed IOS upgrade!")
+        else:
+            print(f"Committed IOS upgrade on {len(finished)} of {len(output)} switches")
+        return finished
+
     elif "abort" in answer.lower():                     # If you want to abort the new upgrade
         print("\nAborting IOS upgrade...")
-        command = "install abort"
-        output = nr.run(netmiko_send_command, command_string=command, read_timeout=600, expect_string=r"want to proceed", cmd_verify=False)
-        swan_logger.commandLogger(command, output, "STARTCOMMAND")
-        
-        print("\nRolling back changes...")
-        output2 = nr.run(netmiko_send_command, command_string="y", read_timeout=600, expect_string=r"will reload the system", cmd_verify=False)
+        if ios_async.enabled(nr):                       # Same abort over the async transport, look at ios_async.py
+            finished = finishedHosts(ios_async.runDialog(nr, ios_async.abortDialog, name="abort"))
+        else:
+            command = "install abort"
+            output = ios_stream.streamCommand(nr, command, flag="STARTCOMMAND", read_timeout=600, expect_string=r"want to proceed", cmd_verify=False)
+            prompted = finishedHosts(output)            # Only switches that asked to proceed are answered
+
+            print("\nRolling back changes...")
+            output = ios_stream.streamCommand(nr.filter(F(name__in=prompted)), "y", flag="ENDCOMMAND", log=command, read_timeout=600, expect_string=r"will reload the system", cmd_verify=False)
+            finished = finishedHosts(output)
         print("\nRestarting...")
-        swan_logger.commandLogger(command, output2, "ENDCOMMAND")
+        return finished
+    return []
 
 
 
@@ -652,13 +384,19 @@ def upgradeChecker(updatedSwitches, newIOSVer):
 # they want to remove old IOS files to clear up some space
 ################################################################################
 def removeInactive(nr):
+    ios_cache.invalidate(nr)                            # Flash contents are about to change
+    ios_flash.forget(nr.inventory.hosts)
     print("\nRemoving inactive files... (This may take a few minutes)")
     command = "install remove inactive"
-    output = nr.run(netmiko_send_command, command_string=command, read_timeout=300, expect_string=r"Do you want to remove the above files", cmd_verify=False)   # 5 min wait
-    swan_logger.commandLogger(command, output, "STARTCOMMAND")
+    if ios_async.enabled(nr):                           # Remove and save in one dialog per switch, look at ios_async.py
+        output = ios_async.runDialog(nr, ios_async.removeInactiveDialog, name="remove inactive")
+        ios_async.checkDialog(output)
+        print("Inactive files removed and config saved!")
+        swan_logger.commandLogger(command, output, "ENDLOG")        # Outputting ending banner in logs
+        return
 
-    output2 = nr.run(netmiko_send_command, command_string="y", read_timeout=300, expect_string=r"SUCCESS: install_remove", cmd_verify=False)
-    swan_logger.commandLogger(command, output2, "ENDCOMMAND")
+    output = ios_stream.streamCommand(nr, command, flag="STARTCOMMAND", read_timeout=300, expect_string=r"Do you want to remove the above files", cmd_verify=False)   # 5 min wait
+    ios_stream.streamCommand(nr, "y", flag="ENDCOMMAND", log=command, read_timeout=300, expect_string=r"SUCCESS: install_remove", cmd_verify=False)
     print("Inactive files removed!\n")
 
     print("Saving config...")
@@ -672,53 +410,55 @@ def removeInactive(nr):
 # MAIN
 ################################################################################
 def main():
+    args = parseArguments()                             # Only --resume for now, look at parseArguments()
+
     ################################################################################
     #                               PRECONFIGURATION                               #
     ################################################################################
     newIOSVersion, newFileServerIP, newFileServerPath, newIOSFile, newIOSMD5, newIOSSize = newIOSData() #Function populating new IOS file info
     
-    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit to (re)create the nr object a few times
-    nr = nornirInit(configFile)                         # Custom built initialization function that fixes bugs, look at checkAliveReboot2() for more details
+    configFile = "config.yaml"                          # String location of config.yaml file, passed to nornirInit
+    nr = nornirInit(configFile)                         # Custom built initialization function, this one object is used for the whole run
+    journal = ios_journal.RunJournal(nr, newIOSFile, resume=args.resume)   # Every phase a switch finishes is written down, look at ios_journal.py
+    journal.printResumed()
+    ios_timing.startRun(nr, "install")                  # Every phase of every switch is timed from here on out
     
     ################################################################################
     #                              9000 CONFIGURATION                              #
     ################################################################################  
-    if checkAlive(nr) == 1:                             # Function only returns 1 if one or more switches are offline
-        print(f"List of all hosts offline: {nr.data.failed_hosts}")
+    swan_logger.commandLogger("", nr.inventory.hosts.keys(), "STARTLOG")   # Start log banner being added
+    print("\nGathering switch data...")
+    print("################################################################################\n")
+    trusted = [hostname for hostname in nr.inventory.hosts if journal.resumed(hostname, "facts")]
+    facts, offline = ios_facts.gatherFacts(nr, trusted=trusted)  # One session per switch for everything below, doubles as the check that every switch is online
+    if len(offline) != 0:
+        print(f"List of all hosts offline: {offline}")
         print("\nExiting...")
         print("\nIf this failed on the first host in the inventory or you believe that")
         print("the host is alive, you may have mistyped your password")
         return
-
-    filterFlag = bundleOrInstall(nr)                    # Determining what boot mode the switches are using
-    if filterFlag == 1:                                 # Functions only returns 1 if one or more switches are in BUNDLE mode
-        print("One or more switches in the host file are configured in BUNDLE mode,")
-        print("this script only works on switches that are configured in INSTALL mode.")
-        print("Please remove the offending switch from the \"install\" group in the")
-        print("hosts.yaml file and run this script again.")
+    journal.recordAll(journal.pending(facts, "facts"), "facts")
+
+    filterFlag = bundleOrInstall(nr, facts)             # Determining what boot mode the switches are using
+    if filterFlag == 1:                                 # Functions only returns 1 if one or more switches are in BUNDLE mode or their mode couldn't be read
+        print("One or more switches in the host file are configured in BUNDLE mode (or their")
+        print("boot mode couldn't be read), this script only works on switches that are")
+        print("configured in INSTALL mode. Please remove the offending switch from the")
+        print("\"install\" group in the hosts.yaml file and run this script again.")
         return
 
-    setIgnoreStartupCfg(nr)                             # Function sets register that may break upgrade
-    checkAutoUpgrade(nr)                                # Function checks to see if switch is properly configured to update to all switches in stack
-    resetBootVar(nr)                                    # See function for more details, but potentially needed function for IOS 17+
+    remediate = nr.filter(F(name__in=journal.pending(facts, "config")))   # Switches that had their config fixed before the script was resumed are left alone
+    if len(remediate.inventory.hosts) != 0:
+        with ios_timing.fleetSpan(remediate.inventory.hosts, "config"):
+            configured = ios_remediation.remediate(remediate, facts, autoUpgrade=True)  # Ignore startup config register, "software auto-upgrade enable", and the boot variable, one config session and one save per switch
+        journal.recordAll(configured, "config")
+    ios_cache.storeFacts(nr, facts)                     # Saving the config changes above into the facts cache
 
-    switches = []                                       # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes:
+    switches = ios_facts.factsToSwitches(facts)         # Array that holds all switch data, current structure is hostname, IOS version, freespace in bytes:
                                                         # [['hostname','XX.XX.XX', 8000000000], ['hostname2','XX.XX.YY', 7000000000]]
-    print("\nGathering switch data...")
-    print("################################################################################\n")
-    switchHostnames, temp = getSwitchData(nr)           # Using a whole bunch of getter methods to gather switch data, returns two arrays
-    switchIOSVersion = []
-    for version in temp:                                # Formatting the IOS versions once more, can never be too sure...
-        switchIOSVersion.append(versionFormatter(version))
-    switchFreeSpace = getFreeSpace(nr)
-
-    print("Formatting data...\n")                       # Formatting all of the data into the switches array that was explained above
-    for x in range(len(switchHostnames)):               # Using switchHostnames array length, but any of them should work as they should
-        tempList = []                                   # all be the same size and in the same order as the hosts.yaml file
-        tempList.append(switchHostnames[x])
-        tempList.append(switchIOSVersion[x])
-        tempList.append(switchFreeSpace[x])
-        switches.append(tempList)
+    missingFile = ios_facts.missingFile(facts, newIOSFile)  # List to hold all hostnames that do not have the new file
+    missingFile = journal.pending(missingFile, "activated") # Switches activated before the script was resumed don't need the file anymore
+    journal.forget(missingFile, ["file", "md5"])        # Flash says the file isn't there, so those switches start over from the download
 
     printFormatter(switches, newIOSVersion)             # Prints out switch data formatted in table
     
@@ -727,14 +467,12 @@ def main():
     else:
         print(f"{len(switches)} switches in list\n")
 
-    missingFile = missingFileChecker(nr, newIOSFile)    # Grabbing a list of switch hostnames that are missing the file
+    fileUsername = None
+    filePassword = None
     if len(missingFile) == 0:                           # If all switches happen to have the .bin file
         print("All switches have the new file in their flash\n")
-        if MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
-                print("Exiting...")
-                return
     else:                                               # If one or more switches are missing the file
-        while True:                                     # Loop for downloading the specified file
+        while True:                                     # Loop for confirming the download of the specified file
             print(f"One or more switches is missing {newIOSFile}")
             
             if checkFreeSpace(switches, newIOSSize, missingFile) == 1:  # Function only returns 1 if one or more switches dont have enough free space
@@ -745,31 +483,24 @@ def main():
             answer = input("\nKnowing this, do you wish to start the transfer (yes or no)?\n")
             
             if "yes" in answer.lower():
-                print("\n\nDownloading IOS files...")
-                print("################################################################################")
-                scpIOSBin(nr, newFileServerIP, newFileServerPath, newIOSFile, newIOSSize, missingFile)    # Downloads file only on switches that are missing the file
-                print("Ensuring file was downloaded properly...\n")
-                missingFileChecker(nr, newIOSFile)                          # Checking to make sure file now exists
-                if MD5Checker(nr, newIOSFile, newIOSSize, newIOSMD5) == 1:  # Function only returns 1 if hashes dont match, tells you in func which switch has the bad file
-                    print("Exiting...")
-                    return
+                fileUsername = input(f"Enter file server ({newFileServerIP}) username: ")   # Asked for here since every switch downloads on its own in the pipeline
+                filePassword = getpass.getpass()
                 break
             elif "no" in answer.lower():
                 return
             else:
                 print("Please either answer \"yes\" or \"no\".\n\n")
 
-    skipFlag = True                                     # Flag for checking if checkAliveReboot2() is needed or not
+    skipFlag = True                                     # Flag for checking if the upgrade and reboot stages are needed or not
     while True:                                         # Loop for upgrading new IOS version
         print("\n\nUpgrading the switches...")
         print("################################################################################\n")
-        print(f"{newIOSFile} has been successfully downloaded on all switches")
+        print(f"Each switch will be upgraded as soon as it has a verified copy of {newIOSFile}")
         print("\nDo you wish to start the IOS upgrade process, skip this step, or stop the script (start/skip/stop)?")
-        print("Skipping this step brings you to the option to commit, abort, or manually configure the upgrade")
+        print("Skipping this step only downloads and verifies the file, then brings you to the option to commit, abort, or manually configure the upgrade")
         answer = input("NOTE: This will reboot the switches if you choose to start the upgrade\n")
         
         if "start" in answer.lower():
-            upgradeIOS(nr, newIOSFile)
             break
         elif "stop" in answer.lower():
             return
@@ -779,21 +510,51 @@ def main():
             break
         else:
             print("\n\nPlease either answer (start/stop/skip).")
-    
-    nornirLogger = logging.getLogger("nornir.core.task")
-    nornirLogger.disabled = True                        # Temporarily disabling nornir.log error tracebacks as checkAliveReboot2() just spams the log full of 'em
 
-    user, passw = credentialGrabber(nr)                 # User & Pass to automatically make downloadNR object
-    pollingNR = nornirInit(configFile, user, passw)     # Nornir object used ONLY for figuring out when switch restarts
-    while True and skipFlag:                            # Will only skip this step if skipFlag is set to false above
-        if checkAliveReboot2(pollingNR) == 0:           # Function only returns a 0 once all switches are back online and can have a command ran on them
-            break
+    distributor = None
+    if ios_fanout.fanoutOptions(nr)["enabled"]:         # One switch per site pulls from the file server, the rest copy from a peer
+        distributor = ios_fanout.PeerDistributor(nr, missingFile, newIOSMD5)
+    stages = [                                          # Download (if missing) -> MD5 -> upgrade -> wait for reboot, all per switch
+        ios_pipeline.stage("transfer", ios_stages.scpTask, hosts=missingFile, ipAddress=newFileServerIP, folderPath=newFileServerPath,
+                           filename=newIOSFile, filesize=newIOSSize, fileUsername=fileUsername, filePassword=filePassword, readTimeout=readTimeoutEstimate(newIOSSize),
+                           scheduler=ios_transfers.TransferScheduler(nr), mirrors=ios_mirrors.mirrorList(newFileServerIP, newFileServerPath, nr),
+                           distributor=distributor, phase="file"),
+        ios_pipeline.stage("md5", ios_stages.md5Task, filename=newIOSFile, MD5=newIOSMD5, readTimeout=readTimeoutEstimate(newIOSSize), phase="md5"),
+    ]
+    if distributor is not None and skipFlag:            # Sources wait for the rest of their site to finish copying before upgrading
+        stages.append(ios_pipeline.stage("fanout", ios_fanout.drainTask, hosts=missingFile, distributor=distributor))
+    gate = None
+    if skipFlag:                                        # Upgrade -> wait for reboot -> check version, one wave of switches at a time
+        waves = ios_waves.planWaves(nr.filter(F(name__in=journal.pending(facts, "activated"))))  # Switches activated before the script was resumed already rebooted
+        ios_waves.printWaves(waves)
+        gate = ios_waves.WaveGate(waves, ios_waves.waveOptions(nr)["max_wait"])
+        stages.append(ios_pipeline.stage("waveWait", ios_waves.waveWaitTask, gate=gate, skipIf="activated"))
+        stages.append(ios_pipeline.stage("upgrade", ios_stages.upgradeInstallTask, filename=newIOSFile, phase="activated"))
+        stages.append(ios_pipeline.stage("reboot", ios_stages.rebootWaitTask, skipIf="activated"))
+        stages.append(ios_pipeline.stage("versionCheck", ios_stages.versionCheckTask, newIOSVersion=newIOSVersion))
+        stages.append(ios_pipeline.stage("waveDone", ios_waves.waveDoneTask, gate=gate, skipIf="activated"))
+
+    tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when the pipeline started
+    print(f"\nStarting upgrade pipeline... - {tempTime}")
+    nornirLogger = logging.getLogger("nornir.core")
+    nornirLogger.disabled = True                        # File server password is being sent and reboot polling spams the log full of tracebacks
+    ios_http_server.startServer(nr)                     # Built-in image server, only started if it is turned on in config.yaml
+    output = ios_pipeline.runPipeline(nr, stages, name="upgrade", onFailed=gate.drop if gate is not None else None, journal=journal)
     nornirLogger.disabled = False
+    ios_http_server.stopServer()
+    ios_fanout.cleanup(nr, distributor, save=skipFlag)  # Turning the sources' SCP servers back off, saved since the upgrade saved them on
+
+    if ios_pipeline.checkPipeline(output) == 1:         # Function only returns 1 if one or more switches dropped out of the pipeline
+        print("Continuing with only the switches that made it through every stage...\n")
+    upgradedHosts = list(ios_pipeline.pipelineContexts(output))
+    if len(upgradedHosts) == 0:
+        print("Exiting...")
+        return
     
-    username, password = credentialGrabber(nr)          # Grabbing credentials to...
-    nr2 = nornirInit(configFile, username, password)    # ...reinitialize the nornir object as the old one has timed out after reboot and will no longer run any commands,
-                                                        # as it literally cant find the host. All future nornir calls use this nr2 object
-    while True:
+    nr2 = nr.filter(F(name__in=upgradedHosts))          # Leaving out any switch that dropped out of the pipeline, same hosts and sessions as nr
+    ios_connections.refresh(nr2)                        # Throws out any session that died during the reboot, look at ios_connections.py
+    commitHosts = journal.pending(upgradedHosts, "committed")   # Switches committed before the script was resumed are left alone
+    while len(commitHosts) != 0:
         print("\n\nFinalizing upgrade process...")
         print("################################################################################\n")
         print(f"IOS {newIOSVersion} has been installed on all switches")
@@ -802,10 +563,12 @@ def main():
         answer = input("NOTE: This will reboot the switches if you choose to abort the upgrade\n")
 
         if "commit" in answer.lower():
-            upgradeFinisher(nr2, answer)
+            with ios_timing.fleetSpan(commitHosts, "commit"):
+                committedHosts = upgradeFinisher(nr2.filter(F(name__in=commitHosts)), answer)
+            journal.recordAll(committedHosts, "committed") # Switches whose commit failed are left to be committed on a --resume
             break
         elif "abort" in answer.lower():
-            upgradeFinisher(nr2, answer)
+            upgradeFinisher(nr2.filter(F(name__in=commitHosts)), answer)
             break
         elif "manual" in answer.lower():
             tempTime = datetime.now().strftime("%I:%M:%S %p")   # Listing out when script ended
@@ -820,22 +583,10 @@ def main():
     ################################################################################
     #                              POST-UPDATE CHECKS                              #
     ################################################################################ 
-    updatedSwitches = []                                # Array that holds all switch data after the update has occured
     print("\n\nGathering upgraded switch data...")
     print("################################################################################\n")
-    updatedSwitchHostnames, temp2 = getSwitchData(nr2)  # This is identical to the first time switch data was grabbed, so I'll spare you the comments
-    updatedSwitchIOSVersion = []
-    for version2 in temp2:
-        updatedSwitchIOSVersion.append(versionFormatter(version2))
-    updatedSwitchFreeSpace = getFreeSpace(nr2)
-
-    print("Formatting data...\n")
-    for x in range(len(updatedSwitchHostnames)):
-        tempList2 = []
-        tempList2.append(updatedSwitchHostnames[x])
-        tempList2.append(updatedSwitchIOSVersion[x])
-        tempList2.append(updatedSwitchFreeSpace[x])
-        updatedSwitches.append(tempList2)
+    updatedFacts, offline = ios_facts.gatherFacts(nr2)  # This is identical to the first time switch data was grabbed, so I'll spare you the comments
+    updatedSwitches = ios_facts.factsToSwitches(updatedFacts)   # Array that holds all switch data after the update has occured
 
     printFormatter(updatedSwitches, newIOSVersion)      # Printing out table with new switch data
     print(f"{len(updatedSwitches)} Switches in list\n")
@@ -861,4 +612,7 @@ def main():
 
 
 if __name__ == "__main__":                              # Running main()
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        ios_timing.writeReport()                        # Timing report for however far the run got, look at ios_timing.py
\ No newline at end of file
@@ -0,0 +1,295 @@
+# Script by: DarkSplash
+# Last edited: 10/17/2026
+
+# This script holds the rolling wave scheduler used by the INSTALL and BUNDLE scripts.
+# Instead of every switch in the inventory running "install activate" and rebooting
+# at the exact same time, the switches are split up into waves. A wave can only hold
+# so many switches in total ("max_reboots" in the "waves" section of config.yaml) and
+# so many switches from any single site ("max_reboots_per_group" in config.yaml, the
+# site coming from siteOf() in ios_timeouts.py) or from any group that sets its own
+# "max_reboots" in its data section of groups.yaml. Groups that don't (EX: install and
+# bundle, which only say what boot mode a switch is in) are never counted. The next
+# wave is let loose as soon as every switch in the current wave has come back online
+# running the new IOS version. If any switch in a wave fails to upgrade, every wave
+# after it is held back so a bad image never takes out more than one wave. A switch
+# waiting on its wave doesn't hold a worker (look at ios_runner.py), and gives up
+# loudly if nobody ahead of it finishes within "max_wait" seconds instead of hanging.
+
+import ios_runner                                       # Registers the "swan" runner plugin set in config.yaml, look at checkPlan()
+import ios_timeouts                                     # siteOf() lives here
+from nornir import InitNornir
+from nornir.core.inventory import Host, ParentGroups
+from nornir.core.task import Task, Result
+import threading
+import time
+
+
+# Packageless Terminal Colors: https://stackoverflow.com/a/21786287
+RED = "\x1b[1;31;40m"
+GREEN = "\x1b[1;32;40m"
+CLEAR = "\x1b[0m"
+
+DEFAULTS = {
+    "max_reboots": None,                                # No cap on the size of a wave
+    "max_reboots_per_group": None,                      # No cap on how many switches from one site are in a wave
+    "max_wait": 7200,                                   # Seconds a switch waits on an upgrading wave without a single switch in it finishing before giving up
+}
+
+
+
+# WAVE OPTIONS
+# Function merges the "waves" section of config.yaml over the defaults above
+################################################################################
+def waveOptions(nr):
+    options = dict(DEFAULTS)
+    options.update(nr.config.user_defined.get("waves", {}) or {})
+    return options
+
+
+
+# REBOOT CAPS
+# Function returns {cap name: max number of switches} for every cap the host counts
+# against in a wave: each of its groups that sets "max_reboots", and its site (if it
+# has one) capped at maxPerGroup. A group that is also the site's name keeps its own cap.
+################################################################################
+def rebootCaps(host, maxPerGroup=None):
+    caps = {}
+    for group in host.groups:
+        cap = group.data.get("max_reboots")             # Set in the group's data section of groups.yaml
+        if cap is not None:
+            caps[group.name] = cap
+    site = ios_timeouts.siteOf(host)
+    if maxPerGroup is not None and site != ios_timeouts.DEFAULT_SITE:
+        caps.setdefault(site, maxPerGroup)
+    return caps
+
+
+
+# PLAN WAVES
+# Function splits every host in the Nornir object up into waves, filling the
+# earliest wave that still has room for the host under every cap.
+################################################################################
+def planWaves(nr, maxReboots=None, maxPerGroup=None):
+    """
+    Splits the hosts in a Nornir object into reboot waves.
+
+    Parameters
+    ----------
+    nr : Nornir
+        The (already filtered) Nornir object holding every host to upgrade.
+    maxReboots : int, optional
+        Max number of switches in a single wave. By default this is None, which
+        falls back to "max_reboots" in the "waves" section of config.yaml.
+    maxPerGroup : int, optional
+        Max number of switches from any one site in a single wave, for sites
+        without a group that sets its own "max_reboots". By default this is
+        None, which falls back to "max_reboots_per_group" in config.yaml.
+
+    Returns
+    -------
+    list
+        List of waves, each wave being a list of inventory names:
+        [['host1', 'host2'], ['host3', 'host4'], ['host5']]
+    """
+    options = waveOptions(nr)
+    if maxReboots is None:
+        maxReboots = options.get("max_reboots")
+    if maxPerGroup is None:
+        maxPerGroup = options.get("max_reboots_per_group")
+    return planHosts(nr.inventory.hosts, maxReboots, maxPerGroup)
+
+
+
+# PLAN HOSTS
+# Function does the actual planning for planWaves(), takes a dict of inventory
+# name -> Host instead of a whole Nornir object
+################################################################################
+def planHosts(hosts, maxReboots=None, maxPerGroup=None):
+    waves = []                                          # Hostnames in each wave
+    capCounts = []                                      # {cap name: number of hosts counted against it} for each wave
+
+    for hostname, host in hosts.items():
+        caps = rebootCaps(host, maxPerGroup)
+        placed = False
+        for i in range(len(waves)):
+            if maxReboots is not None and len(waves[i]) >= maxReboots:
+                continue                                # Wave is already full
+
+            fits = True
+            for name, cap in caps.items():
+                if capCounts[i].get(name, 0) >= cap:
+                    fits = False                        # Wave already has as many switches from this site/group as it can take
+                    break
+
+            if fits:
+                waves[i].append(hostname)
+                for name in caps:
+                    capCounts[i][name] = capCounts[i].get(name, 0) + 1
+                placed = True
+                break
+
+        if not placed:                                  # No wave has room, starting a new one
+            waves.append([hostname])
+            capCounts.append({name: 1 for name in caps})
+    return waves
+
+
+
+# PRINT WAVES
+# Function prints out which switches are in which wave
+################################################################################
+def printWaves(waves):
+    for i in range(len(waves)):
+        print(f"Wave {i+1} ({len(waves[i])} switches): {', '.join(waves[i])}")
+    print()
+
+
+
+# WAVE GATE
+# Shared between every host's thread in the pipeline. Hosts wait at the gate
+# until their wave is let loose, and report back once they have come back online
+# with the new version (or once they have dropped out of the pipeline).
+################################################################################
+class WaveGate:
+    def __init__(self, waves, maxWait=DEFAULTS["max_wait"]):
+        self.waves = waves
+        self.maxWait = maxWait
+        self.hostWave = {}                              # Hostname -> index of the wave the host is in
+        self.remaining = []                             # Hosts in each wave that haven't finished yet
+        for i in range(len(waves)):
+            self.remaining.append(set(waves[i]))
+            for hostname in waves[i]:
+                self.hostWave[hostname] = i
+        self.entered = set()                            # Hosts that have gone through the gate and started their upgrade
+        self.current = 0                                # Index of the wave that is currently allowed to upgrade
+        self.halted = False
+        self.changes = 0                                # Bumped every time a host finishes or drops out, a waiting host's clock restarts on it
+        self.condition = threading.Condition()
+        with self.condition:                            # Skipping past any wave left empty by the plan
+            self.advance()
+
+
+    # Moves current up past every wave that no longer has any hosts left in it.
+    # Should only be called while holding self.condition.
+    def advance(self):
+        self.changes = self.changes + 1
+        while self.current < len(self.waves) and len(self.remaining[self.current]) == 0:
+            self.current = self.current + 1
+            if self.current < len(self.waves) and not self.halted:
+                print(f"\n{GREEN}Starting wave {self.current+1} of {len(self.waves)}{CLEAR}\n")
+        self.condition.notify_all()
+
+
+    # Blocks until the host's wave has been let loose. Returns False if the waves
+    # were halted because a switch in an earlier wave failed to upgrade, or None if
+    # maxWait seconds went by with the whole wave ahead upgrading and none of it
+    # finishing or dropping out.
+    def wait(self, hostname):
+        with self.condition:
+            wave = self.hostWave[hostname]
+            changes = self.changes
+            deadline = time.monotonic() + self.maxWait
+            while not self.halted and self.current < wave:
+                if self.changes != changes or not self.remaining[self.current] <= self.entered:
+                    changes = self.changes              # Something moved, or the wave ahead is still downloading, the clock starts over
+                    deadline = time.monotonic() + self.maxWait
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+            if self.halted:
+                return False
+            self.entered.add(hostname)
+            return True
+
+
+    # Called once a host is back online running the new version
+    def done(self, hostname):
+        with self.condition:
+            self.remaining[self.hostWave[hostname]].discard(hostname)
+            self.advance()
+
+
+    # Called by the pipeline whenever a host drops out. A host that dropped out
+    # before its upgrade started (EX: failed download) is just removed from its wave,
+    # while a host that dropped out during or after its upgrade halts every other wave.
+    def drop(self, hostname, stageName=None):
+        with self.condition:
+            if hostname not in self.hostWave:
+                return
+            if hostname in self.entered and not self.halted:
+                self.halted = True
+                print(f"\n{RED}{hostname}{CLEAR} failed to upgrade, holding back every wave after wave {self.hostWave[hostname]+1}\n")
+            self.remaining[self.hostWave[hostname]].discard(hostname)
+            self.advance()
+
+
+
+# WAVE WAIT TASK
+# Pipeline stage that goes right before the upgrade stage, holds the host until
+# its wave is let loose
+################################################################################
+def waveWaitTask(task: Task, context, gate) -> Result:
+    entered = gate.wait(task.host.name)
+    if entered is None:
+        print(f"{RED}{task.host.name}{CLEAR} gave up after waiting {gate.maxWait} seconds on wave {gate.current+1} without any switch in it finishing")
+        return Result(host=task.host, result=f"Gave up after {gate.maxWait} seconds stuck behind wave {gate.current+1}", failed=True)
+    if not entered:
+        return Result(host=task.host, result="Held back since a switch in an earlier wave failed to upgrade", failed=True)
+    return Result(host=task.host, result=gate.hostWave[task.host.name] + 1)
+
+
+
+# WAVE DONE TASK
+# Pipeline stage that goes after the host has come back online with the new
+# version, letting the gate know the host is finished
+################################################################################
+def waveDoneTask(task: Task, context, gate) -> Result:
+    gate.done(task.host.name)
+    return Result(host=task.host, result=True)
+
+
+
+# CHECK PLAN
+# Function plans a stand-in fleet of 200 INSTALL and 25 BUNDLE switches (plus one
+# site of 60 more) with the shipped config.yaml and groups.yaml, and checks that the
+# boot mode groups never shrink a wave below max_reboots while a site is still held
+# to max_reboots_per_group. Returns the number of checks that failed.
+################################################################################
+def checkPlan(configFile="config.yaml"):
+    nr = InitNornir(config_file=configFile)
+    options = waveOptions(nr)
+    maxReboots = options["max_reboots"]
+    maxPerGroup = options["max_reboots_per_group"]
+    groups = nr.inventory.groups
+
+    hosts = {}
+    for i in range(225):
+        hosts[f"check-{i}"] = Host(f"check-{i}", groups=ParentGroups([groups["install" if i < 200 else "bundle"]]))
+    site = {}
+    for i in range(60):
+        site[f"site-{i}"] = Host(f"site-{i}", groups=ParentGroups([groups["install"]]), data={"site": "check-site"})
+
+    failures = 0
+    waves = planHosts(hosts, maxReboots, maxPerGroup)
+    sizes = [len(wave) for wave in waves]
+    expected = [maxReboots] * (225 // maxReboots) + ([225 % maxReboots] if 225 % maxReboots else [])
+    if sizes != expected:
+        print(f"{RED}Boot mode groups{CLEAR} capped the waves: expected {expected}, planned {sizes}")
+        failures = failures + 1
+    else:
+        print(f"{GREEN}Boot mode groups{CLEAR} don't cap the waves: {sizes}")
+
+    waves = planHosts(site, maxReboots, maxPerGroup)
+    sizes = [len(wave) for wave in waves]
+    if maxPerGroup is not None and max(sizes) > maxPerGroup:
+        print(f"{RED}Site cap{CLEAR} was not applied: {sizes} with max_reboots_per_group {maxPerGroup}")
+        failures = failures + 1
+    else:
+        print(f"{GREEN}Site cap{CLEAR} was applied: {sizes}")
+    return failures
+
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if checkPlan() != 0 else 0)
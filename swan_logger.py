@@ -1,9 +1,28 @@
 # Script by: DarkSplash
-# Last edited: 02/27/2023
+# Last edited: 10/17/2026
 
+# Every logger() call only formats the log entry and hands it off to a queue. A single
+# background writer thread pulls entries off of the queue in batches and writes them
+# to the per-switch log files, keeping the most recently used files open instead of
+# opening and closing a file for every single command. Everything still in the queue
+# is written out when the script exits (look at flush()).
+
+import atexit
+from collections import OrderedDict
 from datetime import date
 from nornir.core.task import AggregatedResult
 import os
+import queue
+import threading
+
+
+MAX_HANDLES = 256                                       # Max number of log files kept open at once, least recently used is closed first
+BATCH_SIZE = 1000                                       # Max number of entries written before open files are flushed
+QUEUE_SIZE = 100000                                     # Callers wait once this many entries are waiting to be written
+
+ENTRIES = queue.Queue(QUEUE_SIZE)                       # (hostname, date, text) of every entry waiting to be written, None stops the writer
+WRITER = None                                           # Background writer thread, started the first time logger() is called
+WRITER_LOCK = threading.Lock()
 
 
 # COMMAND LOGGER
@@ -41,54 +60,150 @@ def commandLogger(command, output, flag=None):
             logger(hostname, command, result, flag)     # Same as above, but splitting each log call by hostname so they each have their own log file
 
 
+# TASK LOGGER
+# Same idea as commandLogger(), but for logging from inside of a Nornir task that
+# is only running against a single host (like the stages in ios_stages.py), where
+# there is no AggregatedResult to loop through.
+################################################################################
+def taskLogger(task, command, result, flag=None):
+    """
+    Function takes the Nornir Task of a single host and logs the command and
+    command output to that host's log file located in the /logs folder.
+
+    Parameters
+    ----------
+    task : Task
+        The Nornir task currently running on the host.
+    command : string
+        The IOS command that was ran.
+    result : string
+        The output of the IOS command.
+    flag : string, optional
+        Same optional flags that commandLogger() takes.
+    """
+    logger(task.host.name, command, str(result), flag)
+
+
 # LOGGER
 # Logging function that takes each individual host and logs them to their
 # respective file, or creates the file if it has not been created yet.
 # This function SHOULD NOT be called in the actual script, as it was designed
 # to be called within commandLogger().
 def logger(switchHostname, command, result, flag=None):
-    ################################################################################
-    #                          LOGGING DIRECTORY CREATION                          #
-    ################################################################################ 
-    scriptDir = os.getcwd()                             # Gets current directory of where script is being ran
-    loggingDir = scriptDir + "/logs/"                   # Logging subdirectory direct path
-    currentDate = date.today().strftime("%Y-%m-%d")
-    filename = f"{currentDate}-{switchHostname}.log"    # Filename is current day + switch hostname
-    
+    startWriter()
+    ENTRIES.put((switchHostname, date.today().strftime("%Y-%m-%d"), formatEntry(command, result, flag)))
+
+
+
+# FORMAT ENTRY
+# Function returns the exact text logger() writes to the switch's log file
+################################################################################
+def formatEntry(command, result, flag=None):
+    if flag is not None:                                # Checking to see if any special flags were passed
+        if "STARTLOG" in flag:                          # Special script start banner
+            return ("########################################\n"
+                    "#             START SCRIPT             #\n"
+                    "########################################\n\n")
+        elif "STARTCOMMAND" in flag:                    # Allows you to log Nornir commands that have more than one output variable, first flag to be called
+            return command + "\n" + "########################################\n" + result
+        elif "CONTINUECOMMAND" in flag:                 # Allows you to log Nornir commands that have more than one output variable, second flag to be called
+            return command + "\n" + result             # (Only should be needed if 3 or more nornir output variables are used, like during a scp copy)
+        elif "ENDCOMMAND" in flag:                      # Allows you to log Nornir commands that have more than one output variable, last flag to be called
+            return command + "\n" + result + "\n\n\n"
+        elif "ENDLOG" in flag:                          # Special script end banner
+            return ("########################################\n"
+                    "#              END SCRIPT              #\n"
+                    "########################################\n\n")
+        return ""                                       # Unknown flags never wrote anything
+    return command + "\n" + "########################################\n" + result + "\n\n\n"    # Default command logger
+
+
+
+# START WRITER
+# Function starts the background writer thread if it isn't already running
+################################################################################
+def startWriter():
+    global WRITER
+    if WRITER is not None:
+        return
+
+    with WRITER_LOCK:
+        if WRITER is None:
+            WRITER = threading.Thread(target=writeEntries, name="swan-logger", daemon=True)
+            WRITER.start()
+            atexit.register(stopWriter)
+
+
+
+# WRITE ENTRIES
+# Background writer thread. Pulls entries off of the queue in batches, writes each
+# one to its switch's log file for the day, and flushes every file it wrote to once
+# the batch is done.
+################################################################################
+def writeEntries():
+    loggingDir = os.path.join(os.getcwd(), "logs")      # Logging subdirectory direct path, based on where the script is being ran
     if not os.path.exists(loggingDir):                  # Creates logging directory if it doesnt exist
         print("Logging directory doesn't exist, creating...")
-        os.mkdir(loggingDir)
-    
-    ################################################################################
-    #                            SWITCH COMMAND LOGGING                            #
-    ################################################################################ 
-    filepath = loggingDir + filename                    # Full file path of log file
-    with open(filepath, "a") as log:
-        if flag is not None:                            # Checking to see if any special flags were passed
-            if "STARTLOG" in flag:                      # Special script start banner
-                log.write("########################################\n")
-                log.write("#             START SCRIPT             #\n")
-                log.write("########################################\n\n")
-                return
-            elif "STARTCOMMAND" in flag:                # Allows you to log Nornir commands that have more than one output variable, first flag to be called
-                log.write(command + "\n")
-                log.write("########################################\n")
-                log.write(result)
-                return
-            elif "CONTINUECOMMAND" in flag:             # Allows you to log Nornir commands that have more than one output variable, second flag to be called
-                log.write(command + "\n")               # (Only should be needed if 3 or more nornir output variables are used, like during a scp copy)
-                log.write(result)
-                return
-            elif "ENDCOMMAND" in flag:                  # Allows you to log Nornir commands that have more than one output variable, last flag to be called
-                log.write(command + "\n")
-                log.write(result + "\n\n\n")
-                return
-            elif "ENDLOG" in flag:                      # Special script end banner
-                log.write("########################################\n")
-                log.write("#              END SCRIPT              #\n")
-                log.write("########################################\n\n")
-                return
-        else:                                           # Default command logger
-            log.write(command + "\n")
-            log.write("########################################\n")
-            log.write(result + "\n\n\n")
\ No newline at end of file
+        os.makedirs(loggingDir, exist_ok=True)
+
+    handles = OrderedDict()                             # Filepath -> open log file, most recently used last
+    running = True
+    while running:
+        batch = [ENTRIES.get()]                         # Waits for at least one entry
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(ENTRIES.get_nowait())
+            except queue.Empty:
+                break
+
+        written = set()
+        for entry in batch:
+            if entry is None:                           # stopWriter() was called, everything before this has already been pulled
+                running = False
+                continue
+            switchHostname, currentDate, text = entry
+            filepath = os.path.join(loggingDir, f"{currentDate}-{switchHostname}.log")  # Filename is current day + switch hostname
+            try:
+                if filepath in handles:
+                    handles.move_to_end(filepath)
+                else:
+                    if len(handles) >= MAX_HANDLES:
+                        handles.popitem(last=False)[1].close()
+                    handles[filepath] = open(filepath, "a")
+                handles[filepath].write(text)
+                written.add(filepath)
+            except OSError as error:                    # A bad log file should never take the writer (and every caller waiting on it) down
+                print(f"Unable to write to {filepath}: {error}")
+
+        for filepath in written:
+            if filepath in handles:
+                handles[filepath].flush()
+        for _ in batch:
+            ENTRIES.task_done()
+
+    for handle in handles.values():
+        handle.close()
+
+
+
+# FLUSH
+# Function blocks until every entry logged so far has been written to its file
+################################################################################
+def flush():
+    if WRITER is not None:
+        ENTRIES.join()
+
+
+
+# STOP WRITER
+# Function writes out everything still in the queue and stops the writer thread,
+# ran automatically when the script exits
+################################################################################
+def stopWriter():
+    global WRITER
+    with WRITER_LOCK:
+        if WRITER is None:
+            return
+        ENTRIES.put(None)
+        WRITER.join()
+        WRITER = None